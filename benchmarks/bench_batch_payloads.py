@@ -0,0 +1,91 @@
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Add src directory to path for imports; the API reads config.yaml and logs/ from the working directory
+sys.path.append(os.path.join(ROOT, 'src'))
+os.chdir(ROOT)
+os.makedirs('logs', exist_ok=True)
+from api.main import BatchOTDRTraces
+from api.payloads import decode_payload
+from model.features import RAW_COLUMNS
+
+def parse_json(body):
+    """The JSON request path of /batch-predict: Pydantic validation, then stacking into a matrix"""
+    batch_traces = BatchOTDRTraces.parse_raw(body)
+    raw = np.array([[trace.snr, *trace.trace_points] for trace in batch_traces.traces], dtype=np.float32)
+    return raw.reshape(len(batch_traces.traces), len(RAW_COLUMNS))
+
+def encode_bodies(raw):
+    """Encode the same batch in every supported request format"""
+    bodies = {
+        'json': json.dumps({
+            'traces': [{'snr': float(row[0]), 'trace_points': row[1:].tolist()} for row in raw]
+        }).encode(),
+    }
+
+    buffer = io.BytesIO()
+    np.save(buffer, raw)
+    bodies['npy'] = buffer.getvalue()
+
+    try:
+        import pyarrow as pa
+        table = pa.table({col: raw[:, i] for i, col in enumerate(RAW_COLUMNS)})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        bodies['arrow'] = sink.getvalue().to_pybytes()
+    except ImportError:
+        print("pyarrow not installed, skipping Arrow")
+
+    try:
+        import msgpack
+        bodies['msgpack'] = msgpack.packb(
+            {'shape': list(raw.shape), 'dtype': '<f4', 'data': raw.tobytes()}, use_bin_type=True
+        )
+    except ImportError:
+        print("msgpack not installed, skipping msgpack")
+
+    return bodies
+
+def time_call(func, repeat):
+    """Return the best wall-clock time of func() over repeat runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run(sizes, repeat):
+    rng = np.random.default_rng(42)
+
+    print(f"{'rows':>8} {'format':>8} {'body (KB)':>10} {'parse (ms)':>11} {'vs json':>9}")
+    for n_rows in sizes:
+        raw = rng.uniform(0.0, 1.0, size=(n_rows, len(RAW_COLUMNS))).astype(np.float32)
+        bodies = encode_bodies(raw)
+
+        # Fewer repeats on large inputs to keep the run short
+        n_repeat = repeat if n_rows < 10000 else max(1, repeat // 5)
+        json_time = time_call(lambda: parse_json(bodies['json']), n_repeat)
+
+        for fmt, body in bodies.items():
+            if fmt == 'json':
+                seconds = json_time
+            else:
+                seconds = time_call(lambda: decode_payload(body, fmt), n_repeat)
+            print(f"{n_rows:>8} {fmt:>8} {len(body) / 1024:>10.1f} {seconds * 1000:>11.3f} {json_time / seconds:>8.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare /batch-predict request parse time for JSON and binary payloads")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 50000], help="Batch sizes to benchmark")
+    parser.add_argument('--repeat', type=int, default=10, help="Repeats per size (best time is reported)")
+    args = parser.parse_args()
+
+    run(args.sizes, args.repeat)
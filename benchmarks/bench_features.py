@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+# Add src directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from model.features import RAW_COLUMNS, compute_features
+
+def pandas_features(X):
+    """Previous column-by-column pandas feature engineering, kept as the benchmark reference"""
+    X = X.copy()
+    trace_columns = [col for col in X.columns if col.startswith('P')]
+    
+    X['trace_max'] = X[trace_columns].max(axis=1)
+    X['trace_min'] = X[trace_columns].min(axis=1)
+    X['trace_mean'] = X[trace_columns].mean(axis=1)
+    X['trace_std'] = X[trace_columns].std(axis=1)
+    X['trace_range'] = X['trace_max'] - X['trace_min']
+    
+    for i in range(1, len(trace_columns)):
+        X[f'derivative_P{i}'] = X[trace_columns[i]] - X[trace_columns[i-1]]
+    
+    for i in range(2, len(trace_columns)):
+        X[f'second_derivative_P{i}'] = X[f'derivative_P{i}'] - X[f'derivative_P{i-1}']
+    
+    X['snr_to_mean_ratio'] = X['SNR'] / X['trace_mean']
+    
+    return X
+
+def time_call(func, arg, repeat):
+    """Return the best wall-clock time of func(arg) over repeat runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run(sizes, repeat):
+    rng = np.random.default_rng(42)
+    
+    print(f"{'rows':>10} {'pandas (s)':>12} {'numpy (s)':>12} {'speedup':>10}")
+    for n_rows in sizes:
+        raw = rng.uniform(0.0, 1.0, size=(n_rows, len(RAW_COLUMNS))).astype(np.float32)
+        df = pd.DataFrame(raw, columns=RAW_COLUMNS)
+        
+        # Fewer repeats on large inputs to keep the run short
+        n_repeat = repeat if n_rows < 100000 else 1
+        pandas_time = time_call(pandas_features, df, n_repeat)
+        numpy_time = time_call(compute_features, raw, n_repeat)
+        
+        print(f"{n_rows:>10} {pandas_time:>12.6f} {numpy_time:>12.6f} {pandas_time / numpy_time:>9.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare pandas and NumPy feature engineering")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 1000, 1000000], help="Row counts to benchmark")
+    parser.add_argument('--repeat', type=int, default=5, help="Repeats per size (best time is reported)")
+    args = parser.parse_args()
+    
+    run(args.sizes, args.repeat)
@@ -0,0 +1,69 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Add src directory to path for imports
+sys.path.append(os.path.join(ROOT, 'src'))
+from data_processing.preprocess import OTDRDataProcessor
+from bench_preprocess import write_raw_data
+
+# Train one epoch in a fresh interpreter so that peak memory is that of the training run
+TRAIN_SCRIPT = """
+import json, sys, time
+sys.path.append({root!r})
+from src.model.train import OTDRFaultDetectionModel
+trainer = OTDRFaultDetectionModel(config_path={config!r})
+trainer.load_processed_data()
+trainer.build_model()
+history = trainer.train_model()
+with open('/proc/self/status') as f:
+    peak_kb = next(int(line.split()[1]) for line in f if line.startswith('VmHWM'))
+print(json.dumps({{'samples_per_second': history.history['samples_per_second'][-1], 'max_rss_mb': peak_kb / 1024}}))
+"""
+
+def train(tmp_dir, config, input_pipeline):
+    config['model'] = dict(config['model'], input_pipeline=input_pipeline)
+    config_path = os.path.join(tmp_dir, 'config.yaml')
+    with open(config_path, 'w') as f:
+        yaml.safe_dump(config, f)
+
+    script = TRAIN_SCRIPT.format(root=ROOT, config=config_path)
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def run(sizes, model_type, epochs):
+    with open(os.path.join(ROOT, 'config.yaml'), 'r') as file:
+        config = yaml.safe_load(file)
+
+    print(f"{'rows':>10} {'pipeline':>9} {'samples/s':>10} {'peak (MB)':>10}")
+    for n_rows in sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            raw_path = os.path.join(tmp_dir, 'OTDR_data.csv')
+            write_raw_data(raw_path, n_rows)
+            config['data'] = dict(config['data'], raw_data_path=raw_path, processed_data_path=os.path.join(tmp_dir, 'processed'),
+                                  processed_format='npy', chunk_size=100000, cache_path=None)
+            config['model'] = dict(config['model'], model_type=model_type, epochs=epochs,
+                                   model_save_path=os.path.join(tmp_dir, 'models'))
+            config_path = os.path.join(tmp_dir, 'config.yaml')
+            with open(config_path, 'w') as f:
+                yaml.safe_dump(config, f)
+            OTDRDataProcessor(config_path=config_path).process()
+
+            for input_pipeline in ['numpy', 'tf.data']:
+                result = train(tmp_dir, config, input_pipeline)
+                print(f"{n_rows:>10} {input_pipeline:>9} {result['samples_per_second']:>10.0f} {result['max_rss_mb']:>10.0f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare training throughput and memory of in-memory arrays and the tf.data pipeline")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000], help="Raw row counts to train on")
+    parser.add_argument('--model-type', default='dense', help="Model architecture (lstm, cnn or dense)")
+    parser.add_argument('--epochs', type=int, default=2, help="Epochs to train; samples/s is that of the last epoch")
+    args = parser.parse_args()
+
+    run(args.sizes, args.model_type, args.epochs)
@@ -0,0 +1,108 @@
+import os
+import sys
+import time
+import queue
+import shutil
+import logging
+import logging.handlers
+import argparse
+import tempfile
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Add src directory to path for imports
+sys.path.append(os.path.join(ROOT, 'src'))
+from api.logs import (
+    JSONFormatter, SamplingFilter, NonBlockingQueueHandler, BackgroundWriter, LOG_RECORDS_DROPPED, TEXT_FORMAT
+)
+
+class SlowStream:
+    """File wrapper that stalls on every write, like a busy network volume"""
+    def __init__(self, stream, delay_us):
+        self.stream = stream
+        self.delay = delay_us / 1e6
+
+    def write(self, data):
+        time.sleep(self.delay)
+        return self.stream.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+def slow_down(handler, write_delay_us):
+    if write_delay_us > 0:
+        handler.stream = SlowStream(handler.stream, write_delay_us)
+    return handler
+
+def file_handler_setup(log_dir, write_delay_us=0):
+    """The previous setup: a synchronous FileHandler formatting and writing in the calling thread"""
+    handler = slow_down(logging.FileHandler(os.path.join(log_dir, "file.log")), write_delay_us)
+    handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    return handler, None
+
+def queue_setup(log_dir, sample_rate=1.0, queue_size=10000, write_delay_us=0):
+    """The API setup: a queue handler in the calling thread, JSON formatting and rotation in a writer thread"""
+    file_handler = slow_down(logging.handlers.RotatingFileHandler(
+        os.path.join(log_dir, f"queue_{sample_rate}_{queue_size}.log"), maxBytes=100 * 1024 * 1024, backupCount=1
+    ), write_delay_us)
+    file_handler.setFormatter(JSONFormatter())
+    handler = NonBlockingQueueHandler(queue.Queue(queue_size))
+    handler.addFilter(SamplingFilter({"prediction": sample_rate}))
+    listener = BackgroundWriter(handler.queue, file_handler)
+    listener.start()
+    return handler, listener
+
+def log_predictions(logger, n_records):
+    for i in range(n_records):
+        logger.info(f"Prediction made: Normal with confidence {0.9 + i % 10 / 100:.4f}",
+                    extra={"event": "prediction", "model": "default", "fault_type": 0, "confidence": 0.9})
+
+def run_case(name, handler, listener, n_threads, n_records):
+    logger = logging.getLogger(f"bench-{name}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+
+    dropped = LOG_RECORDS_DROPPED.value(reason="queue_full")
+    threads = [threading.Thread(target=log_predictions, args=(logger, n_records)) for _ in range(n_threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    calling = time.perf_counter() - start
+
+    # The writer may still be draining; time until every record is on disk
+    if listener is not None:
+        listener.stop()
+    total = time.perf_counter() - start
+    logger.removeHandler(handler)
+    handler.close()
+
+    n_total = n_threads * n_records
+    n_dropped = LOG_RECORDS_DROPPED.value(reason="queue_full") - dropped
+    print(f"{name:>24} {n_total / calling:>12,.0f} {calling / n_total * 1e6:>12.2f} {total:>12.2f} {n_dropped:>9}")
+
+def run(n_threads, n_records, write_delay_us):
+    log_dir = tempfile.mkdtemp()
+    try:
+        print(f"{n_threads} threads x {n_records} records, {write_delay_us} us extra per write")
+        print(f"{'handler':>24} {'records/s':>12} {'us per call':>12} {'on disk (s)':>12} {'dropped':>9}")
+        run_case("FileHandler", *file_handler_setup(log_dir, write_delay_us), n_threads, n_records)
+        # An unbounded queue, so that every record is written as with the FileHandler
+        run_case("queue + JSON", *queue_setup(log_dir, queue_size=0, write_delay_us=write_delay_us), n_threads, n_records)
+        run_case("queue + JSON, bounded", *queue_setup(log_dir, write_delay_us=write_delay_us), n_threads, n_records)
+        run_case("queue + JSON, 1% kept", *queue_setup(log_dir, sample_rate=0.01, write_delay_us=write_delay_us),
+                 n_threads, n_records)
+    finally:
+        shutil.rmtree(log_dir)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the logging cost on the request path of the file and queue handlers")
+    parser.add_argument('--threads', type=int, default=8, help="Threads logging concurrently (request workers)")
+    parser.add_argument('--records', type=int, default=20000, help="Records logged per thread")
+    parser.add_argument('--write-delay-us', type=int, default=0, help="Simulated stall per file write (slow volume)")
+    args = parser.parse_args()
+
+    run(args.threads, args.records, args.write_delay_us)
@@ -0,0 +1,112 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+import pandas as pd
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Add src directory to path for imports
+sys.path.append(os.path.join(ROOT, 'src'))
+from model.features import FEATURE_COLUMNS, compute_features, prepare_model_input
+from model.numpy_engine import NumpyModel, export_numpy_model
+
+# Run in a fresh interpreter: import, load the model and score one trace
+COLD_START_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.append({src!r})
+from model.predict import OTDRFaultDetector
+detector = OTDRFaultDetector(config_path={config!r}, model_path={model!r})
+detector.predict({{'SNR': 15.0, **{{f'P{{i}}': 0.5 for i in range(1, 31)}}}})
+seconds = time.perf_counter() - start
+# Peak RSS of this process (VmHWM is reset on exec, unlike ru_maxrss)
+with open('/proc/self/status') as f:
+    peak_kb = next(int(line.split()[1]) for line in f if line.startswith('VmHWM'))
+print(json.dumps({{'seconds': seconds, 'max_rss_mb': peak_kb / 1024}}))
+"""
+
+def build_untrained_model(model_type):
+    """Build the training architecture on synthetic data (weights are random)"""
+    sys.path.append(ROOT)
+    from src.model.train import OTDRFaultDetectionModel
+    
+    trainer = OTDRFaultDetectionModel(config_path=os.path.join(ROOT, 'config.yaml'))
+    X = pd.DataFrame(compute_features(np.random.rand(16, 31)), columns=FEATURE_COLUMNS)
+    trainer.X_train = trainer.X_val = trainer.X_test = X
+    trainer.y_train = trainer.y_val = trainer.y_test = np.arange(16) % 8
+    return trainer.build_model(model_type)
+
+def best_time(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def cold_start(config, model_type, engine, model_path):
+    """Measure import + load + first prediction time in a new process"""
+    config = dict(config, model=dict(config['model'], model_type=model_type),
+                  api=dict(config['api'], inference_engine=engine))
+    with tempfile.NamedTemporaryFile('w', suffix='.yaml', delete=False) as f:
+        yaml.safe_dump(config, f)
+    
+    script = COLD_START_SCRIPT.format(src=os.path.join(ROOT, 'src'), config=f.name, model=model_path)
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+    os.unlink(f.name)
+    return json.loads(output.strip().splitlines()[-1])
+
+def run(model_type, model_path, batch_sizes, repeat):
+    with open(os.path.join(ROOT, 'config.yaml'), 'r') as file:
+        config = yaml.safe_load(file)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if model_path is None:
+            model = build_untrained_model(model_type)
+            model_path = os.path.join(tmp_dir, 'best_model.h5')
+            model.save(model_path)
+        else:
+            from tensorflow.keras.models import load_model
+            model = load_model(model_path)
+        
+        npz_path = export_numpy_model(model, os.path.splitext(model_path)[0] + '.npz')
+        numpy_model = NumpyModel(npz_path)
+        
+        print(f"Model type: {model_type}")
+        print(f"Model size: h5 {os.path.getsize(model_path) / 1e6:.2f} MB, npz {os.path.getsize(npz_path) / 1e6:.2f} MB")
+        
+        print("\nCold start (import + load + first prediction, fresh process):")
+        for engine in ['keras', 'numpy']:
+            result = cold_start(config, model_type, engine, model_path)
+            print(f"  {engine:>6}: {result['seconds']:.2f} s, max RSS {result['max_rss_mb']:.0f} MB")
+        
+        print(f"\n{'batch':>8} {'keras (ms)':>12} {'numpy (ms)':>12} {'max |diff|':>12}")
+        rng = np.random.default_rng(0)
+        for batch_size in batch_sizes:
+            X = prepare_model_input(compute_features(rng.uniform(0.0, 1.0, size=(batch_size, 31))), model_type)
+            
+            # Warm up both engines before timing
+            expected = model.predict_on_batch(X)
+            actual = numpy_model.predict_on_batch(X)
+            
+            keras_time = best_time(lambda: model.predict_on_batch(X), repeat)
+            numpy_time = best_time(lambda: numpy_model.predict_on_batch(X), repeat)
+            diff = float(np.abs(np.asarray(expected) - actual).max())
+            
+            print(f"{batch_size:>8} {keras_time * 1000:>12.2f} {numpy_time * 1000:>12.2f} {diff:>12.2e}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the Keras and NumPy inference engines")
+    parser.add_argument('--model-type', default='lstm', choices=['lstm', 'cnn', 'dense'], help="Architecture to benchmark")
+    parser.add_argument('--model', default=None, help="Trained .h5 model (defaults to an untrained model of --model-type)")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 64, 256, 1024], help="Batch sizes to time")
+    parser.add_argument('--repeat', type=int, default=5, help="Repeats per batch size (best time is reported)")
+    args = parser.parse_args()
+    
+    run(args.model_type, args.model, args.batch_sizes, args.repeat)
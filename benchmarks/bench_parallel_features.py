@@ -0,0 +1,43 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+# Add src directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from model.features import RAW_COLUMNS, compute_features
+from data_processing.parallel import ParallelFeatures
+
+def best_time(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run(n_rows, max_workers, repeat):
+    rng = np.random.default_rng(42)
+    raw = rng.uniform(0.0, 1.0, size=(n_rows, len(RAW_COLUMNS))).astype(np.float32)
+    expected = compute_features(raw)
+    serial_time = best_time(lambda: compute_features(raw), repeat)
+
+    print(f"{n_rows} rows, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'time (s)':>10} {'speedup':>9} {'identical':>10}")
+    print(f"{'serial':>8} {serial_time:>10.3f} {1.0:>8.2f}x {'yes':>10}")
+    for workers in range(1, max_workers + 1):
+        with ParallelFeatures(workers) as features:
+            # Warm up the pool before timing
+            identical = features.compute(raw).tobytes() == expected.tobytes()
+            parallel_time = best_time(lambda: features.compute(raw), repeat)
+        print(f"{workers:>8} {parallel_time:>10.3f} {serial_time / parallel_time:>8.2f}x {'yes' if identical else 'NO':>10}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scaling of parallel feature engineering with the number of workers")
+    parser.add_argument('--rows', type=int, default=2000000, help="Raw rows to engineer features for")
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count(), help="Largest worker count to time")
+    parser.add_argument('--repeat', type=int, default=3, help="Repeats per worker count (best time is reported)")
+    args = parser.parse_args()
+
+    run(args.rows, args.max_workers, args.repeat)
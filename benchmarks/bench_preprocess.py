@@ -0,0 +1,73 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+import pandas as pd
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Add src directory to path for imports
+sys.path.append(os.path.join(ROOT, 'src'))
+from model.features import RAW_COLUMNS, REGRESSION_COLUMNS
+
+# Run in a fresh interpreter so that peak memory is that of one preprocessing run
+PREPROCESS_SCRIPT = """
+import json, sys, time
+sys.path.append({src!r})
+from data_processing.preprocess import OTDRDataProcessor
+start = time.perf_counter()
+OTDRDataProcessor(config_path={config!r}).process()
+seconds = time.perf_counter() - start
+with open('/proc/self/status') as f:
+    peak_kb = next(int(line.split()[1]) for line in f if line.startswith('VmHWM'))
+print(json.dumps({{'seconds': seconds, 'max_rss_mb': peak_kb / 1024}}))
+"""
+
+def write_raw_data(path, n_rows, block_rows=100000):
+    """Write a synthetic OTDR_data.csv of n_rows, block by block"""
+    rng = np.random.default_rng(42)
+    for start in range(0, n_rows, block_rows):
+        n = min(block_rows, n_rows - start)
+        block = pd.DataFrame(rng.uniform(0.0, 1.0, size=(n, len(RAW_COLUMNS))).round(4), columns=RAW_COLUMNS)
+        block['Class'] = rng.integers(0, 8, size=n)
+        for col in REGRESSION_COLUMNS:
+            block[col] = rng.uniform(0.0, 1.0, size=n).round(4)
+        block.to_csv(path, mode='w' if start == 0 else 'a', header=start == 0, index=False)
+
+def preprocess(tmp_dir, raw_path, chunk_size):
+    """Preprocess raw_path in a new process and return its wall time and peak RSS"""
+    with open(os.path.join(ROOT, 'config.yaml'), 'r') as file:
+        config = yaml.safe_load(file)
+    config['data'] = dict(config['data'], raw_data_path=raw_path, chunk_size=chunk_size, cache_path=None,
+                          processed_data_path=os.path.join(tmp_dir, 'processed'))
+    config_path = os.path.join(tmp_dir, 'config.yaml')
+    with open(config_path, 'w') as f:
+        yaml.safe_dump(config, f)
+
+    script = PREPROCESS_SCRIPT.format(src=os.path.join(ROOT, 'src'), config=config_path)
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def run(sizes, chunk_size):
+    print(f"{'rows':>10} {'CSV (MB)':>9} {'in-memory (s)':>14} {'peak (MB)':>10} {'chunked (s)':>12} {'peak (MB)':>10}")
+    for n_rows in sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            raw_path = os.path.join(tmp_dir, 'OTDR_data.csv')
+            write_raw_data(raw_path, n_rows)
+
+            in_memory = preprocess(tmp_dir, raw_path, 0)
+            chunked = preprocess(tmp_dir, raw_path, chunk_size)
+            print(f"{n_rows:>10} {os.path.getsize(raw_path) / 1e6:>9.0f} {in_memory['seconds']:>14.1f} {in_memory['max_rss_mb']:>10.0f} "
+                  f"{chunked['seconds']:>12.1f} {chunked['max_rss_mb']:>10.0f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare peak memory of in-memory and chunked preprocessing")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 500000, 1000000], help="Raw row counts to preprocess")
+    parser.add_argument('--chunk-size', type=int, default=100000, help="Rows per chunk in chunked mode")
+    args = parser.parse_args()
+
+    run(args.sizes, args.chunk_size)
@@ -0,0 +1,68 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Add src directory to path for imports
+sys.path.append(os.path.join(ROOT, 'src'))
+from data_processing.preprocess import OTDRDataProcessor
+from bench_preprocess import write_raw_data
+
+# Load every split as training does, in a fresh interpreter so that peak memory is that of the load
+LOAD_SCRIPT = """
+import json, sys, time
+sys.path.append({src!r})
+from data_processing.dataset import SPLITS, load_split, feature_matrix
+start = time.perf_counter()
+splits = [load_split({processed_dir!r}, split) for split in SPLITS]
+features = [feature_matrix(X) for X, _, _ in splits]
+seconds = time.perf_counter() - start
+# Touch every row, as one training epoch would
+checksum = sum(float(X.sum()) for X in features)
+with open('/proc/self/status') as f:
+    peak_kb = next(int(line.split()[1]) for line in f if line.startswith('VmHWM'))
+print(json.dumps({{'seconds': seconds, 'max_rss_mb': peak_kb / 1024}}))
+"""
+
+def disk_size(processed_dir):
+    return sum(os.path.getsize(os.path.join(processed_dir, name)) for name in os.listdir(processed_dir))
+
+def load(processed_dir):
+    script = LOAD_SCRIPT.format(src=os.path.join(ROOT, 'src'), processed_dir=processed_dir)
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def run(sizes):
+    with open(os.path.join(ROOT, 'config.yaml'), 'r') as file:
+        config = yaml.safe_load(file)
+
+    print(f"{'rows':>10} {'format':>7} {'disk (MB)':>10} {'load (s)':>9} {'peak (MB)':>10}")
+    for n_rows in sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            raw_path = os.path.join(tmp_dir, 'OTDR_data.csv')
+            write_raw_data(raw_path, n_rows)
+
+            for processed_format in ['csv', 'npy']:
+                processed_dir = os.path.join(tmp_dir, processed_format)
+                config['data'] = dict(config['data'], raw_data_path=raw_path, processed_data_path=processed_dir,
+                                      processed_format=processed_format, chunk_size=100000, cache_path=None)
+                config_path = os.path.join(tmp_dir, 'config.yaml')
+                with open(config_path, 'w') as f:
+                    yaml.safe_dump(config, f)
+                OTDRDataProcessor(config_path=config_path).process()
+
+                result = load(processed_dir)
+                print(f"{n_rows:>10} {processed_format:>7} {disk_size(processed_dir) / 1e6:>10.0f} "
+                      f"{result['seconds']:>9.2f} {result['max_rss_mb']:>10.0f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare disk size, load time and memory of CSV and .npy processed data")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000], help="Raw row counts to preprocess")
+    args = parser.parse_args()
+
+    run(args.sizes)
@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Add src directory to path for imports; the API reads config.yaml and logs/ from the working directory
+sys.path.append(os.path.join(ROOT, 'src'))
+os.chdir(ROOT)
+os.makedirs('logs', exist_ok=True)
+from api.main import BatchFaultPredictions, FaultPrediction
+from api.payloads import encode_json_predictions
+
+CLASS_NAMES = ['Normal', 'Fiber Tapping', 'Bad Splice', 'Bending Event',
+               'Dirty Connector', 'Fiber Cut', 'PC Connector', 'Reflector']
+
+def make_results(n_rows, seed=0):
+    """Prediction results shaped like OTDRFaultDetector.batch_predict output"""
+    rng = np.random.default_rng(seed)
+    probs = rng.dirichlet(np.ones(len(CLASS_NAMES)), size=n_rows).astype(np.float32)
+    results = []
+    for row in probs:
+        fault_type = int(row.argmax())
+        results.append({
+            'fault_type': fault_type,
+            'fault_name': CLASS_NAMES[fault_type],
+            'confidence': float(row[fault_type]),
+            'all_probabilities': {name: float(p) for name, p in zip(CLASS_NAMES, row)},
+        })
+    return results
+
+def encode_pydantic(results):
+    """The previous /batch-predict response path: one FaultPrediction per trace, then FastAPI's JSON encoding"""
+    predictions = [FaultPrediction(**result) for result in results]
+    response = BatchFaultPredictions(predictions=predictions)
+    return JSONResponse(jsonable_encoder(response)).body
+
+def time_call(func, repeat):
+    """Return the best wall-clock time of func() over repeat runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run(sizes, repeat):
+    encoders = {
+        'pydantic': encode_pydantic,
+        'full': lambda results: encode_json_predictions(results, CLASS_NAMES, 'full'),
+        'top_k=3': lambda results: encode_json_predictions(results, CLASS_NAMES, 'top_k', 3),
+        'top_k=1': lambda results: encode_json_predictions(results, CLASS_NAMES, 'top_k', 1),
+        'array': lambda results: encode_json_predictions(results, CLASS_NAMES, 'array'),
+    }
+
+    print(f"{'rows':>8} {'mode':>9} {'body (KB)':>10} {'encode (ms)':>12} {'vs pydantic':>12}")
+    for n_rows in sizes:
+        results = make_results(n_rows)
+        n_repeat = repeat if n_rows < 10000 else max(1, repeat // 5)
+        baseline = time_call(lambda: encode_pydantic(results), n_repeat)
+
+        for name, encode in encoders.items():
+            seconds = baseline if name == 'pydantic' else time_call(lambda: encode(results), n_repeat)
+            size = len(encode(results))
+            print(f"{n_rows:>8} {name:>9} {size / 1024:>10.1f} {seconds * 1000:>12.2f} {baseline / seconds:>11.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare /batch-predict JSON response encoding time and size per response mode")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 50000], help="Batch sizes to benchmark")
+    parser.add_argument('--repeat', type=int, default=10, help="Repeats per size (best time is reported)")
+    args = parser.parse_args()
+
+    run(args.sizes, args.repeat)
@@ -0,0 +1,220 @@
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import logging
+import platform
+import tempfile
+import numpy as np
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Add src directory to path for imports; the API reads config.yaml and logs/ from the working directory
+sys.path.append(os.path.join(ROOT, 'src'))
+os.chdir(ROOT)
+os.makedirs('logs', exist_ok=True)
+import httpx
+import api.main
+import api.routing
+from api import app
+from api.registry import ModelRegistry
+from api.routing import ModelRouter
+from model.features import compute_features
+from model.numpy_engine import export_numpy_model
+from model.quantize import convert_to_tflite, quantized_model_path
+from bench_numpy_engine import build_untrained_model, cold_start
+
+# Metrics compared against the baseline, and whether lower or higher is better.
+# p99 is reported but not compared: over a few hundred requests it is one or two samples.
+COMPARED_METRICS = {
+    'p50_ms': 'lower',
+    'p95_ms': 'lower',
+    'throughput_rps': 'higher',
+    'seconds': 'lower',
+}
+
+def summarize(latencies, n_rows, elapsed):
+    """Latency percentiles (ms) and throughput (rows per second) of a set of timed calls"""
+    latencies_ms = np.asarray(latencies) * 1000
+    return {
+        'calls': len(latencies),
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p95_ms': float(np.percentile(latencies_ms, 95)),
+        'p99_ms': float(np.percentile(latencies_ms, 99)),
+        'throughput_rps': n_rows / elapsed,
+    }
+
+def time_calls(func, repeat, n_rows):
+    """Time repeat sequential calls of func() after one warm-up call; n_rows is the rows scored per call"""
+    func()
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        call_start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - call_start)
+    return summarize(latencies, n_rows * repeat, time.perf_counter() - start)
+
+def make_traces(n_traces, seed=42):
+    """Request traces with random SNR and trace points"""
+    rng = np.random.default_rng(seed)
+    return [
+        {"snr": round(float(rng.uniform(5.0, 25.0)), 2), "trace_points": np.round(rng.uniform(0.0, 1.0, 30), 4).tolist()}
+        for _ in range(n_traces)
+    ]
+
+async def post_concurrently(path, bodies, concurrency):
+    """POST every body to the in-process app from concurrency clients and return per-request latencies"""
+    latencies = []
+    pending = iter(bodies)
+
+    async def client_loop(client):
+        for body in pending:
+            start = time.perf_counter()
+            response = await client.post(path, json=body)
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        await client.post(path, json=bodies[0])
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return latencies, elapsed
+
+def prepare_model(model_type, model_path, engine, tmp_dir):
+    """Write the model files the engine serves from and return the model path to load"""
+    if model_path is None:
+        model = build_untrained_model(model_type)
+        model_path = os.path.join(tmp_dir, 'best_model.h5')
+        model.save(model_path)
+    else:
+        # Engine files are written next to the model, so work on a copy of it
+        from tensorflow.keras.models import load_model
+        model_path = shutil.copy(model_path, os.path.join(tmp_dir, 'best_model.h5'))
+        model = load_model(model_path)
+
+    if engine == 'numpy':
+        export_numpy_model(model, os.path.splitext(model_path)[0] + '.npz')
+    elif engine == 'tflite':
+        variant = api.main.config['api'].get('tflite_variant', 'dynamic_int8')
+        tflite_path = quantized_model_path(model_path, variant)
+        if not os.path.exists(tflite_path):
+            with open(tflite_path, 'wb') as f:
+                f.write(convert_to_tflite(model, variant))
+    return model_path
+
+def run(args):
+    engine = args.engine or api.main.config['api'].get('inference_engine', 'keras')
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = prepare_model(args.model_type, args.model, engine, tmp_dir)
+
+        config = dict(api.main.config)
+        config['model'] = dict(config['model'], model_type=args.model_type)
+        config['api'] = dict(config['api'], inference_engine=engine,
+                             prediction_cache=dict(config['api'].get('prediction_cache', {}), enabled=False))
+        config_path = os.path.join(tmp_dir, 'config.yaml')
+        with open(config_path, 'w') as f:
+            yaml.safe_dump(config, f)
+
+        registry = ModelRegistry(config_path=config_path, model_path=model_path)
+        api.routing._router = ModelRouter({"default": registry}, {"default": 1})
+        detector = registry.get_detector()
+
+        rng = np.random.default_rng(0)
+        for batch_size in args.batch_sizes:
+            raw = rng.uniform(0.0, 1.0, size=(batch_size, 31)).astype(np.float32)
+            results[f'features[batch={batch_size}]'] = time_calls(lambda: compute_features(raw), args.repeat, batch_size)
+            results[f'detector[batch={batch_size}]'] = time_calls(lambda: detector.batch_predict(raw), args.repeat, batch_size)
+
+        # /predict as concurrent clients see it, micro-batching included
+        traces = make_traces(args.requests)
+        for concurrency in args.concurrency:
+            latencies, elapsed = asyncio.run(post_concurrently("/predict", traces, concurrency))
+            results[f'api/predict[concurrency={concurrency}]'] = summarize(latencies, len(traces), elapsed)
+
+        for batch_size in args.batch_sizes:
+            body = {"traces": make_traces(batch_size, seed=batch_size)}
+            latencies, elapsed = asyncio.run(post_concurrently("/batch-predict", [body] * args.repeat, 1))
+            results[f'api/batch-predict[batch={batch_size}]'] = summarize(latencies, batch_size * args.repeat, elapsed)
+
+        if not args.skip_cold_start:
+            # Import, model load and first prediction in a fresh process
+            results['cold_start'] = cold_start(config, args.model_type, engine, model_path)
+
+    return {
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'model_type': args.model_type,
+            'model': args.model,
+            'engine': engine,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+        },
+        'results': results,
+    }
+
+def compare(report, baseline, threshold):
+    """Return (benchmark, metric, baseline, current, change) for every metric that got worse by more than threshold"""
+    regressions = []
+    for name, metrics in report['results'].items():
+        for metric, direction in COMPARED_METRICS.items():
+            before = baseline['results'].get(name, {}).get(metric)
+            after = metrics.get(metric)
+            if before is None or after is None or before == 0:
+                continue
+            change = (after - before) / before
+            if (direction == 'lower' and change > threshold) or (direction == 'higher' and change < -threshold):
+                regressions.append((name, metric, before, after, change))
+    return regressions
+
+def print_report(report):
+    print(f"Model type: {report['meta']['model_type']}, engine: {report['meta']['engine']}")
+    print(f"{'benchmark':>38} {'p50 (ms)':>10} {'p95 (ms)':>10} {'p99 (ms)':>10} {'rows/s':>12}")
+    for name, metrics in report['results'].items():
+        if 'p50_ms' in metrics:
+            print(f"{name:>38} {metrics['p50_ms']:>10.3f} {metrics['p95_ms']:>10.3f} {metrics['p99_ms']:>10.3f} {metrics['throughput_rps']:>12.0f}")
+    if 'cold_start' in report['results']:
+        cold = report['results']['cold_start']
+        print(f"Cold start: {cold['seconds']:.2f} s, max RSS {cold['max_rss_mb']:.0f} MB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the prediction service and compare against a stored baseline")
+    parser.add_argument('--model-type', default='lstm', choices=['lstm', 'cnn', 'dense'], help="Architecture to serve")
+    parser.add_argument('--model', default=None, help="Trained .h5 model (defaults to an untrained model of --model-type)")
+    parser.add_argument('--engine', default=None, choices=['keras', 'numpy', 'tflite'], help="Inference engine (defaults to config.yaml)")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 16, 64, 256], help="Batch sizes for the detector and /batch-predict")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16], help="Concurrent /predict clients")
+    parser.add_argument('--requests', type=int, default=200, help="/predict requests per concurrency level")
+    parser.add_argument('--repeat', type=int, default=20, help="Timed calls per batch size")
+    parser.add_argument('--skip-cold-start', action='store_true', help="Do not measure start-up in a fresh process")
+    parser.add_argument('--output', default='bench_results.json', help="Where to write the results as JSON")
+    parser.add_argument('--baseline', default=None, help="Results JSON of an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Relative slowdown reported as a regression")
+    args = parser.parse_args()
+
+    # Keep per-request logging out of the timings
+    logging.disable(logging.INFO)
+    report = run(args)
+    print_report(report)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for name, metric, before, after, change in regressions:
+            print(f"REGRESSION {name} {metric}: {before:.3f} -> {after:.3f} ({change:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions over {args.threshold:.0%} against {args.baseline}")
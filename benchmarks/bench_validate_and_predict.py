@@ -0,0 +1,83 @@
+import os
+import sys
+import time
+import argparse
+import logging
+import tempfile
+import numpy as np
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Add src directory to path for imports; the API reads config.yaml and logs/ from the working directory
+sys.path.append(os.path.join(ROOT, 'src'))
+os.chdir(ROOT)
+os.makedirs('logs', exist_ok=True)
+from fastapi.testclient import TestClient
+import api.main
+import api.routing
+from api import app
+from api.registry import ModelRegistry
+from api.routing import ModelRouter
+from model.numpy_engine import export_numpy_model
+from bench_numpy_engine import build_untrained_model
+
+def cpu_per_trace(func, traces):
+    """Process CPU time per trace of func(trace) over all traces"""
+    start = time.process_time()
+    for trace in traces:
+        func(trace)
+    return (time.process_time() - start) / len(traces)
+
+def run(model_type, n_traces):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Serve an untrained model through the NumPy engine, so the model costs the same in both paths
+        model_path = os.path.join(tmp_dir, 'best_model.h5')
+        export_numpy_model(build_untrained_model(model_type), os.path.join(tmp_dir, 'best_model.npz'))
+        
+        config = dict(api.main.config)
+        config['model'] = dict(config['model'], model_type=model_type)
+        config['api'] = dict(config['api'], inference_engine='numpy')
+        config_path = os.path.join(tmp_dir, 'config.yaml')
+        with open(config_path, 'w') as f:
+            yaml.safe_dump(config, f)
+        
+        registry = ModelRegistry(config_path=config_path, model_path=model_path)
+        api.routing._router = ModelRouter({"default": registry}, {"default": 1})
+        # Score /predict inline: the micro-batching window would only add idle time here
+        api.main.config['api']['micro_batching'] = {'enabled': False}
+        
+        client = TestClient(app)
+        rng = np.random.default_rng(42)
+        traces = [
+            {"snr": round(float(rng.uniform(5.0, 25.0)), 2), "trace_points": np.round(rng.uniform(0.0, 1.0, 30), 4).tolist()}
+            for _ in range(n_traces)
+        ]
+        
+        def separate(trace):
+            client.post("/validation/trace", json=trace)
+            client.post("/predict", json=trace)
+        
+        def fused(trace):
+            client.post("/validate-and-predict", json=trace)
+        
+        # Warm up both paths before timing
+        separate(traces[0])
+        fused(traces[0])
+        
+        separate_cpu = cpu_per_trace(separate, traces)
+        fused_cpu = cpu_per_trace(fused, traces)
+        
+        print(f"Model type: {model_type} (NumPy engine), {n_traces} traces")
+        print(f"  /validation/trace + /predict: {separate_cpu * 1000:.3f} ms CPU per trace")
+        print(f"  /validate-and-predict:        {fused_cpu * 1000:.3f} ms CPU per trace ({fused_cpu / separate_cpu:.0%})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare CPU per trace of separate and fused validation and prediction")
+    parser.add_argument('--model-type', default='lstm', choices=['lstm', 'cnn', 'dense'], help="Architecture to serve")
+    parser.add_argument('--traces', type=int, default=500, help="Number of traces to send")
+    args = parser.parse_args()
+    
+    # Keep per-request logging out of the timings
+    logging.disable(logging.INFO)
+    run(args.model_type, args.traces)
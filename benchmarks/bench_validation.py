@@ -0,0 +1,48 @@
+import os
+import sys
+import time
+import argparse
+import logging
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Add src directory to path for imports; the API reads config.yaml and logs/ from the working directory
+sys.path.append(os.path.join(ROOT, 'src'))
+os.chdir(ROOT)
+os.makedirs('logs', exist_ok=True)
+from fastapi.testclient import TestClient
+from api import app
+
+def make_traces(n_rows, rng):
+    snr = rng.uniform(1.0, 25.0, size=n_rows)
+    points = np.clip(np.cumsum(rng.normal(0.0, 0.2, size=(n_rows, 30)), axis=1) * 0.3 + 0.5, 0.0, 1.0)
+    return [{"snr": float(s), "trace_points": p.tolist()} for s, p in zip(snr, points)]
+
+def run(sizes):
+    client = TestClient(app)
+    rng = np.random.default_rng(42)
+    
+    print(f"{'traces':>8} {'sequential (s)':>15} {'batch (s)':>10} {'speedup':>9}")
+    for n_rows in sizes:
+        traces = make_traces(n_rows, rng)
+        
+        start = time.perf_counter()
+        for trace in traces:
+            client.post("/validation/trace", json=trace)
+        sequential_time = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        client.post("/validation/batch", json={"traces": traces})
+        batch_time = time.perf_counter() - start
+        
+        print(f"{n_rows:>8} {sequential_time:>15.3f} {batch_time:>10.3f} {sequential_time / batch_time:>8.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare N /validation/trace calls with one /validation/batch call")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 10000], help="Numbers of traces to validate")
+    args = parser.parse_args()
+    
+    # Keep per-request access logging out of the timings
+    logging.disable(logging.INFO)
+    run(args.sizes)
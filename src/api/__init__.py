@@ -1,24 +1,20 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-import logging
-import os
+import yaml
 
 # Import routers
 from api.admin import router as admin_router
 from api.validation import router as validation_router
+from api.metrics import REGISTRY, CONTENT_TYPE, MetricsMiddleware
+from api.logs import setup_logging
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler("logs/api.log")
-    ]
-)
+# Load configuration
+with open("config.yaml", "r") as file:
+    config = yaml.safe_load(file)
 
-# Create logs directory if it doesn't exist
-os.makedirs("logs", exist_ok=True)
+# Configure logging: JSON records written to the console and a rotating
+# logs/api.log by a background thread, off the request path
+setup_logging(config)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -36,6 +32,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Count and time every request for /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(admin_router)
 app.include_router(validation_router)
@@ -53,3 +52,8 @@ def read_root():
 def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics: request counts and latency, per-stage prediction timings, batch sizes and model loads"""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
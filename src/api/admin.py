@@ -1,6 +1,7 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel, Field
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import logging
 import yaml
 import os
@@ -9,6 +10,8 @@ import sys
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from model.predict import OTDRFaultDetector
+from api.routing import get_router
+from api.profiling import get_profiler
 
 # Get logger
 logger = logging.getLogger("ftth-api")
@@ -38,18 +41,24 @@ class SystemInfo(BaseModel):
     model_info: ModelInfo = Field(..., description="Model information")
     config: Dict[str, Any] = Field(..., description="System configuration")
 
-# Dependency to get the detector
+class ReloadRequest(BaseModel):
+    """Model for a model reload request"""
+    model_name: Optional[str] = Field(None, description="Name of the model to reload (defaults to the default model)")
+    model_path: Optional[str] = Field(None, description="Path to the new model artifact (defaults to the active model path)")
+
+class ProfilingRequest(BaseModel):
+    """Model for a profiling settings change"""
+    mode: Optional[str] = Field(None, description="off, header (requests sent with X-Profile: 1) or sample")
+    sample_rate: Optional[float] = Field(None, description="Fraction of requests profiled in sample mode")
+    interval_ms: Optional[float] = Field(None, description="Stack sampling interval in milliseconds")
+
+# Dependency to get the active detector of the default model
 def get_detector():
-    global detector
-    if detector is None:
-        try:
-            model_path = config["api"]["model_path"]
-            detector = OTDRFaultDetector(config_path="config.yaml", model_path=model_path)
-            logger.info(f"Initialized fault detector with model from {model_path}")
-        except Exception as e:
-            logger.error(f"Failed to initialize fault detector: {e}")
-            raise HTTPException(status_code=500, detail="Failed to initialize fault detector")
-    return detector
+    try:
+        return get_router(config).get_detector()
+    except Exception as e:
+        logger.error(f"Failed to initialize fault detector: {e}")
+        raise HTTPException(status_code=500, detail="Failed to initialize fault detector")
 
 @router.get("/system-info", response_model=SystemInfo)
 def get_system_info(detector: OTDRFaultDetector = Depends(get_detector)):
@@ -62,7 +71,7 @@ def get_system_info(detector: OTDRFaultDetector = Depends(get_detector)):
             model_type=config["model"]["model_type"],
             input_features=config["model"]["input_features"],
             hidden_layers=config["model"]["hidden_layers"],
-            model_path=config["api"]["model_path"]
+            model_path=get_router(config).registry().model_path
         )
         
         # Create system info
@@ -95,10 +104,130 @@ def get_model_status(detector: OTDRFaultDetector = Depends(get_detector)):
         return {
             "status": "active",
             "model_type": config["model"]["model_type"],
-            "model_path": config["api"]["model_path"],
-            "class_names": detector.class_names
+            "class_names": detector.class_names,
+            **get_router(config).registry().status()
         }
     
     except Exception as e:
         logger.error(f"Error getting model status: {e}")
         raise HTTPException(status_code=500, detail=f"Error getting model status: {str(e)}")
+
+@router.get("/models")
+def get_models():
+    """
+    Get routing weights, status and per-model latency/disagreement counters
+    """
+    return get_router(config).status()
+
+@router.post("/reload-model", status_code=202)
+def reload_model(request: ReloadRequest = ReloadRequest(), wait: bool = False):
+    """
+    Load a new model artifact in the background and swap it in atomically
+    
+    In-flight requests finish on the previous model. Pass wait=true to block
+    until the new model is active.
+    """
+    try:
+        registry = get_router(config).registry(request.model_name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown model: {request.model_name}")
+    model_path = request.model_path or registry.model_path
+    
+    if not registry.reload(model_path, wait=wait):
+        raise HTTPException(status_code=409, detail="A model reload is already in progress")
+    
+    logger.info(f"Model reload requested from {model_path}")
+    return {"status": registry.reload_status, "model_name": request.model_name or get_router(config).default_model, "model_path": model_path}
+
+@router.get("/batching-stats")
+def get_batching_stats():
+    """
+    Get micro-batching statistics for /predict
+    """
+    # Imported here because the prediction router is loaded after the admin router
+    from api.main import batchers
+    
+    if not config["api"].get("micro_batching", {}).get("enabled", False):
+        return {"enabled": False}
+    
+    return {"enabled": True, "models": {name: batcher.stats() for name, batcher in batchers.items()}}
+
+@router.get("/cache-stats")
+def get_cache_stats():
+    """
+    Get prediction cache statistics
+    """
+    detector = get_detector()
+    
+    if detector.cache is None:
+        return {"enabled": False}
+    
+    return {"enabled": True, "model_version": detector.model_version, **detector.cache.stats()}
+
+@router.post("/cache/clear")
+def clear_cache():
+    """
+    Clear the prediction cache
+    """
+    detector = get_detector()
+    
+    if detector.cache is None:
+        return {"enabled": False, "cleared": False}
+    
+    detector.cache.clear()
+    logger.info("Prediction cache cleared")
+    return {"enabled": True, "cleared": True}
+
+@router.get("/profiling")
+def get_profiling_status():
+    """
+    Get request profiling settings and counters
+    """
+    return get_profiler(config).status()
+
+@router.post("/profiling")
+def set_profiling(request: ProfilingRequest):
+    """
+    Turn request profiling on or off for this worker, or change its sampling
+    """
+    profiler = get_profiler(config)
+    try:
+        profiler.configure(request.mode, request.sample_rate, request.interval_ms)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    logger.info(f"Request profiling set to mode {profiler.mode} (sample rate {profiler.sample_rate}, interval {profiler.interval_ms} ms)")
+    return profiler.status()
+
+@router.get("/profile", response_class=PlainTextResponse)
+def get_profile(format: str = Query("collapsed", description="collapsed (flamegraph input) or top"),
+                limit: int = Query(30, description="Number of functions listed by the top format")):
+    """
+    Get the stacks sampled from profiled requests
+    
+    The collapsed format has one "frame;frame;...;frame count" line per
+    distinct stack and loads directly into flamegraph.pl, speedscope or
+    inferno. The top format lists the functions with the most samples.
+    """
+    profiler = get_profiler(config)
+    
+    if format == "collapsed":
+        return profiler.collapsed()
+    
+    if format == "top":
+        samples = max(profiler.status()["samples"], 1)
+        lines = [f"{'own %':>7} {'total %':>8}  function"]
+        for name, own, total in profiler.top(limit):
+            lines.append(f"{own / samples:>7.1%} {total / samples:>8.1%}  {name}")
+        return "\n".join(lines) + "\n"
+    
+    raise HTTPException(status_code=400, detail=f"Unknown profile format: {format}")
+
+@router.post("/profile/clear")
+def clear_profile():
+    """
+    Drop the sampled stacks and reset the profiling counters
+    """
+    get_profiler(config).clear()
+    logger.info("Request profile cleared")
+    return {"cleared": True}
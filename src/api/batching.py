@@ -0,0 +1,167 @@
+import threading
+import queue
+import time
+import logging
+from concurrent.futures import Future
+
+# Get logger
+logger = logging.getLogger("ftth-api")
+
+class _PendingRequest:
+    """A single queued input waiting to be scored"""
+    __slots__ = ("data", "future", "enqueued_at")
+
+    def __init__(self, data):
+        self.data = data
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+class MicroBatcher:
+    """
+    Collects concurrent single-trace requests and scores them in one batched call
+
+    enqueue() returns a concurrent.futures.Future right away, which async
+    callers await through asyncio.wrap_future without holding an event loop
+    or threadpool thread; submit() blocks on it for synchronous callers.
+    Meanwhile a background worker gathers requests for up to max_wait_ms (or
+    until max_batch_size requests are queued), runs predict_fn once on the
+    whole list and resolves each future with its own result.
+    """
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_ms=2.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+
+        # Metrics
+        self._stats_lock = threading.Lock()
+        self._histogram_bounds = self._make_histogram_bounds(max_batch_size)
+        self._batch_size_counts = [0] * len(self._histogram_bounds)
+        self._requests = 0
+        self._batches = 0
+        self._errors = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    @staticmethod
+    def _make_histogram_bounds(max_batch_size):
+        """Power-of-two batch size bucket bounds up to max_batch_size"""
+        bounds = []
+        bound = 1
+        while bound < max_batch_size:
+            bounds.append(bound)
+            bound *= 2
+        bounds.append(max_batch_size)
+        return bounds
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                self._worker.start()
+
+    def enqueue(self, data):
+        """Queue one input and return a concurrent.futures.Future of its prediction"""
+        self._ensure_worker()
+        request = _PendingRequest(data)
+        self._queue.put(request)
+        return request.future
+
+    def submit(self, data, timeout=None):
+        """Queue one input and block until its prediction is available"""
+        return self.enqueue(data).result(timeout=timeout)
+
+    def close(self):
+        """Stop the background worker once queued requests are processed"""
+        if self._worker is not None and self._worker.is_alive():
+            self._queue.put(None)
+            self._worker.join()
+
+    def _collect(self, first):
+        """Gather a batch starting with first, bounded by size and wait window"""
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait
+        stop = False
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                # Once the window has elapsed, only take requests already queued
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                stop = True
+                break
+            batch.append(request)
+
+        return batch, stop
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+
+            batch, stop = self._collect(first)
+            self._dispatch(batch)
+
+            if stop:
+                return
+
+    def _dispatch(self, batch):
+        """Score a batch and resolve the futures of its callers"""
+        started_at = time.perf_counter()
+        waits = [started_at - request.enqueued_at for request in batch]
+
+        try:
+            results = self.predict_fn([request.data for request in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Expected {len(batch)} results, got {len(results)}")
+        except Exception as e:
+            logger.error(f"Micro-batch prediction error: {e}")
+            for request in batch:
+                request.future.set_exception(e)
+            failed = True
+        else:
+            for request, result in zip(batch, results):
+                request.future.set_result(result)
+            failed = False
+
+        self._record(len(batch), waits, failed)
+
+    def _record(self, batch_size, waits, failed):
+        with self._stats_lock:
+            self._requests += batch_size
+            self._batches += 1
+            self._errors += int(failed)
+            self._wait_total += sum(waits)
+            self._wait_max = max(self._wait_max, max(waits))
+            for i, bound in enumerate(self._histogram_bounds):
+                if batch_size <= bound:
+                    self._batch_size_counts[i] += 1
+                    break
+
+    def stats(self):
+        """Return queue depth, batch size histogram and added wait time"""
+        with self._stats_lock:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "queue_depth": self._queue.qsize(),
+                "requests": self._requests,
+                "batches": self._batches,
+                "errors": self._errors,
+                "mean_batch_size": self._requests / self._batches if self._batches else 0.0,
+                # Number of batches per size bucket, keyed by the bucket's inclusive upper bound
+                "batch_size_histogram": {
+                    str(bound): count for bound, count in zip(self._histogram_bounds, self._batch_size_counts)
+                },
+                "mean_wait_ms": self._wait_total / self._requests * 1000.0 if self._requests else 0.0,
+                "max_wait_ms_observed": self._wait_max * 1000.0,
+            }
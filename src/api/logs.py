@@ -0,0 +1,144 @@
+import os
+import json
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+
+from api.metrics import REGISTRY
+
+LOG_RECORDS_DROPPED = REGISTRY.counter(
+    "ftth_log_records_dropped_total", "Log records not written, by reason (sampled, queue_full)", ("reason",)
+)
+
+LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+}
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Attributes every LogRecord has; anything else was passed through extra= and
+# is written as a field of the JSON record
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+class JSONFormatter(logging.Formatter):
+    """Format records as one JSON object per line, with the fields passed through extra="""
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep a fraction of the records of high-volume events
+
+    Records name their event with extra={"event": ...}; events listed in
+    sample_rates are kept with that probability and tagged with the rate so
+    that counts can be scaled back up. Warnings and errors are always kept.
+    """
+    def __init__(self, sample_rates=None):
+        super().__init__()
+        self.sample_rates = dict(sample_rates or {})
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.sample_rates.get(getattr(record, "event", None))
+        if rate is None or rate >= 1.0:
+            return True
+        if random.random() < rate:
+            record.sample_rate = rate
+            return True
+        LOG_RECORDS_DROPPED.inc(reason="sampled")
+        return False
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hand records to the background writer without waiting
+
+    Formatting is left to the writer thread. When the queue is full the
+    record is dropped and counted rather than blocking the request.
+    """
+    def prepare(self, record):
+        # Freeze %-style arguments, which may not be safe to read later; the
+        # rest of the record (extra fields, exc_info) is formatted by the writer
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc(reason="queue_full")
+
+class BackgroundWriter(logging.handlers.QueueListener):
+    """Queue listener whose stop() waits for room in a full queue instead of failing"""
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+_listener = None
+
+def setup_logging(config):
+    """
+    Route API logs through a queue to a background writer
+
+    Records go to the console and to a size-rotated log file, as JSON lines
+    or in the plain text format, per api.logging. The calling thread only
+    filters and enqueues.
+    """
+    global _listener
+    settings = config["api"].get("logging", {})
+    level = LEVELS.get(str(config["api"].get("log_level", "info")).lower(), logging.INFO)
+
+    log_file = settings.get("file", "logs/api.log")
+    os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+
+    formatter = JSONFormatter() if settings.get("format", "json") == "json" else logging.Formatter(TEXT_FORMAT)
+    handlers = [
+        logging.StreamHandler(),
+        logging.handlers.RotatingFileHandler(
+            log_file,
+            maxBytes=settings.get("max_bytes", 100 * 1024 * 1024),
+            backupCount=settings.get("backup_count", 5)
+        )
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    queue_handler = NonBlockingQueueHandler(queue.Queue(settings.get("queue_size", 10000)))
+    queue_handler.addFilter(SamplingFilter(settings.get("sample_rates", {})))
+
+    if _listener is not None:
+        _listener.stop()
+    _listener = BackgroundWriter(queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    return _listener
+
+@atexit.register
+def _flush():
+    # Write out whatever is still queued when the worker exits
+    if _listener is not None:
+        _listener.stop()
@@ -1,16 +1,34 @@
-from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, Field, ValidationError
 from typing import List, Dict, Any, Optional
 import numpy as np
 import pandas as pd
 import yaml
 import os
 import sys
+import json
+import time
+import asyncio
 import logging
+import functools
+from contextlib import nullcontext
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from model.predict import OTDRFaultDetector
+from model.features import compute_features
+from api.batching import MicroBatcher
+from api.routing import get_router
+from api.payloads import (
+    MEDIA_TYPES, RESPONSE_MODES, PayloadError, UnsupportedMediaType,
+    payload_format, response_format, decode_payload, encode_predictions, encode_json_predictions
+)
+from api.streaming import NDJSONStreamingResponse, read_lines
+from api.validation import ValidationResult, validate_features
+from api.metrics import PREDICTION_ERRORS, observe_stage, set_endpoint
+from api.profiling import get_profiler
 
 # Get logger
 logger = logging.getLogger("ftth-api")
@@ -25,8 +43,8 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-# Initialize fault detector
-detector = None
+# Micro-batchers for single-trace predictions, one per model (created on first use if enabled)
+batchers = {}
 
 # Input data models
 class OTDRPoint(BaseModel):
@@ -57,26 +75,158 @@ class BatchFaultPredictions(BaseModel):
     """Model for batch fault prediction results"""
     predictions: List[FaultPrediction] = Field(..., description="List of fault predictions")
 
-# Dependency to get the detector
-def get_detector():
-    global detector
-    if detector is None:
+class ValidatedFaultPrediction(BaseModel):
+    """Model for a validation result with the prediction of a trace that passed validation"""
+    validation: ValidationResult = Field(..., description="Validation result of the trace")
+    prediction: Optional[FaultPrediction] = Field(None, description="Fault prediction, omitted when validation failed")
+
+# Dependency to pick the model serving a request: the one named in the
+# X-Model-Name header, otherwise a weighted choice between configured models
+def get_model_name(x_model_name: Optional[str] = Header(None)):
+    try:
+        return get_router(config).choose(x_model_name)
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Unknown model: {x_model_name}")
+
+# Dependency to get the active detector of the chosen model
+def get_detector(model_name: str = Depends(get_model_name)):
+    try:
+        return get_router(config).get_detector(model_name)
+    except Exception as e:
+        logger.error(f"Failed to initialize fault detector: {e}")
+        raise HTTPException(status_code=500, detail="Failed to initialize fault detector")
+
+# Dependency to get the micro-batcher of the chosen model, or None when micro-batching is disabled
+def get_batcher(model_name: str = Depends(get_model_name), detector: OTDRFaultDetector = Depends(get_detector)):
+    settings = config["api"].get("micro_batching", {})
+    if not settings.get("enabled", False):
+        return None
+    if model_name not in batchers:
+        # Each batch is scored by whichever detector is active when it runs
+        def score_batch(data_list):
+            set_endpoint("predict")
+            return get_router(config).get_detector(model_name).batch_predict(data_list)
+        
+        batchers[model_name] = MicroBatcher(
+            score_batch,
+            max_batch_size=settings.get("max_batch_size", 64),
+            max_wait_ms=settings.get("max_wait_ms", 2.0)
+        )
+        logger.info(f"Initialized micro-batcher for model {model_name} (max batch size {settings.get('max_batch_size', 64)}, window {settings.get('max_wait_ms', 2.0)} ms)")
+    return batchers[model_name]
+
+# Dependency deciding whether to profile a request: never unless profiling is
+# enabled through /admin/profiling, then sampled or asked for with X-Profile
+def get_profiling(x_profile: Optional[str] = Header(None)):
+    return get_profiler(config).should_profile(x_profile)
+
+def profiled_endpoint(func):
+    """Run an endpoint under the request profiler when its profiled dependency says so"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # Runs in the thread that serves the endpoint, which is the one sampled
+        with get_profiler(config).profile() if kwargs.get("profiled") else nullcontext():
+            return func(*args, **kwargs)
+    return wrapper
+
+def start_endpoint(request, endpoint):
+    """Attribute the stages timed in this thread to endpoint and record the request parsing time"""
+    set_endpoint(endpoint)
+    # Set by MetricsMiddleware when the request arrived; covers body parsing and dependencies
+    request_start = getattr(request.state, "request_start", None)
+    if request_start is not None:
+        observe_stage("parse", time.perf_counter() - request_start)
+
+class BatchPayload:
+    """A decoded /batch-predict body: an (N, 31) raw input matrix plus the formats to read and answer in"""
+    def __init__(self, raw, request_format, response_format):
+        self.raw = raw
+        self.request_format = request_format
+        self.response_format = response_format
+
+# Dependency to decode a /batch-predict body. JSON bodies go through the
+# BatchOTDRTraces model; NumPy, Arrow and msgpack bodies are decoded straight
+# into a float matrix and validated as a whole.
+async def read_batch_payload(request: Request):
+    try:
+        fmt = payload_format(request.headers.get("content-type"))
+    except UnsupportedMediaType as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    
+    body = await request.body()
+    if fmt == "json":
         try:
-            model_path = config["api"]["model_path"]
-            detector = OTDRFaultDetector(config_path="config.yaml", model_path=model_path)
-            logger.info(f"Initialized fault detector with model from {model_path}")
-        except Exception as e:
-            logger.error(f"Failed to initialize fault detector: {e}")
-            raise HTTPException(status_code=500, detail="Failed to initialize fault detector")
-    return detector
+            batch_traces = BatchOTDRTraces.parse_raw(body)
+        except ValidationError as e:
+            raise RequestValidationError(e.raw_errors)
+        raw = np.array([[trace.snr, *trace.trace_points] for trace in batch_traces.traces], dtype=np.float32)
+        raw = raw.reshape(len(batch_traces.traces), 31)
+    else:
+        try:
+            raw = decode_payload(body, fmt)
+        except UnsupportedMediaType as e:
+            raise HTTPException(status_code=415, detail=str(e))
+        except PayloadError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    
+    return BatchPayload(raw, fmt, response_format(request.headers.get("accept"), fmt))
+
+class ResponseMode:
+    """The JSON response mode asked for by a prediction request, with its top-k size"""
+    def __init__(self, mode, top_k):
+        self.mode = mode
+        self.top_k = top_k
+
+# Dependency to read the JSON response mode. The full FaultPrediction schema
+# is the default; top_k and array trade it for smaller, faster responses.
+def get_response_mode(response_mode: str = Query("full", description=f"JSON response mode: {', '.join(RESPONSE_MODES)}"),
+                      top_k: int = Query(3, ge=1, le=8, description="Classes returned per trace in top_k mode")):
+    if response_mode not in RESPONSE_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown response mode: {response_mode}")
+    return ResponseMode(response_mode, top_k)
+
+# Request body documentation for /batch-predict, which reads its body itself
+_batch_schema = BatchOTDRTraces.schema()
+_batch_schema["properties"]["traces"]["items"] = _batch_schema.pop("definitions")["OTDRTrace"]
+BATCH_PREDICT_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            MEDIA_TYPES["json"]: {"schema": _batch_schema},
+            MEDIA_TYPES["npy"]: {"schema": {"type": "string", "format": "binary"}},
+            MEDIA_TYPES["arrow"]: {"schema": {"type": "string", "format": "binary"}},
+            MEDIA_TYPES["msgpack"]: {"schema": {"type": "string", "format": "binary"}},
+        },
+    }
+}
 
 # These endpoints are now in __init__.py
 
+def predict_inline(detector, input_data, profiled):
+    """Score one trace in the calling threadpool thread, under the profiler when profiled"""
+    set_endpoint("predict")
+    with get_profiler(config).profile() if profiled else nullcontext():
+        return detector.predict(input_data)
+
 @router.post("/predict", response_model=FaultPrediction)
-def predict(trace: OTDRTrace, detector: OTDRFaultDetector = Depends(get_detector)):
+async def predict(trace: OTDRTrace, request: Request, model_name: str = Depends(get_model_name),
+            detector: OTDRFaultDetector = Depends(get_detector),
+            batcher: Optional[MicroBatcher] = Depends(get_batcher), profiled: bool = Depends(get_profiling),
+            response_mode: ResponseMode = Depends(get_response_mode)):
     """
     Predict fault type from OTDR trace
+    
+    When micro-batching is enabled, concurrent requests are scored together
+    in a single batched model call. The endpoint awaits the batch on the
+    event loop rather than blocking a threadpool worker, so the number of
+    requests waiting on a batch is not capped by the threadpool size.
+    Profiled requests are scored inline in a threadpool thread so that the
+    sampled stacks cover the whole predict path. The top_k and array
+    response modes return a compact prediction instead of the full schema.
     """
+    start_endpoint(request, "predict")
+    model_router = get_router(config)
+    start = time.perf_counter()
     try:
         # Convert input data to the format expected by the model
         input_data = {
@@ -88,68 +238,246 @@ def predict(trace: OTDRTrace, detector: OTDRFaultDetector = Depends(get_detector
             input_data[f'P{i}'] = point
         
         # Make prediction
-        result = detector.predict(input_data)
+        if batcher is not None and not profiled:
+            result = await asyncio.wrap_future(batcher.enqueue(input_data))
+        else:
+            result = await run_in_threadpool(predict_inline, detector, input_data, profiled)
+        
+        # Other requests may have run on the event loop thread while this one waited
+        set_endpoint("predict")
+        
+        model_router.record(model_name, 1, time.perf_counter() - start)
+        model_router.shadow(model_name, [input_data], [result])
+        
+        logger.info(f"Prediction made: {result['fault_name']} with confidence {result['confidence']:.4f}",
+                    extra={"event": "prediction", "model": model_name, "fault_type": result['fault_type'],
+                           "confidence": round(result['confidence'], 4)})
         
         # Create response
+        response_start = time.perf_counter()
+        if response_mode.mode != "full":
+            content = encode_json_predictions([result], detector.class_names, response_mode.mode,
+                                              response_mode.top_k, single=True)
+            observe_stage("response", time.perf_counter() - response_start)
+            return Response(content=content, media_type=MEDIA_TYPES["json"])
+        
         prediction = FaultPrediction(
             fault_type=result['fault_type'],
             fault_name=result['fault_name'],
             confidence=result['confidence'],
             all_probabilities=result['all_probabilities'],
-            # Optional fields are set to None by default
+            # Fault properties are None for Normal traces and models without regression heads
+            location=result.get('location'),
+            reflectance=result.get('reflectance'),
+            loss=result.get('loss'),
         )
-        
-        logger.info(f"Prediction made: {prediction.fault_name} with confidence {prediction.confidence:.4f}")
+        observe_stage("response", time.perf_counter() - response_start)
         
         return prediction
     
     except Exception as e:
+        model_router.record(model_name, 1, time.perf_counter() - start, failed=True)
+        PREDICTION_ERRORS.inc(endpoint="predict")
         logger.error(f"Prediction error: {e}")
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
-@router.post("/batch-predict", response_model=BatchFaultPredictions)
-def batch_predict(batch_traces: BatchOTDRTraces, detector: OTDRFaultDetector = Depends(get_detector)):
+@router.post("/batch-predict", response_model=BatchFaultPredictions, openapi_extra=BATCH_PREDICT_OPENAPI)
+@profiled_endpoint
+def batch_predict(request: Request, payload: BatchPayload = Depends(read_batch_payload),
+                  model_name: str = Depends(get_model_name), detector: OTDRFaultDetector = Depends(get_detector),
+                  profiled: bool = Depends(get_profiling), response_mode: ResponseMode = Depends(get_response_mode)):
     """
     Predict fault types from a batch of OTDR traces
+    
+    Accepts a JSON body, or an (N, 31) float matrix of SNR and P1..P30 as
+    application/x-npy, an Arrow IPC stream or msgpack. Binary requests are
+    answered in the same format unless the Accept header asks for another one.
+    JSON responses are encoded straight from the results in the chosen
+    response mode, without building a Pydantic model per trace.
     """
+    start_endpoint(request, "batch_predict")
+    model_router = get_router(config)
+    start = time.perf_counter()
     try:
-        # Convert input data to the format expected by the model
-        input_data_list = []
-        
-        for trace in batch_traces.traces:
-            input_data = {
-                'SNR': trace.snr
-            }
-            
-            # Add trace points
-            for i, point in enumerate(trace.trace_points, 1):
-                input_data[f'P{i}'] = point
-            
-            input_data_list.append(input_data)
-        
-        # Make batch prediction
-        results = detector.batch_predict(input_data_list)
+        # Make batch prediction on the stacked raw inputs
+        results = detector.batch_predict(payload.raw)
         
-        # Create response
-        predictions = []
-        for result in results:
-            prediction = FaultPrediction(
-                fault_type=result['fault_type'],
-                fault_name=result['fault_name'],
-                confidence=result['confidence'],
-                all_probabilities=result['all_probabilities'],
-                # Optional fields are set to None by default
-            )
-            predictions.append(prediction)
+        model_router.record(model_name, len(results), time.perf_counter() - start)
+        model_router.shadow(model_name, payload.raw, results)
         
-        logger.info(f"Batch prediction made for {len(predictions)} traces")
+        logger.info(f"Batch prediction made for {len(results)} traces",
+                    extra={"event": "batch_prediction", "model": model_name, "traces": len(results)})
         
-        return BatchFaultPredictions(predictions=predictions)
+        response_start = time.perf_counter()
+        if payload.response_format != "json":
+            content = encode_predictions(results, detector.class_names, payload.response_format)
+            observe_stage("response", time.perf_counter() - response_start)
+            return Response(content=content, media_type=MEDIA_TYPES[payload.response_format])
+        
+        # Create response
+        content = encode_json_predictions(results, detector.class_names, response_mode.mode, response_mode.top_k)
+        observe_stage("response", time.perf_counter() - response_start)
+        return Response(content=content, media_type=MEDIA_TYPES["json"])
     
     except Exception as e:
+        model_router.record(model_name, len(payload.raw), time.perf_counter() - start, failed=True)
+        PREDICTION_ERRORS.inc(endpoint="batch_predict")
         logger.error(f"Batch prediction error: {e}")
         raise HTTPException(status_code=500, detail=f"Batch prediction error: {str(e)}")
 
+@router.post("/validate-and-predict", response_model=ValidatedFaultPrediction)
+@profiled_endpoint
+def validate_and_predict(trace: OTDRTrace, request: Request, model_name: str = Depends(get_model_name),
+                         detector: OTDRFaultDetector = Depends(get_detector),
+                         profiled: bool = Depends(get_profiling)):
+    """
+    Validate an OTDR trace and predict its fault type in one call
+    
+    The engineered features are computed once and used both for the
+    /validation/trace checks and as model input. A trace that fails
+    validation is not scored.
+    """
+    start_endpoint(request, "validate_and_predict")
+    model_router = get_router(config)
+    start = time.perf_counter()
+    try:
+        raw = np.array([[trace.snr, *trace.trace_points]], dtype=np.float32)
+        features = compute_features(raw)
+        features_done = time.perf_counter()
+        validation = validate_features(features)[0]
+        observe_stage("shared_features", features_done - start)
+        observe_stage("validation", time.perf_counter() - features_done)
+        
+        if not validation.is_valid:
+            logger.info(f"Trace failed validation, not scored: {'; '.join(validation.errors)}",
+                        extra={"event": "validated_prediction", "model": model_name, "is_valid": False})
+            return ValidatedFaultPrediction(validation=validation)
+        
+        result = detector.predict_with_features(raw, features)[0]
+        
+        model_router.record(model_name, 1, time.perf_counter() - start)
+        model_router.shadow(model_name, raw, [result])
+        
+        prediction = FaultPrediction(
+            fault_type=result['fault_type'],
+            fault_name=result['fault_name'],
+            confidence=result['confidence'],
+            all_probabilities=result['all_probabilities'],
+            location=result.get('location'),
+            reflectance=result.get('reflectance'),
+            loss=result.get('loss'),
+        )
+        
+        logger.info(f"Validated prediction made: {prediction.fault_name} with confidence {prediction.confidence:.4f}",
+                    extra={"event": "validated_prediction", "model": model_name, "fault_type": prediction.fault_type,
+                           "confidence": round(prediction.confidence, 4)})
+        
+        return ValidatedFaultPrediction(validation=validation, prediction=prediction)
+    
+    except Exception as e:
+        model_router.record(model_name, 1, time.perf_counter() - start, failed=True)
+        PREDICTION_ERRORS.inc(endpoint="validate_and_predict")
+        logger.error(f"Validated prediction error: {e}")
+        raise HTTPException(status_code=500, detail=f"Validated prediction error: {str(e)}")
+
+def score_ndjson_lines(lines, detector, model_name):
+    """
+    Parse and score one chunk of NDJSON lines
+    
+    Lines that cannot be parsed, and every line of a chunk whose prediction
+    fails, get an error entry; the other lines are scored in one batch.
+    Returns the NDJSON result lines and the number of lines that failed.
+    """
+    set_endpoint("batch_predict_stream")
+    model_router = get_router(config)
+    parse_start = time.perf_counter()
+    entries = []
+    rows = []
+    for line_number, line in lines:
+        if line is None:
+            entries.append({"line": line_number, "error": "Line too long"})
+            continue
+        try:
+            trace = OTDRTrace.parse_raw(line)
+        except ValidationError as e:
+            entries.append({"line": line_number, "error": "; ".join(
+                f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}" for error in e.errors()
+            )})
+            continue
+        entries.append({"line": line_number})
+        rows.append([trace.snr, *trace.trace_points])
+    observe_stage("parse", time.perf_counter() - parse_start)
+    
+    if rows:
+        start = time.perf_counter()
+        raw = np.array(rows, dtype=np.float32)
+        try:
+            results = detector.batch_predict(raw)
+        except Exception as e:
+            model_router.record(model_name, len(rows), time.perf_counter() - start, failed=True)
+            PREDICTION_ERRORS.inc(endpoint="batch_predict_stream")
+            logger.error(f"Streaming prediction error: {e}")
+            results = [{"error": f"Prediction error: {str(e)}"}] * len(rows)
+        else:
+            model_router.record(model_name, len(rows), time.perf_counter() - start)
+            model_router.shadow(model_name, raw, results)
+        
+        scored = iter(results)
+        for entry in entries:
+            if "error" not in entry:
+                entry.update(next(scored))
+    
+    response_start = time.perf_counter()
+    n_errors = sum("error" in entry for entry in entries)
+    output = "".join(json.dumps(entry) + "\n" for entry in entries).encode()
+    observe_stage("response", time.perf_counter() - response_start)
+    return output, n_errors
+
+async def stream_predictions(body, detector, model_name):
+    """Read NDJSON traces from the request body chunks and yield NDJSON results one chunk at a time"""
+    chunk_size = config["api"].get("stream_chunk_size", 1024)
+    max_line_bytes = config["api"].get("stream_max_line_bytes", 65536)
+    
+    n_lines = 0
+    n_errors = 0
+    pending = []
+    
+    async for line_number, line in read_lines(body, max_line_bytes):
+        if line is not None and not line.strip():
+            continue
+        pending.append((line_number, line))
+        if len(pending) >= chunk_size:
+            # Parsing and inference run in the threadpool so the event loop keeps serving requests
+            output, errors = await run_in_threadpool(score_ndjson_lines, pending, detector, model_name)
+            n_lines += len(pending)
+            n_errors += errors
+            pending = []
+            yield output
+    
+    if pending:
+        output, errors = await run_in_threadpool(score_ndjson_lines, pending, detector, model_name)
+        n_lines += len(pending)
+        n_errors += errors
+        yield output
+    
+    logger.info(f"Streaming batch prediction made for {n_lines - n_errors} traces ({n_errors} errors)",
+                extra={"event": "stream_prediction", "model": model_name, "traces": n_lines - n_errors, "errors": n_errors})
+    yield (json.dumps({"done": True, "lines": n_lines, "predictions": n_lines - n_errors, "errors": n_errors}) + "\n").encode()
+
+@router.post("/batch-predict/stream", response_class=NDJSONStreamingResponse)
+def batch_predict_stream(model_name: str = Depends(get_model_name),
+                         detector: OTDRFaultDetector = Depends(get_detector)):
+    """
+    Predict fault types from newline-delimited JSON traces, streaming the results
+    
+    Each request line is an OTDRTrace object. The upload is read incrementally
+    and scored in chunks of api.stream_chunk_size lines, and one result line
+    per input line is streamed back as soon as its chunk is scored, so memory
+    stays bounded whatever the size of the upload. Malformed lines get an
+    error entry without aborting the stream, and a final summary line closes it.
+    """
+    return NDJSONStreamingResponse(lambda body: stream_predictions(body, detector, model_name))
+
 @router.get("/fault-types")
 def get_fault_types():
     """
@@ -0,0 +1,200 @@
+import bisect
+import threading
+import time
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds, from sub-millisecond stages to slow batch requests
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384)
+LOAD_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic counter, one series per combination of label values"""
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+class Histogram:
+    """
+    Histogram with fixed buckets, one series per combination of label values
+
+    observe() is a bisect and three additions under a lock, cheap enough to
+    call for every stage of every request.
+    """
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (the last one is +Inf), sum and count
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            return series[2] if series is not None else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labelnames, key, ("le", _format_value(float(bound))))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in the Prometheus text format"""
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Process-wide metrics
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "ftth_http_requests_total", "HTTP requests by path, method and status code", ("path", "method", "status")
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "ftth_http_request_duration_seconds", "HTTP request latency by path", ("path",)
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "ftth_stage_duration_seconds",
+    "Time spent in each stage of a prediction (parse, cache, features, model, format, response)",
+    ("endpoint", "stage")
+)
+BATCH_SIZE = REGISTRY.histogram(
+    "ftth_model_batch_size", "Traces per model call", buckets=BATCH_SIZE_BUCKETS
+)
+PREDICTED_TRACES = REGISTRY.counter(
+    "ftth_predicted_traces_total", "Traces scored by the model"
+)
+PREDICTION_ERRORS = REGISTRY.counter(
+    "ftth_prediction_errors_total", "Failed prediction requests by endpoint", ("endpoint",)
+)
+MODEL_LOADS = REGISTRY.counter(
+    "ftth_model_loads_total", "Model loads and reloads by outcome", ("status",)
+)
+MODEL_LOAD_SECONDS = REGISTRY.histogram(
+    "ftth_model_load_seconds", "Time to load and warm up a model", buckets=LOAD_BUCKETS
+)
+
+# Endpoint whose request is being handled by the current thread, so that
+# detector stages can be attributed to it
+_current = threading.local()
+
+def set_endpoint(endpoint):
+    _current.endpoint = endpoint
+
+def observe_stage(stage, seconds, n_rows=None):
+    """Record the duration of one prediction stage (the stage observer of OTDRFaultDetector)"""
+    STAGE_SECONDS.observe(seconds, endpoint=getattr(_current, "endpoint", "other"), stage=stage)
+    if stage == "model" and n_rows is not None:
+        BATCH_SIZE.observe(n_rows)
+        PREDICTED_TRACES.inc(n_rows)
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting requests and timing them by path
+
+    The request start time is stored in the request state so that endpoints
+    can time the parsing done before they are called.
+    """
+    def __init__(self, app):
+        self.app = app
+        self._paths = None
+
+    def _path_label(self, scope):
+        if self._paths is None:
+            self._paths = {route.path for route in scope["app"].routes}
+        return scope["path"] if scope["path"] in self._paths else "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        scope.setdefault("state", {})["request_start"] = start
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            path = self._path_label(scope)
+            HTTP_REQUESTS.inc(path=path, method=scope["method"], status=str(status[0]))
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, path=path)
@@ -0,0 +1,304 @@
+import io
+import os
+import sys
+import json
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model.features import RAW_COLUMNS, REGRESSION_OUTPUTS
+
+# Media types accepted by /batch-predict in addition to JSON, by payload format
+MEDIA_TYPES = {
+    "json": "application/json",
+    "npy": "application/x-npy",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "msgpack": "application/msgpack",
+}
+
+_FORMATS_BY_MEDIA_TYPE = {
+    "application/json": "json",
+    "application/x-npy": "npy",
+    "application/vnd.apache.arrow.stream": "arrow",
+    "application/vnd.apache.arrow.file": "arrow",
+    "application/msgpack": "msgpack",
+    "application/x-msgpack": "msgpack",
+}
+
+# JSON response modes of the prediction endpoints: the FaultPrediction schema,
+# the k most likely classes per trace, or columns of fault types, confidences
+# and probability rows in the order of a class list sent once
+RESPONSE_MODES = ("full", "top_k", "array")
+
+class PayloadError(ValueError):
+    """Raised when a binary payload cannot be decoded or fails validation"""
+
+class UnsupportedMediaType(ValueError):
+    """Raised for a content type (or a missing optional dependency) that cannot be handled"""
+
+def payload_format(content_type):
+    """Map a Content-Type header to a payload format, defaulting to JSON"""
+    if not content_type:
+        return "json"
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type not in _FORMATS_BY_MEDIA_TYPE:
+        raise UnsupportedMediaType(f"Unsupported content type: {media_type}")
+    return _FORMATS_BY_MEDIA_TYPE[media_type]
+
+def response_format(accept, request_format):
+    """Pick the response format: a supported type named in Accept, else the request format"""
+    for part in (accept or "").split(","):
+        media_type = part.split(";")[0].strip().lower()
+        if media_type in _FORMATS_BY_MEDIA_TYPE:
+            return _FORMATS_BY_MEDIA_TYPE[media_type]
+    return request_format
+
+def validate_raw(raw):
+    """
+    Apply the /batch-predict input rules to a whole (N, 31) matrix at once
+
+    Equivalent to validating every trace of a JSON batch: an SNR plus exactly
+    30 trace points per row, all of them finite numbers.
+    """
+    if raw.ndim != 2 or raw.shape[1] != len(RAW_COLUMNS):
+        raise PayloadError(f"Expected a matrix of shape (N, {len(RAW_COLUMNS)}) (SNR, P1..P30), got {raw.shape}")
+
+    finite = np.isfinite(raw)
+    if not finite.all():
+        row, col = np.argwhere(~finite)[0]
+        raise PayloadError(f"Non-finite value in row {row}, column {RAW_COLUMNS[col]}")
+
+    return raw
+
+def _as_float_matrix(array):
+    """Check the dtype of a decoded array, converting only when it is not float32 already"""
+    if array.dtype.hasobject or array.dtype.kind not in "fiu":
+        raise PayloadError(f"Expected a numeric matrix, got dtype {array.dtype}")
+    return validate_raw(array.astype(np.float32, copy=False))
+
+def decode_npy(body):
+    """Decode an .npy body without copying: the array is a view of the request bytes"""
+    stream = io.BytesIO(body)
+    try:
+        version = np.lib.format.read_magic(stream)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(stream)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(stream)
+    except ValueError as e:
+        raise PayloadError(f"Invalid .npy payload: {e}")
+
+    if dtype.hasobject:
+        raise PayloadError("Object arrays are not accepted")
+
+    count = int(np.prod(shape))
+    if len(body) - stream.tell() < count * dtype.itemsize:
+        raise PayloadError("Truncated .npy payload")
+
+    array = np.frombuffer(body, dtype=dtype, count=count, offset=stream.tell())
+    return _as_float_matrix(array.reshape(shape, order="F" if fortran_order else "C"))
+
+def decode_arrow(body):
+    """Decode an Arrow IPC stream or file with one float column per raw input (SNR, P1..P30)"""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise UnsupportedMediaType("Arrow payloads require pyarrow to be installed")
+
+    try:
+        try:
+            table = pa.ipc.open_stream(body).read_all()
+        except pa.ArrowInvalid:
+            table = pa.ipc.open_file(body).read_all()
+    except pa.ArrowInvalid as e:
+        raise PayloadError(f"Invalid Arrow payload: {e}")
+
+    missing = [col for col in RAW_COLUMNS if col not in table.column_names]
+    if missing:
+        raise PayloadError(f"Missing required column: {missing[0]}")
+
+    # Columns are copied once into the row-major matrix used by the feature code
+    raw = np.empty((table.num_rows, len(RAW_COLUMNS)), dtype=np.float32)
+    for i, col in enumerate(RAW_COLUMNS):
+        column = table.column(col)
+        if column.null_count:
+            raise PayloadError(f"Null value in column {col}")
+        raw[:, i] = column.to_numpy()
+    return validate_raw(raw)
+
+def decode_msgpack(body):
+    """
+    Decode a msgpack body
+
+    Either a map {"shape": [N, 31], "dtype": "<f4", "data": <bin>} whose data is
+    viewed without copying, or an array of N rows of 31 numbers.
+    """
+    try:
+        import msgpack
+    except ImportError:
+        raise UnsupportedMediaType("msgpack payloads require msgpack to be installed")
+
+    try:
+        payload = msgpack.unpackb(body, raw=False)
+    except Exception as e:
+        raise PayloadError(f"Invalid msgpack payload: {e}")
+
+    if isinstance(payload, dict):
+        try:
+            dtype = np.dtype(payload.get("dtype", "<f4"))
+            shape = tuple(payload["shape"])
+            data = payload["data"]
+        except (KeyError, TypeError) as e:
+            raise PayloadError(f"Invalid msgpack matrix: {e}")
+        if dtype.hasobject or not isinstance(data, bytes):
+            raise PayloadError("msgpack matrix data must be a binary field of numbers")
+        try:
+            array = np.frombuffer(data, dtype=dtype).reshape(shape)
+        except (TypeError, ValueError):
+            raise PayloadError(f"msgpack matrix data does not match shape {shape} and dtype {dtype}")
+        return _as_float_matrix(array)
+
+    try:
+        raw = np.array(payload, dtype=np.float32)
+    except (TypeError, ValueError) as e:
+        raise PayloadError(f"Invalid msgpack rows: {e}")
+    if raw.size == 0:
+        raw = raw.reshape(0, len(RAW_COLUMNS))
+    return validate_raw(raw)
+
+DECODERS = {
+    "npy": decode_npy,
+    "arrow": decode_arrow,
+    "msgpack": decode_msgpack,
+}
+
+def decode_payload(body, fmt):
+    """Decode a binary request body into a validated (N, 31) float32 matrix"""
+    return DECODERS[fmt](body)
+
+def _probability_matrix(results, class_names):
+    probs = np.empty((len(results), len(class_names)), dtype=np.float32)
+    for row, result in zip(probs, results):
+        row[:] = [result['all_probabilities'][name] for name in class_names]
+    return probs
+
+def _has_regression(results):
+    # Results of models with regression heads carry location, reflectance and loss
+    return len(results) > 0 and REGRESSION_OUTPUTS[0] in results[0]
+
+def encode_predictions(results, class_names, fmt):
+    """
+    Encode prediction results in a binary format
+
+    npy: an (N, n_classes) float32 matrix of class probabilities, columns in
+    fault type order. arrow: a table with fault_type, fault_name, confidence
+    and one probability column per class. msgpack: a map with fault_type and
+    confidence arrays, the class names and the probability matrix as a
+    {"shape", "dtype", "data"} map. Arrow and msgpack responses also carry
+    location, reflectance and loss (null for Normal traces) when the model
+    estimates them.
+    """
+    probs = _probability_matrix(results, class_names)
+    fault_types = np.array([result['fault_type'] for result in results], dtype=np.int8)
+    confidences = np.array([result['confidence'] for result in results], dtype=np.float32)
+
+    if fmt == "npy":
+        buffer = io.BytesIO()
+        np.lib.format.write_array(buffer, probs, allow_pickle=False)
+        return buffer.getvalue()
+
+    if fmt == "arrow":
+        import pyarrow as pa
+        columns = {
+            "fault_type": pa.array(fault_types),
+            "fault_name": pa.array([result['fault_name'] for result in results], type=pa.string()),
+            "confidence": pa.array(confidences),
+        }
+        for i, name in enumerate(class_names):
+            columns[name] = pa.array(probs[:, i])
+        if _has_regression(results):
+            for name in REGRESSION_OUTPUTS:
+                columns[name] = pa.array([result[name] for result in results], type=pa.float32())
+        table = pa.table(columns)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    if fmt == "msgpack":
+        import msgpack
+        body = {
+            "classes": list(class_names),
+            "fault_type": fault_types.tolist(),
+            "confidence": confidences.tolist(),
+            "probabilities": {"shape": list(probs.shape), "dtype": "<f4", "data": probs.tobytes()},
+        }
+        if _has_regression(results):
+            for name in REGRESSION_OUTPUTS:
+                body[name] = [result[name] for result in results]
+        return msgpack.packb(body, use_bin_type=True)
+
+    raise ValueError(f"Unsupported response format: {fmt}")
+
+def _full_prediction(result):
+    # Same fields, in the same order, as the FaultPrediction model
+    return {
+        "fault_type": result['fault_type'],
+        "fault_name": result['fault_name'],
+        "confidence": result['confidence'],
+        "all_probabilities": result['all_probabilities'],
+        "location": result.get('location'),
+        "reflectance": result.get('reflectance'),
+        "loss": result.get('loss'),
+    }
+
+def _top_k_prediction(result, k):
+    probabilities = result['all_probabilities']
+    top = sorted(probabilities, key=probabilities.get, reverse=True)[:k]
+    prediction = {
+        "fault_type": result['fault_type'],
+        "fault_name": result['fault_name'],
+        "confidence": result['confidence'],
+        "top_k": {name: probabilities[name] for name in top},
+    }
+    for name in REGRESSION_OUTPUTS:
+        if name in result:
+            prediction[name] = result[name]
+    return prediction
+
+def encode_json_predictions(results, class_names, mode="full", top_k=3, single=False):
+    """
+    Encode prediction results as a JSON body without building Pydantic models
+
+    full: the FaultPrediction schema (a {"predictions": [...]} list, or one
+    prediction when single). top_k: fault type, name and confidence plus the
+    top_k most likely classes and their probabilities. array: the class
+    names once, then fault_type, confidence and probabilities (rows in class
+    order) as arrays, or as scalars and one row when single. Compact modes
+    include location, reflectance and loss only when the model estimates them.
+    """
+    if mode == "full":
+        body = [_full_prediction(result) for result in results]
+    elif mode == "top_k":
+        body = [_top_k_prediction(result, top_k) for result in results]
+    elif mode == "array":
+        body = {
+            "classes": list(class_names),
+            "fault_type": [result['fault_type'] for result in results],
+            "confidence": [result['confidence'] for result in results],
+            "probabilities": [
+                [result['all_probabilities'][name] for name in class_names] for result in results
+            ],
+        }
+        if _has_regression(results):
+            for name in REGRESSION_OUTPUTS:
+                body[name] = [result[name] for result in results]
+        if single:
+            body = {key: value if key == "classes" else value[0] for key, value in body.items()}
+    else:
+        raise ValueError(f"Unsupported response mode: {mode}")
+
+    if mode != "array":
+        body = body[0] if single else {"predictions": body}
+    # Same separators as FastAPI's JSONResponse
+    return json.dumps(body, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
@@ -0,0 +1,167 @@
+import os
+import sys
+import time
+import random
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+# Profiling modes: off, every request with a truthy X-Profile header, or a random sample of requests
+PROFILING_MODES = ("off", "header", "sample")
+
+def _collapse(frame):
+    """Render a frame and its callers as a collapsed stack (root first, frames separated by ';')"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+class SamplingProfiler:
+    """
+    Sampling profiler for selected requests of a live worker
+
+    While a profiled request is in flight, a background thread samples the
+    stack of the thread serving it every interval_ms and counts identical
+    stacks. No sampler runs when nothing is being profiled, so an idle
+    profiler costs nothing. The aggregate is served as collapsed stacks,
+    the input format of flamegraph.pl, speedscope and inferno.
+    """
+    def __init__(self, mode="off", sample_rate=0.01, interval_ms=1.0, max_stacks=10000):
+        self.mode = "off"
+        self.sample_rate = 0.0
+        self.interval_ms = interval_ms
+        self.max_stacks = max_stacks
+        self.configure(mode, sample_rate, interval_ms)
+
+        self._stacks = Counter()
+        self._active = {}
+        self._lock = threading.Lock()
+        self._sampler = None
+
+        # Counters
+        self.profiled_requests = 0
+        self.samples = 0
+        self.dropped_samples = 0
+
+    def configure(self, mode=None, sample_rate=None, interval_ms=None):
+        """Change the profiling mode, sampling rate or sampling interval"""
+        if mode is not None:
+            if mode not in PROFILING_MODES:
+                raise ValueError(f"Unknown profiling mode: {mode} (expected one of {', '.join(PROFILING_MODES)})")
+            self.mode = mode
+        if sample_rate is not None:
+            if not 0.0 <= sample_rate <= 1.0:
+                raise ValueError("sample_rate must be between 0 and 1")
+            self.sample_rate = sample_rate
+        if interval_ms is not None:
+            if interval_ms <= 0:
+                raise ValueError("interval_ms must be positive")
+            self.interval_ms = interval_ms
+
+    def should_profile(self, header_value=None):
+        """Decide whether to profile a request, given the value of its X-Profile header"""
+        if self.mode == "off":
+            return False
+        if header_value is not None and header_value.lower() in ("1", "true", "yes"):
+            return True
+        return self.mode == "sample" and random.random() < self.sample_rate
+
+    @contextmanager
+    def profile(self):
+        """Sample the calling thread's stack until the block exits"""
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._active[thread_id] = self._active.get(thread_id, 0) + 1
+            self.profiled_requests += 1
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample, name="profiler", daemon=True)
+                self._sampler.start()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active[thread_id] -= 1
+                if not self._active[thread_id]:
+                    del self._active[thread_id]
+
+    def _sample(self):
+        sampler_id = threading.get_ident()
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._sampler = None
+                    return
+                thread_ids = list(self._active)
+
+            frames = sys._current_frames()
+            stacks = [_collapse(frames[thread_id]) for thread_id in thread_ids
+                      if thread_id in frames and thread_id != sampler_id]
+
+            with self._lock:
+                for stack in stacks:
+                    if stack in self._stacks or len(self._stacks) < self.max_stacks:
+                        self._stacks[stack] += 1
+                    else:
+                        self.dropped_samples += 1
+                self.samples += len(stacks)
+
+            time.sleep(self.interval_ms / 1000.0)
+
+    def collapsed(self):
+        """Aggregated samples as collapsed stacks, one 'frame;frame;frame count' line per stack"""
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+    def top(self, limit=30):
+        """Functions with the most samples, as (function, own samples, samples including callees)"""
+        own = Counter()
+        total = Counter()
+        with self._lock:
+            for stack, count in self._stacks.items():
+                frames = stack.split(";")
+                own[frames[-1]] += count
+                for name in set(frames):
+                    total[name] += count
+        return [(name, own[name], total[name]) for name, _ in own.most_common(limit)]
+
+    def clear(self):
+        """Drop the aggregated samples and reset the counters"""
+        with self._lock:
+            self._stacks.clear()
+            self.profiled_requests = 0
+            self.samples = 0
+            self.dropped_samples = 0
+
+    def status(self):
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "sample_rate": self.sample_rate,
+                "interval_ms": self.interval_ms,
+                "profiled_requests": self.profiled_requests,
+                "in_flight": sum(self._active.values()),
+                "samples": self.samples,
+                "distinct_stacks": len(self._stacks),
+                "dropped_samples": self.dropped_samples,
+            }
+
+# Process-wide profiler, configured from api.profiling and changed at runtime through /admin/profiling
+_profiler = None
+_profiler_lock = threading.Lock()
+
+def get_profiler(config):
+    """Return the process-wide request profiler for the given configuration"""
+    global _profiler
+    if _profiler is None:
+        with _profiler_lock:
+            if _profiler is None:
+                settings = config["api"].get("profiling", {})
+                _profiler = SamplingProfiler(
+                    mode=settings.get("mode", "off"),
+                    sample_rate=settings.get("sample_rate", 0.01),
+                    interval_ms=settings.get("interval_ms", 1.0),
+                    max_stacks=settings.get("max_stacks", 10000)
+                )
+    return _profiler
@@ -0,0 +1,158 @@
+import os
+import sys
+import threading
+import time
+import logging
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model.predict import OTDRFaultDetector
+from api.metrics import MODEL_LOADS, MODEL_LOAD_SECONDS, observe_stage
+
+# Get logger
+logger = logging.getLogger("ftth-api")
+
+class ModelRegistry:
+    """
+    Process-wide holder of the active fault detector
+
+    The model is loaded once per worker. Reloads build and warm up a new
+    detector in the background and then swap it in with a single reference
+    assignment: requests that already hold the previous detector finish on
+    it, new requests get the new one.
+    """
+    def __init__(self, config_path, model_path, watch_interval=0, model_type=None):
+        self.config_path = config_path
+        self.model_path = model_path
+        self.model_type = model_type
+        self.watch_interval = watch_interval
+
+        self._detector = None
+        self._load_lock = threading.Lock()
+        self._reload_thread = None
+        self._watch_thread = None
+
+        # Status of the active model and of the most recent reload
+        self.loaded_at = None
+        self.load_seconds = None
+        self.reload_status = "idle"
+        self.reload_error = None
+        self._watched_mtime = None
+
+    def _build_detector(self, model_path):
+        """Load and warm up a detector, raising if the model could not be loaded"""
+        start = time.perf_counter()
+        detector = OTDRFaultDetector(config_path=self.config_path, model_path=model_path, model_type=self.model_type)
+        if detector.model is None:
+            MODEL_LOADS.inc(status="failed")
+            raise RuntimeError(f"Could not load model from {model_path}")
+        detector.warm_up()
+        load_seconds = time.perf_counter() - start
+        
+        MODEL_LOADS.inc(status="succeeded")
+        MODEL_LOAD_SECONDS.observe(load_seconds)
+        # Stage timings are recorded from the first real request, not the warm-up
+        detector.stage_observer = observe_stage
+        return detector, load_seconds
+
+    def _activate(self, detector, model_path, load_seconds):
+        self._detector = detector
+        self.model_path = model_path
+        self.loaded_at = time.time()
+        self.load_seconds = load_seconds
+        self._watched_mtime = self._model_mtime()
+        logger.info(f"Activated model version {detector.model_version} from {model_path} (loaded in {load_seconds:.2f}s)")
+
+    def get_detector(self):
+        """Return the active detector, loading it on first use"""
+        detector = self._detector
+        if detector is not None:
+            return detector
+
+        with self._load_lock:
+            if self._detector is None:
+                detector, load_seconds = self._build_detector(self.model_path)
+                self._activate(detector, self.model_path, load_seconds)
+                self._start_watcher()
+            return self._detector
+
+    def reload(self, model_path=None, wait=False):
+        """
+        Load a new model artifact in the background and swap it in when ready
+
+        Returns False if a reload is already in progress.
+        """
+        if model_path is None:
+            model_path = self.model_path
+
+        with self._load_lock:
+            if self.reload_status == "loading":
+                return False
+            self.reload_status = "loading"
+            self.reload_error = None
+            self._reload_thread = threading.Thread(
+                target=self._reload, args=(model_path,), name="model-reload", daemon=True
+            )
+            self._reload_thread.start()
+
+        if wait:
+            self._reload_thread.join()
+        return True
+
+    def _reload(self, model_path):
+        try:
+            detector, load_seconds = self._build_detector(model_path)
+        except Exception as e:
+            logger.error(f"Model reload from {model_path} failed, keeping the active model: {e}")
+            with self._load_lock:
+                self.reload_status = "failed"
+                self.reload_error = str(e)
+            return
+
+        with self._load_lock:
+            self._activate(detector, model_path, load_seconds)
+            self.reload_status = "succeeded"
+
+    def _watched_path(self):
+        """The file the active model was actually loaded from (e.g. the .npz for the numpy engine)"""
+        detector = self._detector
+        if detector is not None and detector.loaded_model_path is not None:
+            return detector.loaded_model_path
+        return self.model_path
+
+    def _model_mtime(self):
+        try:
+            return os.path.getmtime(self._watched_path())
+        except OSError:
+            return None
+
+    def _start_watcher(self):
+        """Poll the model file and reload it when it changes"""
+        if self.watch_interval <= 0 or self._watch_thread is not None:
+            return
+        self._watch_thread = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+        self._watch_thread.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.watch_interval)
+            mtime = self._model_mtime()
+            if mtime is not None and mtime != self._watched_mtime:
+                logger.info(f"Model file {self._watched_path()} changed, reloading")
+                self._watched_mtime = mtime
+                self.reload()
+
+    def status(self):
+        """Describe the active model and the most recent reload"""
+        detector = self._detector
+        return {
+            "loaded": detector is not None,
+            "model_version": detector.model_version if detector is not None else None,
+            "model_type": detector.model_type if detector is not None else self.model_type,
+            "model_path": self.model_path,
+            "loaded_at": self.loaded_at,
+            "load_seconds": self.load_seconds,
+            "reload_status": self.reload_status,
+            "reload_error": self.reload_error,
+            "watch_interval_seconds": self.watch_interval,
+        }
@@ -0,0 +1,200 @@
+import random
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from api.registry import ModelRegistry
+from api.metrics import set_endpoint
+
+# Get logger
+logger = logging.getLogger("ftth-api")
+
+class ModelStats:
+    """Thread-safe request, error and latency counters for one model"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.traces = 0
+        self.errors = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+        # Shadow comparison against the model that served the request
+        self.shadow_compared = 0
+        self.shadow_disagreements = 0
+        self.shadow_dropped = 0
+
+    def record(self, n_traces, seconds, failed=False):
+        with self._lock:
+            self.requests += 1
+            self.traces += n_traces
+            self.errors += int(failed)
+            self.latency_total += seconds
+            self.latency_max = max(self.latency_max, seconds)
+
+    def record_comparison(self, compared, disagreements):
+        with self._lock:
+            self.shadow_compared += compared
+            self.shadow_disagreements += disagreements
+
+    def record_dropped(self):
+        with self._lock:
+            self.shadow_dropped += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "traces": self.traces,
+                "errors": self.errors,
+                "mean_latency_ms": self.latency_total / self.requests * 1000.0 if self.requests else 0.0,
+                "max_latency_ms": self.latency_max * 1000.0,
+                "shadow_compared": self.shadow_compared,
+                "shadow_disagreements": self.shadow_disagreements,
+                "shadow_disagreement_rate": (
+                    self.shadow_disagreements / self.shadow_compared if self.shadow_compared else 0.0
+                ),
+                "shadow_dropped": self.shadow_dropped,
+            }
+
+class ModelRouter:
+    """
+    Holds several named models and decides which one serves each request
+
+    Traffic is split by weight unless the caller names a model explicitly.
+    An optional shadow model scores a copy of production traffic on a
+    background thread, off the request path, and its predictions are compared
+    with those returned to the caller.
+    """
+    def __init__(self, registries, weights, shadow_model=None, shadow_max_pending=100):
+        if not registries:
+            raise ValueError("At least one model must be configured")
+        if shadow_model is not None and shadow_model not in registries:
+            raise ValueError(f"Unknown shadow model: {shadow_model}")
+
+        self.registries = registries
+        self.weights = weights
+        self.default_model = next(iter(registries))
+        self.shadow_model = shadow_model
+        self.shadow_max_pending = shadow_max_pending
+
+        self.stats = {name: ModelStats() for name in registries}
+
+        self._shadow_executor = None
+        self._shadow_pending = 0
+        self._shadow_lock = threading.Lock()
+
+    def choose(self, requested_model=None):
+        """Pick the model for a request: the requested one, else a weighted random choice"""
+        if requested_model is not None:
+            if requested_model not in self.registries:
+                raise KeyError(requested_model)
+            return requested_model
+
+        names = [name for name in self.registries if self.weights.get(name, 0) > 0]
+        if not names:
+            return self.default_model
+        return random.choices(names, weights=[self.weights[name] for name in names])[0]
+
+    def registry(self, model_name=None):
+        return self.registries[model_name or self.default_model]
+
+    def get_detector(self, model_name=None):
+        return self.registry(model_name).get_detector()
+
+    def record(self, model_name, n_traces, seconds, failed=False):
+        self.stats[model_name].record(n_traces, seconds, failed)
+
+    def shadow(self, model_name, data_list, results):
+        """Queue a copy of a served request for scoring by the shadow model"""
+        if self.shadow_model is None or self.shadow_model == model_name:
+            return
+
+        with self._shadow_lock:
+            if self._shadow_pending >= self.shadow_max_pending:
+                # Never let shadow traffic build up behind production traffic
+                self.stats[self.shadow_model].record_dropped()
+                return
+            self._shadow_pending += 1
+            if self._shadow_executor is None:
+                self._shadow_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+
+        served_types = [result['fault_type'] for result in results]
+        # Decoded binary payloads arrive as a read-only (N, 31) matrix and are shared as is
+        if not isinstance(data_list, np.ndarray):
+            data_list = list(data_list)
+        self._shadow_executor.submit(self._score_shadow, data_list, served_types)
+
+    def _score_shadow(self, data_list, served_types):
+        set_endpoint("shadow")
+        start = time.perf_counter()
+        try:
+            shadow_results = self.get_detector(self.shadow_model).batch_predict(data_list)
+        except Exception as e:
+            logger.error(f"Shadow prediction error ({self.shadow_model}): {e}")
+            self.record(self.shadow_model, len(data_list), time.perf_counter() - start, failed=True)
+        else:
+            self.record(self.shadow_model, len(data_list), time.perf_counter() - start)
+            disagreements = sum(
+                shadow['fault_type'] != served for shadow, served in zip(shadow_results, served_types)
+            )
+            self.stats[self.shadow_model].record_comparison(len(served_types), disagreements)
+        finally:
+            with self._shadow_lock:
+                self._shadow_pending -= 1
+
+    def status(self):
+        """Per-model status, routing weight and counters"""
+        return {
+            "default_model": self.default_model,
+            "shadow_model": self.shadow_model,
+            "models": {
+                name: {
+                    "weight": self.weights.get(name, 0),
+                    **registry.status(),
+                    "stats": self.stats[name].snapshot(),
+                }
+                for name, registry in self.registries.items()
+            },
+        }
+
+def build_router(config, config_path="config.yaml"):
+    """Create a router from the api section of the configuration"""
+    api_config = config["api"]
+    watch_interval = api_config.get("model_watch_interval_seconds", 0)
+
+    # Without a models list, the single api.model_path is served as "default"
+    models = api_config.get("models") or [{"name": "default", "model_path": api_config["model_path"], "weight": 1}]
+
+    registries = {}
+    weights = {}
+    for model in models:
+        registries[model["name"]] = ModelRegistry(
+            config_path=config_path,
+            model_path=model["model_path"],
+            watch_interval=watch_interval,
+            model_type=model.get("model_type")
+        )
+        weights[model["name"]] = model.get("weight", 1)
+
+    return ModelRouter(
+        registries,
+        weights,
+        shadow_model=api_config.get("shadow_model"),
+        shadow_max_pending=api_config.get("shadow_max_pending", 100)
+    )
+
+# Process-wide router, created on first use
+_router = None
+_router_lock = threading.Lock()
+
+def get_router(config):
+    """Return the process-wide model router for the given configuration"""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = build_router(config)
+    return _router
@@ -0,0 +1,76 @@
+import anyio
+from starlette.responses import StreamingResponse
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    Streaming response generated from the request body as it arrives
+
+    body_stream is called with an async iterator of the request body chunks
+    and returns the async iterator of the response body. StreamingResponse
+    listens for a client disconnect while it streams, which consumes the
+    request body messages; here the listener hands the body chunks on to
+    body_stream instead of dropping them. A disconnect still stops the
+    stream, and a background task still runs once the response is sent.
+    """
+    media_type = "application/x-ndjson"
+
+    def __init__(self, body_stream, **kwargs):
+        # Unbuffered, so the upload is only read as fast as it is scored
+        self._send_chunk, self._receive_chunk = anyio.create_memory_object_stream(0)
+        super().__init__(body_stream(self._request_chunks()), **kwargs)
+
+    async def _request_chunks(self):
+        async with self._receive_chunk:
+            async for chunk in self._receive_chunk:
+                yield chunk
+
+    async def listen_for_disconnect(self, receive):
+        body_complete = False
+        try:
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    break
+                if message["type"] != "http.request" or body_complete:
+                    continue
+                try:
+                    if message.get("body"):
+                        await self._send_chunk.send(message["body"])
+                except anyio.BrokenResourceError:
+                    # body_stream stopped reading the upload; keep listening for a disconnect
+                    pass
+                if not message.get("more_body", False):
+                    body_complete = True
+                    self._send_chunk.close()
+        finally:
+            self._send_chunk.close()
+
+async def read_lines(chunks, max_line_bytes=65536):
+    """
+    Split an async iterator of byte chunks into numbered lines
+
+    Yields (line_number, line) with line numbers starting at 1. A line longer
+    than max_line_bytes is yielded as None, wherever the chunks split it. Its
+    bytes are dropped as they arrive, so memory stays bounded by one chunk
+    plus one line.
+    """
+    buffer = b""
+    line_number = 0
+    too_long = False
+
+    async for chunk in chunks:
+        buffer += chunk
+        lines = buffer.split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            line_number += 1
+            # Whether or not the line was split across chunks
+            yield line_number, None if too_long or len(line) > max_line_bytes else line
+            too_long = False
+
+        if len(buffer) > max_line_bytes:
+            too_long = True
+            buffer = b""
+
+    if buffer or too_long:
+        yield line_number + 1, None if too_long else buffer
@@ -4,6 +4,12 @@ from typing import List, Dict, Any, Optional
 import numpy as np
 import pandas as pd
 import logging
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model.features import FEATURE_COLUMNS, TRACE_COLUMNS, DERIVATIVE_COLUMNS
 
 # Get logger
 logger = logging.getLogger("ftth-api")
@@ -15,6 +21,25 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# Thresholds shared by single-trace and batch validation
+MAX_SNR = 30
+LOW_SNR = 3
+FLAT_DIFF = 0.01
+SUDDEN_CHANGE = 0.5
+
+# Per-trace codes of /validation/batch, as bit flags
+ERROR_CODES = {
+    "snr_negative": 1,
+    "snr_too_high": 2,
+    "point_out_of_range": 4,
+    "flat_trace": 8,
+}
+WARNING_CODES = {
+    "low_snr": 1,
+    "sudden_drop": 2,
+    "sudden_spike": 4,
+}
+
 # Models
 class ValidationResult(BaseModel):
     """Model for validation result"""
@@ -32,7 +57,7 @@ class OTDRTrace(BaseModel):
     def validate_snr(cls, v):
         if v < 0:
             raise ValueError("SNR must be non-negative")
-        if v > 30:
+        if v > MAX_SNR:
             raise ValueError("SNR is unusually high (>30)")
         return v
     
@@ -44,20 +69,166 @@ class OTDRTrace(BaseModel):
             raise ValueError("All trace points must be normalized between 0 and 1")
         return v
 
+class BatchTrace(BaseModel):
+    """Model for one trace of a batch; value checks are reported per trace rather than rejected"""
+    snr: float = Field(..., description="Signal-to-noise ratio")
+    # Not declared as List[float]: converting point by point dominates the cost of
+    # large batches, so the points are converted and checked as one array instead
+    trace_points: Any = Field(..., description="30 normalized OTDR trace points [P1...P30]")
+
+class BatchValidationRequest(BaseModel):
+    """Model for a batch of traces to validate"""
+    traces: List[BatchTrace] = Field(..., description="List of OTDR traces")
+
+class BatchValidationResult(BaseModel):
+    """Model for batch validation result"""
+    is_valid: List[bool] = Field(..., description="Whether each trace is valid")
+    error_codes: List[int] = Field(..., description="Bit flags of the errors found in each trace (see codes)")
+    warning_codes: List[int] = Field(..., description="Bit flags of the warnings found in each trace (see codes)")
+    codes: Dict[str, Dict[str, int]] = Field(..., description="Bit value of each error and warning code")
+    stats: Dict[str, Any] = Field(default_factory=dict, description="Aggregate statistics over the batch")
+
+def check_traces(snr, points, diff=None):
+    """
+    Run the trace validation checks over a whole batch at once
+
+    snr is an (N,) array and points an (N, 30) array; diff, the (N, 29)
+    differences of consecutive points, can be passed in when already
+    computed. Returns per-trace error and warning bit flags as int arrays.
+    """
+    if diff is None:
+        diff = np.diff(points, axis=1)
+
+    error_checks = {
+        # Written so that a NaN SNR or NaN points are flagged as well
+        "snr_negative": ~(snr >= 0),
+        "snr_too_high": snr > MAX_SNR,
+        "point_out_of_range": ~((points >= 0) & (points <= 1)).all(axis=1),
+        "flat_trace": (np.abs(diff) < FLAT_DIFF).all(axis=1),
+    }
+    warning_checks = {
+        "low_snr": snr < LOW_SNR,
+        "sudden_drop": (diff < -SUDDEN_CHANGE).any(axis=1),
+        "sudden_spike": (diff > SUDDEN_CHANGE).any(axis=1),
+    }
+
+    error_codes = np.zeros(len(snr), dtype=np.int64)
+    for code, failed in error_checks.items():
+        error_codes |= failed * ERROR_CODES[code]
+
+    warning_codes = np.zeros(len(snr), dtype=np.int64)
+    for code, flagged in warning_checks.items():
+        warning_codes |= flagged * WARNING_CODES[code]
+
+    return error_codes, warning_codes
+
+def batch_stats(snr, points, error_codes, warning_codes):
+    """Aggregate statistics and per-code counts for a validated batch"""
+    n_invalid = int(np.count_nonzero(error_codes))
+    stats = {
+        "n_traces": len(snr),
+        "n_valid": len(snr) - n_invalid,
+        "n_invalid": n_invalid,
+        "error_counts": {code: int(np.count_nonzero(error_codes & bit)) for code, bit in ERROR_CODES.items()},
+        "warning_counts": {code: int(np.count_nonzero(warning_codes & bit)) for code, bit in WARNING_CODES.items()},
+    }
+
+    # NaN and infinite values, which JSON bodies may hold, are flagged as errors
+    # by check_traces and left out here so that the statistics stay serializable
+    snr = snr[np.isfinite(snr)]
+    points = points[np.isfinite(points).all(axis=1)]
+    if len(snr):
+        stats.update({
+            "snr_min": float(np.min(snr)),
+            "snr_max": float(np.max(snr)),
+            "snr_mean": float(np.mean(snr)),
+        })
+    if len(points):
+        stats.update({
+            "trace_min": float(np.min(points)),
+            "trace_max": float(np.max(points)),
+            "trace_mean": float(np.mean(points)),
+            "trace_std": float(np.std(points)),
+            "trace_range_mean": float(np.mean(np.ptp(points, axis=1))),
+        })
+
+    return stats
+
+def build_validation_result(snr, diff, stats, errors=None):
+    """
+    Run the single-trace checks given the SNR, the 29 differences between
+    consecutive points and the trace statistics of one trace
+    """
+    errors = list(errors or [])
+    warnings = []
+    
+    # Check SNR
+    if snr < LOW_SNR:
+        warnings.append(f"Low SNR ({snr}) may affect detection accuracy")
+    
+    # Check for flat sections
+    if np.all(np.abs(diff) < FLAT_DIFF):
+        errors.append("Trace appears to be flat, which is unusual for OTDR data")
+    
+    # Check for sudden drops
+    for idx in np.flatnonzero(diff < -SUDDEN_CHANGE):
+        warnings.append(f"Sudden drop detected at position {idx+1} to {idx+2}")
+    
+    # Check for sudden spikes
+    for idx in np.flatnonzero(diff > SUDDEN_CHANGE):
+        warnings.append(f"Sudden spike detected at position {idx+1} to {idx+2}")
+    
+    return ValidationResult(
+        is_valid=len(errors) == 0,
+        errors=errors,
+        warnings=warnings,
+        stats=stats
+    )
+
+# Columns of the engineered feature matrix reused by validate_features
+_SNR_INDEX = FEATURE_COLUMNS.index('SNR')
+_STAT_INDEX = {col: FEATURE_COLUMNS.index(col) for col in ['trace_min', 'trace_max', 'trace_mean', 'trace_std', 'trace_range']}
+_DIFF_INDEX = slice(FEATURE_COLUMNS.index(DERIVATIVE_COLUMNS[0]), FEATURE_COLUMNS.index(DERIVATIVE_COLUMNS[-1]) + 1)
+
+# Converts the sample std of the features to the population std reported by /validation/trace
+_STD_SCALE = np.sqrt((len(TRACE_COLUMNS) - 1) / len(TRACE_COLUMNS))
+
+def validate_features(features):
+    """
+    Validate traces from their engineered feature matrix (see compute_features)
+    
+    The statistics and first derivatives computed for the model are reused
+    instead of being recomputed from the trace points. Problems that
+    /validation/trace rejects with 422 (SNR or points out of range) are
+    reported as errors. Returns one ValidationResult per row.
+    """
+    results = []
+    for row in features:
+        # Shortest repr of the float32 value, so messages show the SNR as sent
+        snr = float(str(row[_SNR_INDEX]))
+        stats = {col: float(row[index]) for col, index in _STAT_INDEX.items()}
+        stats["trace_std"] *= float(_STD_SCALE)
+        
+        errors = []
+        if not snr >= 0:
+            errors.append("SNR must be non-negative")
+        elif snr > MAX_SNR:
+            errors.append("SNR is unusually high (>30)")
+        if not (stats["trace_min"] >= 0 and stats["trace_max"] <= 1):
+            errors.append("All trace points must be normalized between 0 and 1")
+        
+        results.append(build_validation_result(snr, row[_DIFF_INDEX], stats, errors))
+    
+    return results
+
 @router.post("/trace", response_model=ValidationResult)
 def validate_trace(trace: OTDRTrace):
     """
     Validate OTDR trace data
     """
     try:
-        errors = []
-        warnings = []
         stats = {}
         
-        # Check SNR
-        if trace.snr < 3:
-            warnings.append(f"Low SNR ({trace.snr}) may affect detection accuracy")
-        
         # Calculate statistics
         trace_array = np.array(trace.trace_points)
         stats["trace_min"] = float(np.min(trace_array))
@@ -66,37 +237,47 @@ def validate_trace(trace: OTDRTrace):
         stats["trace_std"] = float(np.std(trace_array))
         stats["trace_range"] = stats["trace_max"] - stats["trace_min"]
         
-        # Check for flat sections
-        diff = np.diff(trace_array)
-        if np.all(np.abs(diff) < 0.01):
-            errors.append("Trace appears to be flat, which is unusual for OTDR data")
-        
-        # Check for sudden drops
-        if np.any(diff < -0.5):
-            drop_indices = np.where(diff < -0.5)[0]
-            for idx in drop_indices:
-                warnings.append(f"Sudden drop detected at position {idx+1} to {idx+2}")
-        
-        # Check for sudden spikes
-        if np.any(diff > 0.5):
-            spike_indices = np.where(diff > 0.5)[0]
-            for idx in spike_indices:
-                warnings.append(f"Sudden spike detected at position {idx+1} to {idx+2}")
-        
-        # Determine if valid
-        is_valid = len(errors) == 0
-        
-        return ValidationResult(
-            is_valid=is_valid,
-            errors=errors,
-            warnings=warnings,
-            stats=stats
-        )
+        return build_validation_result(trace.snr, np.diff(trace_array), stats)
     
     except Exception as e:
         logger.error(f"Validation error: {e}")
         raise HTTPException(status_code=500, detail=f"Validation error: {str(e)}")
 
+@router.post("/batch", response_model=BatchValidationResult)
+def validate_batch(batch: BatchValidationRequest):
+    """
+    Validate a batch of OTDR traces in one pass
+    
+    Runs the /validation/trace checks over the whole batch as arrays. Value
+    problems are reported per trace as error and warning bit flags instead
+    of rejecting the request; SNR out of range is an error here as well.
+    """
+    snr = np.array([trace.snr for trace in batch.traces], dtype=np.float64)
+    try:
+        points = np.array([trace.trace_points for trace in batch.traces], dtype=np.float64)
+    except (TypeError, ValueError):
+        points = None
+    if not batch.traces:
+        points = np.empty((0, 30))
+    # Checked rather than reshaped, which would spread nested or ragged points across traces
+    if points is None or points.shape != (len(snr), 30):
+        raise HTTPException(status_code=422, detail="Each trace must have exactly 30 numeric trace points")
+    
+    try:
+        error_codes, warning_codes = check_traces(snr, points)
+        
+        return BatchValidationResult(
+            is_valid=(error_codes == 0).tolist(),
+            error_codes=error_codes.tolist(),
+            warning_codes=warning_codes.tolist(),
+            codes={"errors": ERROR_CODES, "warnings": WARNING_CODES},
+            stats=batch_stats(snr, points, error_codes, warning_codes)
+        )
+    
+    except Exception as e:
+        logger.error(f"Batch validation error: {e}")
+        raise HTTPException(status_code=500, detail=f"Batch validation error: {str(e)}")
+
 @router.get("/check-range", response_model=ValidationResult)
 def check_value_range(
     min_value: float = Query(..., description="Minimum expected value"),
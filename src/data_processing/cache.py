@@ -0,0 +1,92 @@
+import os
+import json
+import shutil
+import sys
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_processing.dataset import dataset_files
+
+# Written next to the dataset files of a cache entry and of the processed
+# directory: the fingerprint they were produced from and how long that took
+RECORD_FILE = 'preprocessing.json'
+
+def read_record(directory):
+    """The preprocessing record of a cache entry or processed directory, or None"""
+    path = os.path.join(directory, RECORD_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+class PreprocessingCache:
+    """
+    Processed datasets stored under the fingerprint of their inputs
+
+    Each entry is a directory named after the fingerprint, holding the
+    dataset files and a record. Entries are built in a staging directory
+    and renamed into place, so an interrupted run never leaves a partial
+    entry. The least recently used entries beyond max_entries are removed.
+    """
+    def __init__(self, cache_dir, max_entries=3):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def entry_path(self, fingerprint):
+        return os.path.join(self.cache_dir, fingerprint)
+
+    def lookup(self, fingerprint):
+        """Record of the entry for fingerprint, or None on a miss"""
+        record = read_record(self.entry_path(fingerprint))
+        if record is not None:
+            # Mark the entry as recently used
+            os.utime(os.path.join(self.entry_path(fingerprint), RECORD_FILE))
+        return record
+
+    def staging_path(self, fingerprint):
+        """Empty directory to write the dataset files of a new entry to"""
+        staging = self.entry_path(fingerprint) + '.tmp'
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        return staging
+
+    def commit(self, fingerprint, record):
+        """Turn the staging directory of fingerprint into its entry"""
+        staging = self.entry_path(fingerprint) + '.tmp'
+        with open(os.path.join(staging, RECORD_FILE), 'w') as f:
+            json.dump(dict(record, fingerprint=fingerprint), f, indent=2)
+
+        shutil.rmtree(self.entry_path(fingerprint), ignore_errors=True)
+        os.rename(staging, self.entry_path(fingerprint))
+        self._prune()
+
+    def materialize(self, fingerprint, processed_dir):
+        """
+        Make processed_dir hold the dataset of an entry
+
+        Files are copied rather than linked, so later writes to processed_dir
+        never reach the cache. Nothing is rewritten when processed_dir
+        already holds this entry. Returns whether files were copied.
+        """
+        current = read_record(processed_dir)
+        if current is not None and current.get('fingerprint') == fingerprint:
+            return False
+
+        for name in dataset_files(processed_dir) + ([RECORD_FILE] if current is not None else []):
+            os.remove(os.path.join(processed_dir, name))
+
+        entry = self.entry_path(fingerprint)
+        for name in dataset_files(entry) + [RECORD_FILE]:
+            shutil.copy2(os.path.join(entry, name), os.path.join(processed_dir, name))
+        return True
+
+    def _prune(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            record_path = os.path.join(self.cache_dir, name, RECORD_FILE)
+            if os.path.exists(record_path):
+                entries.append((os.path.getmtime(record_path), name))
+
+        for _, name in sorted(entries, reverse=True)[self.max_entries:]:
+            shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
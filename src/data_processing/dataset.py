@@ -0,0 +1,242 @@
+import os
+import json
+import struct
+import numpy as np
+import pandas as pd
+import sys
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model.features import FEATURE_VERSION, FEATURE_COLUMNS, REGRESSION_COLUMNS
+
+SPLITS = ['train', 'val', 'test']
+
+PROCESSED_FORMATS = ('npy', 'csv')
+
+MANIFEST_FILE = 'manifest.json'
+
+# Which bytes of the raw data the processed splits hold, for appending new rows
+INGESTION_FILE = 'ingestion.json'
+
+# Arrays of a processed split: features, class labels and fault property targets
+ARRAY_DTYPES = {'X': np.float32, 'y': np.int32, 'y_reg': np.float32}
+ARRAY_COLUMNS = {'X': FEATURE_COLUMNS, 'y': ['Class'], 'y_reg': REGRESSION_COLUMNS}
+
+# Fixed size of the .npy headers we write, so that the row count can be
+# filled in once all rows have been appended
+_NPY_HEADER_BYTES = 128
+
+def _npy_header(dtype, shape):
+    """Version 1.0 .npy header padded to _NPY_HEADER_BYTES"""
+    header = repr({'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)), 'fortran_order': False, 'shape': shape})
+    header = header.ljust(_NPY_HEADER_BYTES - 10 - 1) + '\n'
+    return b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) + header.encode('latin1')
+
+class NpyAppender:
+    """
+    Write a .npy file row block by row block, when the number of rows is only known at the end
+
+    With append=True, rows are added after those of an existing file
+    written by NpyAppender, that is after the rows its header counts, or
+    after the first `rows` of them when given.
+    """
+    def __init__(self, path, dtype, n_columns=None, append=False, rows=None):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.n_columns = n_columns
+        self.rows = 0
+        if append:
+            self._file = open(path, 'r+b')
+            version = np.lib.format.read_magic(self._file)
+            shape, _, dtype = np.lib.format.read_array_header_1_0(self._file)
+            if version != (1, 0) or self._file.tell() != _NPY_HEADER_BYTES or dtype != self.dtype or shape[1:] != self._shape()[1:]:
+                raise ValueError(f"Cannot append to {path}: not an array of {self.dtype} rows written by NpyAppender")
+            if rows is not None and rows > shape[0]:
+                raise ValueError(f"Cannot append to {path} after row {rows}: it only has {shape[0]} rows")
+            self.rows = shape[0] if rows is None else rows
+            # Bytes past these rows are left over from an append that did
+            # not finish, and are overwritten
+            self._file.seek(_NPY_HEADER_BYTES + self.rows * self._row_nbytes())
+            self._file.truncate()
+        else:
+            self._file = open(path, 'wb')
+            self._file.write(_npy_header(self.dtype, self._shape()))
+
+    def _row_nbytes(self):
+        return self.dtype.itemsize * (self.n_columns or 1)
+
+    def _shape(self):
+        return (self.rows,) if self.n_columns is None else (self.rows, self.n_columns)
+
+    def append(self, array):
+        array = np.ascontiguousarray(array, dtype=self.dtype)
+        array.tofile(self._file)
+        self.rows += len(array)
+
+    def close(self):
+        self._file.seek(0)
+        self._file.write(_npy_header(self.dtype, self._shape()))
+        self._file.close()
+
+class NpyDatasetWriter:
+    """
+    Write processed splits as float32/int32 .npy files and a manifest
+
+    manifest.json records the column names of every array, the feature
+    version and the row count of every split. Rows can be appended in
+    several calls per split, and with append=True after the rows of an
+    existing dataset (after rows[split] rows of each split when given).
+    """
+    def __init__(self, processed_dir, append=False, rows=None):
+        self.processed_dir = processed_dir
+        self._arrays = {}
+        for split in SPLITS:
+            for name, dtype in ARRAY_DTYPES.items():
+                n_columns = None if name == 'y' else len(ARRAY_COLUMNS[name])
+                self._arrays[name, split] = NpyAppender(f"{processed_dir}/{name}_{split}.npy", dtype, n_columns,
+                                                        append, None if rows is None else rows[split])
+
+    def append(self, split, X, y, y_reg):
+        self._arrays['X', split].append(X[FEATURE_COLUMNS].to_numpy(dtype=np.float32))
+        self._arrays['y', split].append(np.asarray(y))
+        self._arrays['y_reg', split].append(y_reg[REGRESSION_COLUMNS].to_numpy(dtype=np.float32))
+
+    def close(self):
+        """Finish the arrays and write the manifest; returns the number of rows of each split"""
+        for appender in self._arrays.values():
+            appender.close()
+
+        rows = {split: self._arrays['X', split].rows for split in SPLITS}
+        manifest = {
+            'format': 'npy',
+            'feature_version': FEATURE_VERSION,
+            'columns': ARRAY_COLUMNS,
+            'dtypes': {name: np.dtype(dtype).name for name, dtype in ARRAY_DTYPES.items()},
+            'rows': rows,
+        }
+        with open(os.path.join(self.processed_dir, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        return rows
+
+def _truncate_lines(path, lines):
+    """Cut a text file after its first `lines` lines"""
+    with open(path, 'r+b') as f:
+        for _ in range(lines):
+            if not f.readline():
+                raise ValueError(f"Cannot append to {path} after line {lines}: it is shorter")
+        f.truncate()
+
+class CsvDatasetWriter:
+    """
+    Write processed splits as the X/y/y_reg CSV files of earlier versions
+
+    With append=True and rows, each split is first cut back to rows[split]
+    rows, dropping those of an append that did not finish.
+    """
+    def __init__(self, processed_dir, append=False, rows=None):
+        self.processed_dir = processed_dir
+        self.rows = dict.fromkeys(SPLITS, 0)
+        if append:
+            for split in SPLITS:
+                if rows is None:
+                    self.rows[split] = sum(1 for _ in open(f"{processed_dir}/y_{split}.csv")) - 1
+                    continue
+                for name in ARRAY_COLUMNS:
+                    # Header line included
+                    _truncate_lines(f"{processed_dir}/{name}_{split}.csv", rows[split] + 1)
+                self.rows[split] = rows[split]
+            return
+
+        # Without a manifest, readers fall back to the CSV files
+        if os.path.exists(os.path.join(processed_dir, MANIFEST_FILE)):
+            os.remove(os.path.join(processed_dir, MANIFEST_FILE))
+
+        for split in SPLITS:
+            for name, columns in ARRAY_COLUMNS.items():
+                pd.DataFrame(columns=columns).to_csv(f"{processed_dir}/{name}_{split}.csv", index=False)
+
+    def append(self, split, X, y, y_reg):
+        X.to_csv(f"{self.processed_dir}/X_{split}.csv", mode='a', header=False, index=False)
+        y.to_csv(f"{self.processed_dir}/y_{split}.csv", mode='a', header=False, index=False)
+        y_reg.to_csv(f"{self.processed_dir}/y_reg_{split}.csv", mode='a', header=False, index=False)
+        self.rows[split] += len(X)
+
+    def close(self):
+        return dict(self.rows)
+
+def open_dataset_writer(processed_dir, processed_format='npy', append=False, rows=None):
+    """
+    Writer of processed splits in the given format (see PROCESSED_FORMATS)
+
+    With append=True it appends to existing splits, after rows[split] rows
+    of each split when rows is given; any rows past those are dropped.
+    """
+    if processed_format == 'npy':
+        return NpyDatasetWriter(processed_dir, append, rows)
+    if processed_format == 'csv':
+        return CsvDatasetWriter(processed_dir, append, rows)
+    raise ValueError(f"Unknown processed data format: {processed_format}")
+
+def dataset_files(processed_dir):
+    """Names of the processed dataset files present in processed_dir, in either format"""
+    names = [f"{name}_{split}.{ext}" for name in ARRAY_COLUMNS for split in SPLITS for ext in PROCESSED_FORMATS]
+    return [name for name in names + [MANIFEST_FILE, INGESTION_FILE] if os.path.exists(os.path.join(processed_dir, name))]
+
+def read_manifest(processed_dir):
+    """The manifest of a processed dataset, or None for CSV datasets"""
+    path = os.path.join(processed_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def read_ingestion(processed_dir):
+    """The ingestion record of a processed dataset, or None when it was not recorded"""
+    path = os.path.join(processed_dir, INGESTION_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def write_ingestion(processed_dir, ingestion):
+    """Replace the ingestion record in one step, so it is never seen half-written"""
+    path = os.path.join(processed_dir, INGESTION_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(ingestion, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+def has_processed_data(processed_dir):
+    """Whether processed_dir holds a processed dataset in either format"""
+    return read_manifest(processed_dir) is not None or os.path.exists(os.path.join(processed_dir, 'X_train.csv'))
+
+def load_split(processed_dir, split):
+    """
+    Load the features, class labels and fault property targets of a split
+
+    .npy datasets are memory-mapped read-only, with features already in
+    FEATURE_COLUMNS order. CSV datasets are read into DataFrames. The fault
+    property targets are None for datasets processed without them.
+    """
+    manifest = read_manifest(processed_dir)
+    if manifest is None:
+        X = pd.read_csv(f"{processed_dir}/X_{split}.csv")
+        y = pd.read_csv(f"{processed_dir}/y_{split}.csv").values.ravel()
+        y_reg = None
+        if os.path.exists(f"{processed_dir}/y_reg_{split}.csv"):
+            y_reg = pd.read_csv(f"{processed_dir}/y_reg_{split}.csv")[REGRESSION_COLUMNS].to_numpy(dtype=np.float32)
+        return X, y, y_reg
+
+    if manifest['feature_version'] != FEATURE_VERSION or manifest['columns']['X'] != FEATURE_COLUMNS:
+        raise ValueError(f"Processed data in {processed_dir} has feature version {manifest['feature_version']}, "
+                         f"expected {FEATURE_VERSION}; preprocess the raw data again")
+
+    X = np.load(f"{processed_dir}/X_{split}.npy", mmap_mode='r')
+    y = np.load(f"{processed_dir}/y_{split}.npy", mmap_mode='r')
+    y_reg = np.load(f"{processed_dir}/y_reg_{split}.npy", mmap_mode='r')
+    return X, y, y_reg
+
+def feature_matrix(X):
+    """Features as a float32 array in FEATURE_COLUMNS order, without copying memory-mapped arrays"""
+    if isinstance(X, pd.DataFrame):
+        return X[FEATURE_COLUMNS].to_numpy(dtype=np.float32)
+    return X
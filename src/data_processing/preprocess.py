@@ -1,8 +1,52 @@
+import io
 import os
+import json
+import time
+import hashlib
+import inspect
+import argparse
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
 import yaml
+import sys
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model.features import FEATURE_VERSION, RAW_COLUMNS, FEATURE_COLUMNS, REGRESSION_COLUMNS, compute_features
+from data_processing.dataset import SPLITS, open_dataset_writer, read_manifest, read_ingestion, write_ingestion
+from data_processing.cache import PreprocessingCache, RECORD_FILE
+from data_processing.parallel import ParallelFeatures
+
+# Fractional part of the golden ratio: k * _GOLDEN mod 1 spreads consecutive
+# counters evenly over [0, 1), so every prefix of a class splits in proportion
+_GOLDEN = (np.sqrt(5.0) - 1.0) / 2.0
+
+# Settings of the data section that change the processed output (chunk_size
+# only matters through the mode it selects, see fingerprint)
+FINGERPRINT_KEYS = ['train_test_split', 'validation_split', 'random_seed', 'processed_format', 'split_method']
+
+# Values of a raw row that its hash-based split assignment depends on
+HASH_COLUMNS = RAW_COLUMNS + ['Class'] + REGRESSION_COLUMNS
+
+def _mix64(h):
+    """splitmix64 finalizer over an array of uint64 (multiplications wrap around)"""
+    h = (h ^ (h >> np.uint64(30))) * np.uint64(0xbf58476d1ce4e5b9)
+    h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94d049bb133111eb)
+    return h ^ (h >> np.uint64(31))
+
+def _file_sha256(path, n_bytes):
+    """sha256 of the first n_bytes of a file, as a hashlib object that can be continued"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        remaining = n_bytes
+        while remaining > 0:
+            block = f.read(min(1 << 20, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest
 
 class OTDRDataProcessor:
     """
@@ -15,6 +59,119 @@ class OTDRDataProcessor:
         
         # Create processed data directory if it doesn't exist
         os.makedirs(self.config['data']['processed_data_path'], exist_ok=True)
+        
+        # Directory the processed splits are written to (a cache entry when caching)
+        self.output_dir = self.config['data']['processed_data_path']
+        self.rows_written = None
+        
+        # Worker pool engineering features during a preprocessing run (None computes them in-process)
+        self._features = None
+        
+        # (size, sha256) of the raw data file, computed once per processor
+        self._raw_digest = None
+    
+    def process(self, force=False):
+        """
+        Preprocess the raw data, reusing cached outputs when data.cache_path is set
+        
+        Outputs are cached under the fingerprint of the raw data, the data
+        settings and the preprocessing code. On a hit they are copied to the
+        processed data path instead of being recomputed; force recomputes
+        them regardless. Returns the number of rows of each split.
+        
+        With data.incremental, raw rows added since the processed splits
+        were written are appended to them (see append) instead. This needs
+        data.split_method: hash, and splits written with another split
+        method are rebuilt in full first.
+        """
+        processed_dir = self.config['data']['processed_data_path']
+        if self.config['data'].get('incremental', False) and not force:
+            if self.config['data'].get('split_method', 'stratified') != 'hash':
+                raise ValueError("data.incremental requires data.split_method: hash, so that appended rows "
+                                 "are assigned to splits the same way as the rows already processed")
+            ingestion = read_ingestion(processed_dir)
+            if ingestion is not None and ingestion.get('split_method') == 'hash':
+                return self.append()
+        
+        cache_dir = self.config['data'].get('cache_path')
+        if not cache_dir:
+            return self._preprocess()
+        
+        start = time.perf_counter()
+        cache = PreprocessingCache(cache_dir, self.config['data'].get('cache_max_entries', 3))
+        fingerprint = self.fingerprint()
+        
+        record = None if force else cache.lookup(fingerprint)
+        if record is not None:
+            copied = cache.materialize(fingerprint, processed_dir)
+            seconds = time.perf_counter() - start
+            print(f"Preprocessing cache hit for {fingerprint}: "
+                  f"{'copied to' if copied else 'already in'} {processed_dir} in {seconds:.1f} s, "
+                  f"saved {record['seconds'] - seconds:.1f} s")
+            self.rows_written = record['rows']
+            return self.rows_written
+        
+        print(f"Preprocessing cache {'bypassed' if force else 'miss'} for {fingerprint}")
+        self.output_dir = cache.staging_path(fingerprint)
+        try:
+            rows = self._preprocess()
+        finally:
+            self.output_dir = processed_dir
+        cache.commit(fingerprint, {'rows': rows, 'seconds': time.perf_counter() - start})
+        cache.materialize(fingerprint, processed_dir)
+        return rows
+    
+    def fingerprint(self):
+        """Content hash of the raw data, the data settings and the preprocessing code"""
+        digest = hashlib.sha256(self.raw_digest()[1].encode())
+        
+        # Chunked and in-memory preprocessing assign rows to splits differently
+        settings = {key: self.config['data'].get(key) for key in FINGERPRINT_KEYS}
+        settings['chunked'] = bool(self.config['data'].get('chunk_size', 0))
+        settings['feature_version'] = FEATURE_VERSION
+        digest.update(json.dumps(settings, sort_keys=True).encode())
+        
+        # The code itself, so that changes made without a FEATURE_VERSION bump still miss
+        for func in (compute_features, ParallelFeatures, open_dataset_writer, PreprocessingCache, OTDRDataProcessor):
+            with open(inspect.getsourcefile(func), 'rb') as f:
+                digest.update(f.read())
+        
+        return digest.hexdigest()[:16]
+    
+    def raw_digest(self):
+        """Size and sha256 of the raw data file"""
+        if self._raw_digest is None:
+            path = self.config['data']['raw_data_path']
+            size = os.path.getsize(path)
+            self._raw_digest = (size, _file_sha256(path, size).hexdigest())
+        return self._raw_digest
+    
+    def _preprocess(self):
+        """Preprocess the raw data in chunks when data.chunk_size is set, otherwise all at once"""
+        workers = self.config['data'].get('feature_workers', 1)
+        self._features = ParallelFeatures(workers)
+        try:
+            if self.config['data'].get('chunk_size', 0):
+                self.preprocess_chunked()
+            else:
+                self.load_data()
+                self.preprocess_data()
+        finally:
+            self._features.close()
+            self._features = None
+        
+        # Record which bytes of the raw data are in the splits, for later appends
+        size, sha256 = self.raw_digest()
+        write_ingestion(self.output_dir, {
+            'raw_data_path': self.config['data']['raw_data_path'],
+            'bytes': size,
+            'sha256': sha256,
+            'rows': sum(self.rows_written.values()),
+            'split_rows': self.rows_written,
+            'split_method': self.config['data'].get('split_method', 'stratified'),
+            'appends': [],
+        })
+        return self.rows_written
     
     def load_data(self):
         """Load the raw OTDR data"""
@@ -24,81 +181,236 @@ class OTDRDataProcessor:
     
     def preprocess_data(self):
         """Preprocess the OTDR data for model training"""
-        # Extract features and target
-        X = self.data.drop(['Class', 'Position', 'Reflectance', 'loss'], axis=1)
+        # Extract features, the class target and the fault property targets of the regression heads
+        X = self.data.drop(['Class'] + REGRESSION_COLUMNS, axis=1)
         y = self.data['Class']
+        y_reg = self.data[REGRESSION_COLUMNS]
         
         # Add engineered features
         X = self._add_engineered_features(X)
         
-        # Split data into train, validation, and test sets
-        X_train, X_temp, y_train, y_temp = train_test_split(
-            X, y, 
-            test_size=self.config['data']['train_test_split'] + self.config['data']['validation_split'],
-            random_state=self.config['data']['random_seed'],
-            stratify=y
-        )
-        
-        # Further split temp data into validation and test sets
-        test_size_adjusted = self.config['data']['train_test_split'] / (self.config['data']['train_test_split'] + self.config['data']['validation_split'])
-        X_val, X_test, y_val, y_test = train_test_split(
-            X_temp, y_temp, 
-            test_size=test_size_adjusted,
-            random_state=self.config['data']['random_seed'],
-            stratify=y_temp
-        )
+        if self.config['data'].get('split_method', 'stratified') == 'hash':
+            # Stable per-row assignment, the one appended rows get as well
+            splits = self._hash_splits(self.data)
+            X_train, X_val, X_test = (X[splits == code] for code in range(len(SPLITS)))
+            y_train, y_val, y_test = (y[splits == code] for code in range(len(SPLITS)))
+            y_reg_train, y_reg_val, y_reg_test = (y_reg[splits == code] for code in range(len(SPLITS)))
+        else:
+            # Split data into train, validation, and test sets
+            X_train, X_temp, y_train, y_temp, y_reg_train, y_reg_temp = train_test_split(
+                X, y, y_reg, 
+                test_size=self.config['data']['train_test_split'] + self.config['data']['validation_split'],
+                random_state=self.config['data']['random_seed'],
+                stratify=y
+            )
+            
+            # Further split temp data into validation and test sets
+            test_size_adjusted = self.config['data']['train_test_split'] / (self.config['data']['train_test_split'] + self.config['data']['validation_split'])
+            X_val, X_test, y_val, y_test, y_reg_val, y_reg_test = train_test_split(
+                X_temp, y_temp, y_reg_temp, 
+                test_size=test_size_adjusted,
+                random_state=self.config['data']['random_seed'],
+                stratify=y_temp
+            )
         
         # Save processed datasets
-        self._save_datasets(X_train, y_train, X_val, y_val, X_test, y_test)
+        writer = self._open_writer()
+        writer.append('train', X_train, y_train, y_reg_train)
+        writer.append('val', X_val, y_val, y_reg_val)
+        writer.append('test', X_test, y_test, y_reg_test)
+        self.rows_written = writer.close()
+        
+        print(f"Saved processed datasets to {self.output_dir}")
+        print(f"Train set: {X_train.shape}, Validation set: {X_val.shape}, Test set: {X_test.shape}")
         
         return X_train, y_train, X_val, y_val, X_test, y_test
     
-    def _add_engineered_features(self, X):
-        """Add engineered features to improve model performance"""
-        # Calculate statistical features from OTDR trace points
-        trace_columns = [col for col in X.columns if col.startswith('P')]
+    def preprocess_chunked(self, chunk_size=None):
+        """
+        Preprocess the raw CSV chunk by chunk and append each chunk to the processed splits
         
-        # Add max, min, mean, std, and range of trace points
-        X['trace_max'] = X[trace_columns].max(axis=1)
-        X['trace_min'] = X[trace_columns].min(axis=1)
-        X['trace_mean'] = X[trace_columns].mean(axis=1)
-        X['trace_std'] = X[trace_columns].std(axis=1)
-        X['trace_range'] = X['trace_max'] - X['trace_min']
+        Only one chunk of raw and engineered rows is held in memory at a time.
+        Rows are assigned to train/val/test per class by _assign_splits, so
+        every class is split in the configured proportions, or by
+        _hash_splits with data.split_method: hash. Returns the number of rows
+        written to each split.
+        """
+        chunk_size = chunk_size or self.config['data'].get('chunk_size', 0) or 100000
+        hash_splits = self.config['data'].get('split_method', 'stratified') == 'hash'
+        self._class_counts = {}
+        writer = self._open_writer()
         
-        # Add first and second derivatives to capture rate of change
-        for i in range(1, len(trace_columns)):
-            X[f'derivative_P{i}'] = X[f'P{i}'] - X[f'P{i-1}']
+        for chunk in pd.read_csv(self.config['data']['raw_data_path'], chunksize=chunk_size):
+            splits = self._hash_splits(chunk) if hash_splits else self._assign_splits(chunk['Class'].to_numpy())
+            self._write_chunk(writer, chunk, splits)
+        self.rows_written = writer.close()
         
-        for i in range(2, len(trace_columns)):
-            X[f'second_derivative_P{i}'] = X[f'derivative_P{i}'] - X[f'derivative_P{i-1}']
+        print(f"Saved processed datasets to {self.output_dir}")
+        print(f"Train set: {self.rows_written['train']} rows, Validation set: {self.rows_written['val']} rows, "
+              f"Test set: {self.rows_written['test']} rows")
+        return self.rows_written
+    
+    def append(self, new_data_path=None):
+        """
+        Process only new raw rows and append them to the existing processed splits
         
-        # Add SNR-related features
-        X['snr_to_mean_ratio'] = X['SNR'] / X['trace_mean']
+        By default the new rows are those added to the end of the raw data
+        file since the splits were written; the bytes already processed must
+        be unchanged. With new_data_path, every row of that CSV is new.
+        New rows are assigned to splits by _hash_splits, and rows already
+        in the splits are never moved. Returns the number of rows appended
+        to each split.
         
-        return X
-    
-    def _save_datasets(self, X_train, y_train, X_val, y_val, X_test, y_test):
-        """Save processed datasets to disk"""
-        # Create directories
+        The ingestion record is replaced only after the new rows are in the
+        splits, and holds the row count of every split. Each split is first
+        cut back to that count, so rerunning an append that crashed before
+        its record was written does not add its rows twice.
+        """
         processed_dir = self.config['data']['processed_data_path']
+        ingestion = read_ingestion(processed_dir)
+        if ingestion is None:
+            raise ValueError(f"No ingestion record in {processed_dir}; preprocess the raw data fully first")
+        if ingestion.get('split_method') != 'hash':
+            # Hash-assigned rows appended to stratified splits would mix two split schemes
+            raise ValueError(f"Processed data in {processed_dir} was split with split_method "
+                             f"{ingestion.get('split_method', 'stratified')!r}; only splits written with "
+                             f"split_method: hash can be appended to, preprocess the raw data fully instead")
         
-        # Save datasets
-        X_train.to_csv(f"{processed_dir}/X_train.csv", index=False)
-        y_train.to_csv(f"{processed_dir}/y_train.csv", index=False)
-        X_val.to_csv(f"{processed_dir}/X_val.csv", index=False)
-        y_val.to_csv(f"{processed_dir}/y_val.csv", index=False)
-        X_test.to_csv(f"{processed_dir}/X_test.csv", index=False)
-        y_test.to_csv(f"{processed_dir}/y_test.csv", index=False)
+        chunk_size = self.config['data'].get('chunk_size', 0) or 100000
+        raw_path = self.config['data']['raw_data_path']
+        if new_data_path is None:
+            size = os.path.getsize(raw_path)
+            digest = _file_sha256(raw_path, ingestion['bytes'])
+            if size < ingestion['bytes'] or digest.hexdigest() != ingestion['sha256']:
+                raise ValueError(f"{raw_path} changed before byte {ingestion['bytes']}; only rows added "
+                                 f"at the end can be appended, preprocess the raw data fully instead")
+            if size == ingestion['bytes']:
+                print(f"No new rows in {raw_path}")
+                return dict.fromkeys(SPLITS, 0)
+            
+            # Continue the digest over the new bytes, for the next append
+            columns = list(pd.read_csv(raw_path, nrows=0).columns)
+            with open(raw_path, 'rb') as f:
+                f.seek(ingestion['bytes'])
+                new_rows = f.read(size - ingestion['bytes'])
+            digest.update(new_rows)
+            chunks = pd.read_csv(io.BytesIO(new_rows), names=columns, header=None, chunksize=chunk_size)
+        else:
+            chunks = pd.read_csv(new_data_path, chunksize=chunk_size)
         
-        print(f"Saved processed datasets to {processed_dir}")
-        print(f"Train set: {X_train.shape}, Validation set: {X_val.shape}, Test set: {X_test.shape}")
+        # Append in the format the splits were written in
+        manifest = read_manifest(processed_dir)
+        if manifest is not None and manifest['feature_version'] != FEATURE_VERSION:
+            raise ValueError(f"Processed data in {processed_dir} has feature version {manifest['feature_version']}, "
+                             f"expected {FEATURE_VERSION}; preprocess the raw data fully instead")
+        writer = open_dataset_writer(processed_dir, 'csv' if manifest is None else manifest['format'],
+                                     append=True, rows=ingestion.get('split_rows'))
+        appended = dict.fromkeys(SPLITS, 0)
+        for chunk in chunks:
+            splits = self._hash_splits(chunk)
+            self._write_chunk(writer, chunk, splits)
+            for code, split in enumerate(SPLITS):
+                appended[split] += int(np.sum(splits == code))
+        self.rows_written = writer.close()
+        
+        if new_data_path is None:
+            ingestion.update(bytes=size, sha256=digest.hexdigest())
+        ingestion['rows'] += sum(appended.values())
+        ingestion['split_rows'] = self.rows_written
+        ingestion['appends'].append({'source': new_data_path or raw_path, 'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'rows': appended})
+        write_ingestion(processed_dir, ingestion)
+        
+        # The splits no longer match the cache entry they were copied from
+        if os.path.exists(os.path.join(processed_dir, RECORD_FILE)):
+            os.remove(os.path.join(processed_dir, RECORD_FILE))
+        
+        print(f"Appended {sum(appended.values())} rows to {processed_dir}: "
+              f"train {appended['train']}, validation {appended['val']}, test {appended['test']}")
+        return appended
+    
+    def _write_chunk(self, writer, chunk, splits):
+        """Engineer the features of a chunk of raw rows and append each row to its split"""
+        X = self._add_engineered_features(chunk.drop(['Class'] + REGRESSION_COLUMNS, axis=1))
+        y = chunk['Class']
+        y_reg = chunk[REGRESSION_COLUMNS]
+        for code, split in enumerate(SPLITS):
+            rows = splits == code
+            writer.append(split, X[rows], y[rows], y_reg[rows])
+    
+    def _hash_splits(self, data):
+        """
+        Split codes (0 train, 1 val, 2 test) from a hash of each row's values
+        
+        A row's split depends only on its own SNR, trace points, class and
+        fault properties and on the random seed. It does not depend on
+        other rows or on when the row was processed, so appending rows
+        never moves existing ones and identical rows share a split.
+        """
+        test_fraction = self.config['data']['train_test_split']
+        val_fraction = self.config['data']['validation_split']
+        train_fraction = 1.0 - test_fraction - val_fraction
+        
+        # Hash the bit patterns of the float64 values (+ 0.0 folds -0.0 into 0.0)
+        words = np.ascontiguousarray(data[HASH_COLUMNS].to_numpy(dtype=np.float64) + 0.0).view(np.uint64)
+        h = np.full(len(words), self.config['data']['random_seed'], dtype=np.uint64)
+        for column in range(words.shape[1]):
+            h = _mix64(h ^ words[:, column])
+        position = (h >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+        
+        return np.where(position < train_fraction, 0, np.where(position < train_fraction + val_fraction, 1, 2)).astype(np.int8)
+    
+    def _assign_splits(self, y):
+        """
+        Split codes (0 train, 1 val, 2 test) for a chunk of class labels
+        
+        The k-th row of each class seen so far is placed by k * golden ratio
+        mod 1, offset by a per-class constant derived from the random seed.
+        The assignment only depends on the row's rank within its class, so
+        it does not change with the chunk size.
+        """
+        test_fraction = self.config['data']['train_test_split']
+        val_fraction = self.config['data']['validation_split']
+        train_fraction = 1.0 - test_fraction - val_fraction
+        
+        splits = np.empty(len(y), dtype=np.int8)
+        for label in np.unique(y):
+            rows = np.flatnonzero(y == label)
+            start = self._class_counts.get(label, 0)
+            self._class_counts[label] = start + len(rows)
+            
+            offset = np.random.default_rng([self.config['data']['random_seed'], int(label)]).random()
+            position = (np.arange(start, start + len(rows)) * _GOLDEN + offset) % 1.0
+            splits[rows] = np.where(position < train_fraction, 0, np.where(position < train_fraction + val_fraction, 1, 2))
+        
+        return splits
+    
+    def _open_writer(self):
+        """Writer of the processed splits in the configured data.processed_format"""
+        return open_dataset_writer(self.output_dir, self.config['data'].get('processed_format', 'npy'))
+    
+    def _add_engineered_features(self, X):
+        """Add engineered features to improve model performance"""
+        # Statistics, first/second derivatives and SNR ratio computed on the
+        # raw (SNR, P1..P30) matrix by the feature module shared with serving
+        raw = X[RAW_COLUMNS].to_numpy(dtype=np.float32)
+        features = self._features.compute(raw) if self._features is not None else compute_features(raw)
+        
+        return pd.DataFrame(features, columns=FEATURE_COLUMNS, index=X.index)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Preprocess the raw OTDR data into train/val/test splits")
+    parser.add_argument('--force', action='store_true', help="Recompute even when the preprocessing cache has the outputs")
+    parser.add_argument('--append', nargs='?', const='', default=None, metavar='CSV',
+                        help="Append new rows to the processed splits: those added to the raw data, or all rows of CSV")
+    args = parser.parse_args()
+    
     # Initialize data processor
     processor = OTDRDataProcessor(config_path='../../config.yaml')
     
     # Load and preprocess data
-    processor.load_data()
-    X_train, y_train, X_val, y_val, X_test, y_test = processor.preprocess_data()
+    if args.append is not None:
+        processor.append(args.append or None)
+    else:
+        processor.process(force=args.force)
     
     print("Data preprocessing completed successfully!")
@@ -0,0 +1,215 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import contextlib
+import multiprocessing
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_processing.dataset import load_split, dataset_files
+
+CLASS_NAMES = ['Normal', 'Fiber Tapping', 'Bad Splice', 'Bending Event',
+               'Dirty Connector', 'Fiber Cut', 'PC Connector', 'Reflector']
+
+RESULT_FILE = 'result.json'
+
+REPORT_FILE = 'cv_report.json'
+
+def fold_indices(y, folds, seed):
+    """(training rows, held-out rows) of every fold, stratified by class and the same in every process"""
+    from sklearn.model_selection import StratifiedKFold
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed)
+    return list(splitter.split(np.zeros(len(y)), y))
+
+def _take(array, rows):
+    if array is None:
+        return None
+    if isinstance(array, pd.DataFrame):
+        return array.iloc[rows].reset_index(drop=True)
+    return np.asarray(array[rows])
+
+def _run_fold(config_path, plan, fold, fold_dir, threads):
+    """
+    Worker: train on every fold but one of the training split and score the held-out fold
+
+    TensorFlow is limited to `threads` intra-op threads before it runs any op.
+    Training output goes to train.log in fold_dir, next to the fold's
+    checkpoint and any input cache directory, and the scores are written to result.json last, so a fold
+    only counts as done once its result exists.
+    """
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    from sklearn.metrics import accuracy_score, f1_score
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    from src.model.train import OTDRFaultDetectionModel
+
+    os.makedirs(fold_dir, exist_ok=True)
+    start = time.perf_counter()
+    with open(os.path.join(fold_dir, 'train.log'), 'w') as log, contextlib.redirect_stdout(log):
+        trainer = OTDRFaultDetectionModel(config_path=config_path)
+        trainer.config['model']['model_save_path'] = fold_dir
+        # Folds run concurrently, so each caches its input blocks in its own directory
+        if trainer.config['model'].get('input_cache', '') not in ('', 'memory'):
+            trainer.config['model']['input_cache'] = os.path.join(fold_dir, 'input_cache')
+        trainer.load_processed_data()
+
+        # The validation split still drives early stopping; the held-out fold is only scored
+        X, y, y_reg = trainer.X_train, np.asarray(trainer.y_train), trainer.y_reg_train
+        train_rows, held_out_rows = fold_indices(y, plan['folds'], plan['random_seed'])[fold]
+        trainer.X_train, trainer.y_train, trainer.y_reg_train = _take(X, train_rows), y[train_rows], _take(y_reg, train_rows)
+        trainer.X_test, trainer.y_test, trainer.y_reg_test = _take(X, held_out_rows), y[held_out_rows], _take(y_reg, held_out_rows)
+
+        trainer.build_model(plan['model']['model_type'])
+        trainer.train_model()
+        probabilities = trainer.model.predict(trainer.X_test_prepared, verbose=0)
+        if isinstance(probabilities, list):
+            probabilities = probabilities[0]
+        predicted = probabilities.argmax(axis=1)
+
+    f1 = f1_score(trainer.y_test, predicted, labels=range(len(CLASS_NAMES)), average=None, zero_division=0)
+    result = {
+        'plan': plan,
+        'fold': fold,
+        'train_rows': int(len(train_rows)),
+        'held_out_rows': int(len(held_out_rows)),
+        'accuracy': float(accuracy_score(trainer.y_test, predicted)),
+        'f1': {class_name: float(score) for class_name, score in zip(CLASS_NAMES, f1)},
+        'seconds': time.perf_counter() - start,
+    }
+    with open(os.path.join(fold_dir, RESULT_FILE + '.tmp'), 'w') as f:
+        json.dump(result, f, indent=2)
+    os.replace(os.path.join(fold_dir, RESULT_FILE + '.tmp'), os.path.join(fold_dir, RESULT_FILE))
+    return result
+
+def _run_fold_in_process(*args):
+    """
+    Run _run_fold in a fresh spawned process and return its result
+
+    TensorFlow is not fork-safe, and its thread settings only apply before
+    it first runs an op, so every fold gets a new interpreter. A crash of
+    that process raises BrokenProcessPool here.
+    """
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(_run_fold, *args).result()
+
+def _summary(values):
+    values = np.asarray(values, dtype=np.float64)
+    return {'mean': float(values.mean()), 'std': float(values.std()), 'var': float(values.var())}
+
+class OTDRCrossValidator:
+    """
+    Class for k-fold cross-validation of the configured model on the training split
+
+    Folds train concurrently in separate processes, with the CPUs divided
+    between them as TensorFlow threads. Finished folds are skipped when
+    the run is repeated with the same plan, so a run interrupted by a
+    crashed fold resumes where it stopped.
+    """
+    def __init__(self, config_path='../../config.yaml'):
+        import yaml
+        self.config_path = os.path.abspath(config_path)
+        with open(config_path, 'r') as file:
+            self.config = yaml.safe_load(file)
+
+        settings = self.config.get('cross_validation', {})
+        self.folds = settings.get('folds', 5)
+        self.parallel_folds = settings.get('parallel_folds', 0) or os.cpu_count()
+        self.output_path = settings.get('output_path') or os.path.join(self.config['model']['model_save_path'], 'cross_validation')
+
+    def plan(self):
+        """
+        What decides the rows each fold holds and what is trained on them
+
+        Covers the fold count and seed, a content hash of the processed
+        training and validation splits and the whole model configuration,
+        so fold results are only reused when nothing they depend on changed.
+        """
+        processed_dir = self.config['data']['processed_data_path']
+        digest = hashlib.sha256()
+        for name in dataset_files(processed_dir):
+            if name.endswith(('_train.npy', '_train.csv', '_val.npy', '_val.csv')):
+                digest.update(name.encode())
+                with open(os.path.join(processed_dir, name), 'rb') as f:
+                    for block in iter(lambda: f.read(1 << 20), b''):
+                        digest.update(block)
+
+        return {
+            'folds': self.folds,
+            'random_seed': self.config['data']['random_seed'],
+            'processed_data': digest.hexdigest()[:16],
+            'train_rows': int(len(load_split(processed_dir, 'train')[1])),
+            'model': self.config['model'],
+        }
+
+    def fold_dir(self, fold):
+        return os.path.join(self.output_path, f"fold_{fold}")
+
+    def completed(self, plan):
+        """Results of the folds already trained under this plan, by fold"""
+        results = {}
+        for fold in range(self.folds):
+            path = os.path.join(self.fold_dir(fold), RESULT_FILE)
+            if os.path.exists(path):
+                with open(path, 'r') as f:
+                    result = json.load(f)
+                if result['plan'] == plan:
+                    results[fold] = result
+        return results
+
+    def run(self):
+        """Train the remaining folds and write the report; raises RuntimeError when a fold fails"""
+        plan = self.plan()
+        results = self.completed(plan)
+        remaining = [fold for fold in range(self.folds) if fold not in results]
+        if results:
+            print(f"Resuming cross-validation: folds {sorted(results)} already done")
+
+        failures = {}
+        if remaining:
+            parallel = min(self.parallel_folds, len(remaining))
+            threads = max(1, os.cpu_count() // parallel)
+            print(f"Training {len(remaining)} folds, {parallel} at a time with {threads} TensorFlow threads each")
+
+            with ThreadPoolExecutor(parallel) as pool:
+                futures = {fold: pool.submit(_run_fold_in_process, self.config_path, plan, fold, self.fold_dir(fold), threads)
+                           for fold in remaining}
+                for fold, future in futures.items():
+                    try:
+                        results[fold] = future.result()
+                        print(f"Fold {fold}: accuracy {results[fold]['accuracy']:.4f}")
+                    except Exception as error:
+                        failures[fold] = error
+                        print(f"Fold {fold} failed: {error!r} (see {os.path.join(self.fold_dir(fold), 'train.log')})")
+
+        if failures:
+            raise RuntimeError(f"Cross-validation folds {sorted(failures)} failed; run again to train only those")
+        return self.report([results[fold] for fold in range(self.folds)], plan)
+
+    def report(self, results, plan):
+        """Aggregate accuracy and per-class F1 over the folds into cv_report.json"""
+        report = {
+            'plan': plan,
+            'accuracy': _summary([result['accuracy'] for result in results]),
+            'f1': {class_name: _summary([result['f1'][class_name] for result in results]) for class_name in CLASS_NAMES},
+            'folds': results,
+        }
+        with open(os.path.join(self.output_path, REPORT_FILE), 'w') as f:
+            json.dump(report, f, indent=2)
+
+        print(f"{plan['folds']}-fold cross-validation of the {plan['model']['model_type']} model:")
+        print(f"Accuracy: {report['accuracy']['mean']:.4f} +/- {report['accuracy']['std']:.4f}")
+        print(f"{'class':>16} {'F1 mean':>8} {'F1 std':>7}")
+        for class_name, summary in report['f1'].items():
+            print(f"{class_name:>16} {summary['mean']:>8.4f} {summary['std']:>7.4f}")
+        return report
+
+if __name__ == "__main__":
+    # Cross-validate the configured model on the processed training split
+    OTDRCrossValidator(config_path='../../config.yaml').run()
@@ -12,6 +12,8 @@ import sys
 
 sys.path.append('../../')
 from src.data_processing.preprocess import OTDRDataProcessor
+from src.data_processing.dataset import load_split, feature_matrix
+from src.model.features import FEATURE_COLUMNS, TRACE_COLUMNS, prepare_model_input
 
 class OTDRModelEvaluator:
     """
@@ -43,40 +45,35 @@ class OTDRModelEvaluator:
         """Load the test data for evaluation"""
         processed_dir = self.config['data']['processed_data_path']
         
-        self.X_test = pd.read_csv(f"{processed_dir}/X_test.csv")
-        self.y_test = pd.read_csv(f"{processed_dir}/y_test.csv").values.ravel()
+        self.X_test, self.y_test, _ = load_split(processed_dir, 'test')
         
         print(f"Loaded test data with shape: {self.X_test.shape}")
         
-        # Prepare test data based on model type
+        # Prepare test data based on model type, with features in the fixed FEATURE_COLUMNS order
         model_type = self.config['model']['model_type']
-        
-        if model_type in ['lstm', 'cnn']:
-            # Extract OTDR trace points
-            trace_columns = [col for col in self.X_test.columns if col.startswith('P') and len(col) <= 3]
-            
-            # Create sequence data
-            X_test_seq = self.X_test[trace_columns].values.reshape(self.X_test.shape[0], len(trace_columns), 1)
-            
-            # Create additional features input
-            other_columns = [col for col in self.X_test.columns if col not in trace_columns]
-            X_test_other = self.X_test[other_columns].values
-            
-            self.X_test_prepared = [X_test_seq, X_test_other]
-        else:
-            self.X_test_prepared = self.X_test
+        X_test = feature_matrix(self.X_test)
+        self.X_test_prepared = prepare_model_input(X_test, model_type)
         
         return self.X_test_prepared, self.y_test
     
+    def _predict_probabilities(self):
+        """Class probabilities for the test data (the first output of models with regression heads)"""
+        y_pred = self.model.predict(self.X_test_prepared)
+        return y_pred[0] if isinstance(y_pred, list) else y_pred
+    
     def evaluate(self):
         """Evaluate the model on test data"""
-        # Evaluate on test data
-        test_loss, test_accuracy = self.model.evaluate(self.X_test_prepared, self.y_test, verbose=1)
+        # Evaluate on test data (the class output only, for models with regression heads)
+        if len(self.model.outputs) > 1:
+            scores = self.model.evaluate(self.X_test_prepared, {'fault_type': self.y_test}, verbose=1, return_dict=True)
+            test_loss, test_accuracy = scores['loss'], scores['fault_type_accuracy']
+        else:
+            test_loss, test_accuracy = self.model.evaluate(self.X_test_prepared, self.y_test, verbose=1)
         print(f"Test Loss: {test_loss:.4f}")
         print(f"Test Accuracy: {test_accuracy:.4f}")
         
         # Generate predictions
-        y_pred = self.model.predict(self.X_test_prepared)
+        y_pred = self._predict_probabilities()
         y_pred_classes = np.argmax(y_pred, axis=1)
         
         # Classification report
@@ -136,7 +133,7 @@ class OTDRModelEvaluator:
     def analyze_misclassifications(self):
         """Analyze misclassified examples to understand model weaknesses"""
         # Generate predictions
-        y_pred = self.model.predict(self.X_test_prepared)
+        y_pred = self._predict_probabilities()
         y_pred_classes = np.argmax(y_pred, axis=1)
         
         # Find misclassified examples
@@ -156,6 +153,8 @@ class OTDRModelEvaluator:
         
         # Analyze each misclassified example
         misclassification_analysis = []
+        X_test = feature_matrix(self.X_test)
+        trace_index = [FEATURE_COLUMNS.index(col) for col in TRACE_COLUMNS]
         
         for idx in sample_indices:
             true_class = self.y_test[idx]
@@ -163,8 +162,7 @@ class OTDRModelEvaluator:
             confidence = y_pred[idx][pred_class]
             
             # Extract OTDR trace for plotting
-            trace_columns = [col for col in self.X_test.columns if col.startswith('P') and len(col) <= 3]
-            trace_values = self.X_test.iloc[idx][trace_columns].values
+            trace_values = X_test[idx, trace_index]
             
             # Create analysis entry
             analysis = {
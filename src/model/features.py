@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+# Bump whenever the engineered columns or their order change, so that processed
+# datasets and trained models can be matched against the code that serves them
+FEATURE_VERSION = 1
+
+# Raw input columns: SNR followed by the 30 OTDR trace points
+TRACE_COLUMNS = [f'P{i}' for i in range(1, 31)]
+RAW_COLUMNS = ['SNR'] + TRACE_COLUMNS
+
+# Engineered columns, in the order they are appended after the raw columns
+STAT_COLUMNS = ['trace_max', 'trace_min', 'trace_mean', 'trace_std', 'trace_range']
+DERIVATIVE_COLUMNS = [f'derivative_P{i}' for i in range(1, len(TRACE_COLUMNS))]
+SECOND_DERIVATIVE_COLUMNS = [f'second_derivative_P{i}' for i in range(2, len(TRACE_COLUMNS))]
+SNR_COLUMNS = ['snr_to_mean_ratio']
+
+FEATURE_COLUMNS = RAW_COLUMNS + STAT_COLUMNS + DERIVATIVE_COLUMNS + SECOND_DERIVATIVE_COLUMNS + SNR_COLUMNS
+
+# Fault properties in the raw dataset and the regression model outputs (and
+# prediction fields) estimating them, in the same order
+REGRESSION_COLUMNS = ['Position', 'Reflectance', 'loss']
+REGRESSION_OUTPUTS = ['location', 'reflectance', 'loss']
+
+# Non-sequence features fed to the second input of the lstm/cnn models
+OTHER_COLUMNS = [col for col in FEATURE_COLUMNS if col not in TRACE_COLUMNS]
+
+# Row ranges of the feature-major scratch block (one row per feature column)
+_TRACE = slice(1, 1 + len(TRACE_COLUMNS))
+_STATS = slice(len(RAW_COLUMNS), len(RAW_COLUMNS) + len(STAT_COLUMNS))
+_D1 = slice(_STATS.stop, _STATS.stop + len(DERIVATIVE_COLUMNS))
+_D2 = slice(_D1.stop, _D1.stop + len(SECOND_DERIVATIVE_COLUMNS))
+_OTHER_INDEX = np.array([FEATURE_COLUMNS.index(col) for col in OTHER_COLUMNS])
+
+# Rows compute_features processes per block; keeps the working set of a block in cache.
+# Splitting rows on multiples of it gives the same results as one call on all rows
+FEATURE_BLOCK_ROWS = 4096
+
+def to_raw_array(data):
+    """Convert a dict, list of dicts, DataFrame or array of raw inputs to an (N, 31) float32 array"""
+    if isinstance(data, dict):
+        data = [data]
+
+    if isinstance(data, pd.DataFrame):
+        missing = [col for col in RAW_COLUMNS if col not in data.columns]
+        if missing:
+            raise ValueError(f"Missing required column: {missing[0]}")
+        raw = data[RAW_COLUMNS].to_numpy(dtype=np.float32)
+    elif isinstance(data, np.ndarray):
+        raw = data.astype(np.float32, copy=False)
+        if raw.ndim == 1:
+            raw = raw.reshape(1, -1)
+    elif isinstance(data, (list, tuple)):
+        try:
+            raw = np.array([[row[col] for col in RAW_COLUMNS] for row in data], dtype=np.float32)
+        except KeyError as e:
+            raise ValueError(f"Missing required column: {e.args[0]}")
+        raw = raw.reshape(len(data), len(RAW_COLUMNS))
+    else:
+        raise ValueError("Input data must be a dictionary, list of dictionaries, DataFrame or array")
+
+    if raw.ndim != 2 or raw.shape[1] != len(RAW_COLUMNS):
+        raise ValueError(f"Expected input of shape (N, {len(RAW_COLUMNS)}), got {raw.shape}")
+
+    return raw
+
+def _fill_block(raw, out):
+    """Compute features for one block of rows of raw inputs into out"""
+    # Work feature-major so every reduction and difference runs over
+    # contiguous rows of the block instead of 30-wide strided rows
+    block = np.empty((len(FEATURE_COLUMNS), raw.shape[0]), dtype=np.float32)
+    block[:len(RAW_COLUMNS)] = raw.T
+    trace = block[_TRACE]
+    stats = block[_STATS]
+
+    # Statistical features (sample std, as computed by pandas during training)
+    np.max(trace, axis=0, out=stats[0])
+    np.min(trace, axis=0, out=stats[1])
+    np.mean(trace, axis=0, out=stats[2])
+    deviation = np.subtract(trace, stats[2])
+    np.square(deviation, out=deviation)
+    np.sum(deviation, axis=0, out=stats[3])
+    stats[3] /= len(TRACE_COLUMNS) - 1
+    np.sqrt(stats[3], out=stats[3])
+    np.subtract(stats[0], stats[1], out=stats[4])
+
+    # First and second derivatives along the trace
+    np.subtract(trace[1:], trace[:-1], out=block[_D1])
+    d1 = block[_D1]
+    np.subtract(d1[1:], d1[:-1], out=block[_D2])
+
+    # SNR-related features
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(block[0], stats[2], out=block[-1])
+
+    out[:] = block.T
+
+def compute_features(raw, out=None):
+    """
+    Compute the engineered feature matrix from raw (N, 31) inputs
+
+    Returns a C-contiguous float32 array of shape (N, len(FEATURE_COLUMNS))
+    whose columns follow FEATURE_COLUMNS. When out is given (an array of
+    that shape and dtype), the features are written into it instead.
+    """
+    raw = to_raw_array(raw)
+    n_rows = raw.shape[0]
+
+    features = np.empty((n_rows, len(FEATURE_COLUMNS)), dtype=np.float32) if out is None else out
+    for start in range(0, n_rows, FEATURE_BLOCK_ROWS):
+        stop = min(start + FEATURE_BLOCK_ROWS, n_rows)
+        _fill_block(raw[start:stop], features[start:stop])
+
+    return features
+
+def split_sequence_input(features):
+    """Split a feature matrix into the [sequence, other] inputs used by the lstm and cnn models"""
+    X_seq = np.ascontiguousarray(features[:, 1:len(RAW_COLUMNS)]).reshape(features.shape[0], len(TRACE_COLUMNS), 1)
+    X_other = features[:, _OTHER_INDEX]
+    return [X_seq, X_other]
+
+def prepare_model_input(features, model_type):
+    """Arrange a feature matrix in the input layout expected by the given model type"""
+    if model_type in ['lstm', 'cnn']:
+        return split_sequence_input(features)
+    return features
@@ -0,0 +1,95 @@
+import os
+import glob
+import time
+import numpy as np
+import tensorflow as tf
+import sys
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model.features import prepare_model_input
+from data_processing.dataset import feature_matrix
+
+def _class_targets(y, y_reg):
+    return (y,)
+
+def make_dataset(X, y, y_reg=None, model_type='dense', batch_size=64, targets=None, shuffle=False, seed=0,
+                 shuffle_buffer=10000, block_rows=4096, cache=''):
+    """
+    tf.data pipeline streaming (inputs, targets...) batches from a processed split
+
+    Rows are read block_rows at a time, rounded up to whole batches, from
+    X, y and y_reg (memory-mapped .npy splits are only paged in as blocks
+    are read), arranged in the input layout of model_type by
+    prepare_model_input in parallel map calls, then shuffled through a
+    buffer of shuffle_buffer rows, batched and prefetched. Memory use depends on the block and buffer sizes,
+    not on the number of rows.
+
+    targets(y, y_reg) gives the rest of each element for a block, such
+    as (targets, sample_weights); by default the class labels alone.
+    With shuffle, the order of the blocks is shuffled as well as the rows
+    inside the buffer. cache is "memory" to keep the prepared blocks in
+    memory after the first epoch, a file path to cache them on disk, or
+    empty to read the split on every epoch; cached blocks come back in
+    the order of the first epoch, shuffled by the row buffer only.
+    """
+    targets = targets or _class_targets
+    features = feature_matrix(X)
+    # Whole batches per block, so that only the last block ends in a partial batch
+    block_rows = -(-block_rows // batch_size) * batch_size
+    n_rows = len(features)
+
+    def read_block(start):
+        stop = min(start + block_rows, n_rows)
+        inputs = prepare_model_input(np.asarray(features[start:stop], dtype=np.float32), model_type)
+        block_y = np.asarray(y[start:stop])
+        block_y_reg = None if y_reg is None else np.asarray(y_reg[start:stop], dtype=np.float32)
+        return (tuple(inputs) if isinstance(inputs, list) else inputs,) + tuple(targets(block_y, block_y_reg))
+
+    # Structure and dtypes of an element, to rebuild it from the flat numpy_function outputs
+    example = read_block(0)
+    example_arrays = tf.nest.flatten(example)
+
+    def load_block(start):
+        arrays = tf.numpy_function(lambda s: tf.nest.flatten(read_block(int(s))), [start],
+                                   [tf.as_dtype(array.dtype) for array in example_arrays])
+        for tensor, array in zip(arrays, example_arrays):
+            tensor.set_shape((None,) + array.shape[1:])
+        return tf.nest.pack_sequence_as(example, arrays)
+
+    dataset = tf.data.Dataset.range(0, n_rows, block_rows)
+    if shuffle:
+        dataset = dataset.shuffle(-(-n_rows // block_rows), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.map(load_block, num_parallel_calls=tf.data.AUTOTUNE)
+    if cache:
+        dataset = dataset.cache('' if cache == 'memory' else cache)
+    if shuffle:
+        dataset = dataset.unbatch().shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True).batch(batch_size)
+    else:
+        # Cut blocks into batches without going through single rows
+        dataset = dataset.flat_map(lambda *block: tf.data.Dataset.from_tensor_slices(block).batch(batch_size))
+
+    # Known number of batches per epoch, for progress bars and steps
+    dataset = dataset.apply(tf.data.experimental.assert_cardinality(-(-n_rows // batch_size)))
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+def remove_cache_files(cache):
+    """Remove the files of an on-disk dataset cache, so that a new run does not read stale blocks"""
+    for path in glob.glob(f"{glob.escape(cache)}.*"):
+        os.remove(path)
+
+class ThroughputLogger(tf.keras.callbacks.Callback):
+    """Print and record the training samples per second of every epoch"""
+    def __init__(self, n_samples):
+        super().__init__()
+        self.n_samples = n_samples
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        samples_per_second = self.n_samples / (time.perf_counter() - self._start)
+        print(f"Epoch {epoch + 1}: {samples_per_second:.0f} samples/s")
+        if logs is not None:
+            # Recorded in the training history next to the losses
+            logs['samples_per_second'] = samples_per_second
@@ -0,0 +1,296 @@
+import os
+import sys
+import json
+import numpy as np
+
+# Version of the exported weight file layout
+EXPORT_FORMAT_VERSION = 1
+
+# Layer types the NumPy engine can evaluate
+SUPPORTED_LAYERS = ['InputLayer', 'Dense', 'Dropout', 'LSTM', 'Bidirectional', 'Conv1D',
+                    'MaxPooling1D', 'Flatten', 'Concatenate']
+
+def _layer_params(class_name, config):
+    """Keep only the configuration needed to evaluate a layer"""
+    if class_name == 'Dense':
+        return {'activation': config['activation']}
+    if class_name == 'LSTM':
+        return {
+            'units': config['units'],
+            'activation': config['activation'],
+            'recurrent_activation': config['recurrent_activation'],
+            'return_sequences': config['return_sequences'],
+            'go_backwards': config['go_backwards'],
+        }
+    if class_name == 'Bidirectional':
+        return {
+            'merge_mode': config['merge_mode'],
+            'layer': _layer_params(config['layer']['class_name'], config['layer']['config']),
+        }
+    if class_name == 'Conv1D':
+        return {
+            'activation': config['activation'],
+            'strides': config['strides'][0],
+            'padding': config['padding'],
+            'dilation_rate': config['dilation_rate'][0],
+        }
+    if class_name == 'MaxPooling1D':
+        pool_size = config['pool_size'][0]
+        strides = config['strides'][0] if config['strides'] else pool_size
+        return {'pool_size': pool_size, 'strides': strides, 'padding': config['padding']}
+    if class_name == 'Concatenate':
+        return {'axis': config['axis']}
+    return {}
+
+def export_numpy_model(model, path):
+    """
+    Export a trained Keras model to a compact .npz file for the NumPy engine
+
+    The file holds the float32 weights of every layer and a JSON description of
+    the layer graph (inbound layers, activations and shapes needed at inference).
+    """
+    config = model.get_config()
+    layers = []
+
+    if 'input_layers' in config:
+        # Functional model: follow the recorded inbound nodes
+        for layer_config in config['layers']:
+            inbound = layer_config['inbound_nodes'][0] if layer_config['inbound_nodes'] else []
+            layers.append({
+                'name': layer_config['name'],
+                'class_name': layer_config['class_name'],
+                'inbound': [node[0] for node in inbound],
+            })
+        inputs = [layer[0] for layer in config['input_layers']]
+        outputs = [layer[0] for layer in config['output_layers']]
+    else:
+        # Sequential model: every layer consumes the previous one
+        previous = 'input'
+        layers.append({'name': previous, 'class_name': 'InputLayer', 'inbound': []})
+        for layer_config in config['layers']:
+            if layer_config['class_name'] == 'InputLayer':
+                continue
+            name = layer_config['config']['name']
+            layers.append({'name': name, 'class_name': layer_config['class_name'], 'inbound': [previous]})
+            previous = name
+        inputs = ['input']
+        outputs = [previous]
+
+    arrays = {}
+    for layer in layers:
+        if layer['class_name'] not in SUPPORTED_LAYERS:
+            raise ValueError(f"Layer type not supported by the NumPy engine: {layer['class_name']}")
+        if layer['class_name'] == 'InputLayer':
+            continue
+
+        keras_layer = model.get_layer(layer['name'])
+        layer['params'] = _layer_params(layer['class_name'], keras_layer.get_config())
+
+        weights = keras_layer.get_weights()
+        layer['num_weights'] = len(weights)
+        for i, weight in enumerate(weights):
+            arrays[f"{layer['name']}/{i}"] = np.asarray(weight, dtype=np.float32)
+
+    graph = {
+        'format_version': EXPORT_FORMAT_VERSION,
+        'inputs': inputs,
+        'outputs': outputs,
+        'layers': layers,
+    }
+
+    with open(path, 'wb') as f:
+        np.savez(f, __graph__=np.frombuffer(json.dumps(graph).encode('utf-8'), dtype=np.uint8), **arrays)
+
+    return path
+
+def _activation(name, x):
+    if name == 'linear':
+        return x
+    if name == 'relu':
+        return np.maximum(x, 0, out=x)
+    if name == 'sigmoid':
+        # Equivalent to 1 / (1 + exp(-x)) without overflow for large |x|
+        return 0.5 * (1.0 + np.tanh(0.5 * x))
+    if name == 'tanh':
+        return np.tanh(x)
+    if name == 'softmax':
+        x = np.exp(x - x.max(axis=-1, keepdims=True))
+        return x / x.sum(axis=-1, keepdims=True)
+    raise ValueError(f"Activation not supported by the NumPy engine: {name}")
+
+def _lstm(x, params, kernel, recurrent_kernel, bias):
+    """Evaluate a Keras LSTM layer (gate order i, f, c, o) on a (N, T, F) input"""
+    units = params['units']
+    n_rows, n_steps, n_features = x.shape
+
+    if params['go_backwards']:
+        x = x[:, ::-1]
+
+    # Input projections for all time steps in one matrix product, laid out
+    # time-major so each step reads a contiguous (N, 4 * units) block
+    x = np.ascontiguousarray(x.transpose(1, 0, 2)).reshape(n_steps * n_rows, n_features)
+    projected = (x @ kernel + bias).reshape(n_steps, n_rows, 4 * units)
+
+    h = np.zeros((n_rows, units), dtype=np.float32)
+    c = np.zeros((n_rows, units), dtype=np.float32)
+    sequence = np.empty((n_rows, n_steps, units), dtype=np.float32) if params['return_sequences'] else None
+
+    for t in range(n_steps):
+        z = projected[t]
+        z += h @ recurrent_kernel
+        i = _activation(params['recurrent_activation'], z[:, :units])
+        f = _activation(params['recurrent_activation'], z[:, units:2 * units])
+        g = _activation(params['activation'], z[:, 2 * units:3 * units])
+        o = _activation(params['recurrent_activation'], z[:, 3 * units:])
+        c = f * c + i * g
+        h = o * _activation(params['activation'], c)
+        if sequence is not None:
+            sequence[:, t] = h
+
+    return sequence if sequence is not None else h
+
+def _bidirectional(x, params, weights):
+    forward_params = dict(params['layer'])
+    backward_params = dict(forward_params, go_backwards=not forward_params['go_backwards'])
+    half = len(weights) // 2
+
+    forward = _lstm(x, forward_params, *weights[:half])
+    backward = _lstm(x, backward_params, *weights[half:])
+    if backward_params['return_sequences']:
+        # Align the backward sequence with the forward time axis
+        backward = backward[:, ::-1]
+
+    merge_mode = params['merge_mode']
+    if merge_mode == 'concat':
+        return np.concatenate([forward, backward], axis=-1)
+    if merge_mode == 'sum':
+        return forward + backward
+    if merge_mode == 'mul':
+        return forward * backward
+    if merge_mode == 'ave':
+        return (forward + backward) / 2
+    raise ValueError(f"Bidirectional merge mode not supported by the NumPy engine: {merge_mode}")
+
+def _conv1d(x, params, kernel, bias=None):
+    """Evaluate a Conv1D layer with 'valid' padding on a (N, L, C) input"""
+    if params['padding'] != 'valid' or params['dilation_rate'] != 1:
+        raise ValueError("The NumPy engine only supports Conv1D with 'valid' padding and no dilation")
+
+    kernel_size, n_channels, n_filters = kernel.shape
+    strides = params['strides']
+    n_rows = x.shape[0]
+    out_length = (x.shape[1] - kernel_size) // strides + 1
+
+    # Gather every window into one (N * L_out, kernel_size * C) matrix so the
+    # convolution becomes a single matrix product
+    windows = np.concatenate(
+        [x[:, k:k + strides * (out_length - 1) + 1:strides] for k in range(kernel_size)], axis=-1
+    ).reshape(n_rows * out_length, kernel_size * n_channels)
+    out = windows @ kernel.reshape(kernel_size * n_channels, n_filters)
+    if bias is not None:
+        out += bias
+    out = out.reshape(n_rows, out_length, n_filters)
+
+    return _activation(params['activation'], out)
+
+def _max_pooling1d(x, params):
+    if params['padding'] != 'valid':
+        raise ValueError("The NumPy engine only supports MaxPooling1D with 'valid' padding")
+
+    pool_size, strides = params['pool_size'], params['strides']
+    out_length = (x.shape[1] - pool_size) // strides + 1
+
+    if strides == pool_size:
+        windows = x[:, :out_length * pool_size].reshape(x.shape[0], out_length, pool_size, x.shape[2])
+        return windows.max(axis=2)
+
+    out = x[:, 0:strides * (out_length - 1) + 1:strides]
+    for k in range(1, pool_size):
+        out = np.maximum(out, x[:, k:k + strides * (out_length - 1) + 1:strides])
+    return out
+
+class NumpyModel:
+    """
+    TensorFlow-free forward pass for models exported with export_numpy_model
+
+    Supports the Dense, Bidirectional LSTM and Conv1D/MaxPooling1D stacks built
+    by OTDRFaultDetectionModel.build_model, with the same predict interface as
+    the Keras model (a single array or a list of arrays, one per input).
+    """
+    def __init__(self, path):
+        with np.load(path) as data:
+            graph = json.loads(data['__graph__'].tobytes().decode('utf-8'))
+            weights = {key: data[key] for key in data.files if key != '__graph__'}
+
+        if graph['format_version'] != EXPORT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported NumPy model format version: {graph['format_version']}")
+
+        self.path = path
+        self.inputs = graph['inputs']
+        self.outputs = graph['outputs']
+        self.layers = graph['layers']
+        self.weights = {
+            layer['name']: [weights[f"{layer['name']}/{i}"] for i in range(layer.get('num_weights', 0))]
+            for layer in self.layers
+        }
+
+    def _call_layer(self, layer, inputs):
+        class_name = layer['class_name']
+        params = layer.get('params', {})
+        weights = self.weights[layer['name']]
+
+        if class_name == 'Dense':
+            out = inputs[0] @ weights[0]
+            if len(weights) > 1:
+                out += weights[1]
+            return _activation(params['activation'], out)
+        if class_name == 'Dropout':
+            return inputs[0]
+        if class_name == 'LSTM':
+            return _lstm(inputs[0], params, *weights)
+        if class_name == 'Bidirectional':
+            return _bidirectional(inputs[0], params, weights)
+        if class_name == 'Conv1D':
+            return _conv1d(inputs[0], params, *weights)
+        if class_name == 'MaxPooling1D':
+            return _max_pooling1d(inputs[0], params)
+        if class_name == 'Flatten':
+            return inputs[0].reshape(inputs[0].shape[0], -1)
+        if class_name == 'Concatenate':
+            return np.concatenate(inputs, axis=params['axis'])
+        raise ValueError(f"Layer type not supported by the NumPy engine: {class_name}")
+
+    def predict_on_batch(self, X):
+        """Run the forward pass on one batch of inputs"""
+        X = X if isinstance(X, (list, tuple)) else [X]
+        if len(X) != len(self.inputs):
+            raise ValueError(f"Expected {len(self.inputs)} inputs, got {len(X)}")
+
+        outputs = {name: np.asarray(x, dtype=np.float32) for name, x in zip(self.inputs, X)}
+        for layer in self.layers:
+            if layer['class_name'] == 'InputLayer':
+                continue
+            outputs[layer['name']] = self._call_layer(layer, [outputs[name] for name in layer['inbound']])
+
+        results = [outputs[name] for name in self.outputs]
+        return results[0] if len(results) == 1 else results
+
+    def predict(self, X, **kwargs):
+        """Keras-compatible alias for predict_on_batch"""
+        return self.predict_on_batch(X)
+
+if __name__ == "__main__":
+    import yaml
+    from tensorflow.keras.models import load_model
+
+    # Export the trained model next to the Keras artifact
+    with open('../../config.yaml', 'r') as file:
+        config = yaml.safe_load(file)
+
+    model_path = os.path.join(config['model']['model_save_path'], 'best_model.h5')
+    if len(sys.argv) > 1:
+        model_path = sys.argv[1]
+    export_path = os.path.splitext(model_path)[0] + '.npz'
+
+    export_numpy_model(load_model(model_path), export_path)
+    print(f"Exported NumPy model to {export_path}")
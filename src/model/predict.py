@@ -1,27 +1,60 @@
 import os
 import numpy as np
-import pandas as pd
-import tensorflow as tf
-from tensorflow.keras.models import load_model
 import yaml
 import pickle
 import json
+import sys
+import time
+import hashlib
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model.features import REGRESSION_OUTPUTS, to_raw_array, compute_features, prepare_model_input
+from model.numpy_engine import NumpyModel
+from model.quantize import TFLiteModel, quantized_model_path
+from model.prediction_cache import PredictionCache
 
 class OTDRFaultDetector:
     """
     Class for making predictions on OTDR traces for fault detection
     """
-    def __init__(self, config_path='../../config.yaml', model_path=None):
+    def __init__(self, config_path='../../config.yaml', model_path=None, model_type=None):
         # Load configuration
         with open(config_path, 'r') as file:
             self.config = yaml.safe_load(file)
         
+        # Architecture of the model, which decides its input layout (defaults to the configured one)
+        self.model_type = model_type or self.config['model']['model_type']
+        
         # Set default model path if not provided
         if model_path is None:
             model_path = os.path.join(self.config['model']['model_save_path'], 'best_model.h5')
         
+        # Inference engine: "keras" (TensorFlow), "numpy" (exported weights, no TensorFlow import)
+        # or "tflite" (a quantized variant written by quantize.py)
+        self.engine = self.config.get('api', {}).get('inference_engine', 'keras')
+        
         # Load the model
+        self.model_path = model_path
+        self.loaded_model_path = None
         self.model = self.load_model(model_path)
+        self.model_version = self._compute_model_version()
+        
+        # Optional cache of prediction results keyed on quantized trace content
+        cache_config = self.config.get('api', {}).get('prediction_cache', {})
+        self.cache = None
+        if cache_config.get('enabled', False):
+            self.cache = PredictionCache(
+                max_size=cache_config.get('max_size', 10000),
+                ttl_seconds=cache_config.get('ttl_seconds', 300),
+                decimals=cache_config.get('decimals', 3)
+            )
+        
+        # Number of rows passed to the model in a single call during batch prediction
+        self.batch_chunk_size = self.config.get('api', {}).get('batch_chunk_size', 1024)
+        
+        # Optional callback(stage, seconds, n_rows) told how long each prediction stage took
+        self.stage_observer = None
         
         # Class names for reference
         self.class_names = ['Normal', 'Fiber Tapping', 'Bad Splice', 'Bending Event', 
@@ -29,8 +62,16 @@ class OTDRFaultDetector:
     
     def load_model(self, model_path):
         """Load the trained model"""
+        if self.engine == 'numpy':
+            return self.load_numpy_model(model_path)
+        if self.engine == 'tflite':
+            return self.load_tflite_model(model_path)
+        
         try:
+            # Imported here so the numpy engine never pays for importing TensorFlow
+            from tensorflow.keras.models import load_model
             model = load_model(model_path)
+            self.loaded_model_path = model_path
             print(f"Model loaded from {model_path}")
             return model
         except Exception as e:
@@ -40,99 +81,207 @@ class OTDRFaultDetector:
                 model_pkl_path = model_path.replace('.h5', '.pkl')
                 with open(model_pkl_path, 'rb') as f:
                     model = pickle.load(f)
+                self.loaded_model_path = model_pkl_path
                 print(f"Model loaded from {model_pkl_path}")
                 return model
             except Exception as e2:
                 print(f"Error loading model from pickle: {e2}")
                 return None
     
+    def load_numpy_model(self, model_path):
+        """Load a model exported for the NumPy engine (same path with a .npz extension)"""
+        npz_path = os.path.splitext(model_path)[0] + '.npz'
+        try:
+            model = NumpyModel(npz_path)
+            self.loaded_model_path = npz_path
+            print(f"NumPy model loaded from {npz_path}")
+            return model
+        except Exception as e:
+            print(f"Error loading NumPy model: {e}")
+            return None
+    
+    def load_tflite_model(self, model_path):
+        """Load the configured quantized variant of a model (e.g. best_model.dynamic_int8.tflite)"""
+        api_config = self.config.get('api', {})
+        tflite_path = quantized_model_path(model_path, api_config.get('tflite_variant', 'dynamic_int8'))
+        try:
+            model = TFLiteModel(tflite_path, num_threads=api_config.get('tflite_threads'))
+            self.loaded_model_path = tflite_path
+            print(f"TFLite model loaded from {tflite_path}")
+            return model
+        except Exception as e:
+            print(f"Error loading TFLite model: {e}")
+            return None
+    
+    def _compute_model_version(self):
+        """Short content hash of the loaded model file, used to tell model versions apart"""
+        if self.loaded_model_path is None or not os.path.exists(self.loaded_model_path):
+            return "unknown"
+        
+        digest = hashlib.sha256()
+        with open(self.loaded_model_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()[:12]
+    
+    def reload_model(self, model_path=None):
+        """Reload the model from disk and drop cached predictions of the previous model"""
+        if model_path is None:
+            model_path = self.model_path
+        
+        self.loaded_model_path = None
+        self.model = self.load_model(model_path)
+        self.model_path = model_path
+        self.model_version = self._compute_model_version()
+        
+        if self.cache is not None:
+            self.cache.clear()
+        
+        return self.model
+    
+    def warm_up(self):
+        """Run one prediction outside the cache so the first real request does not pay for graph setup"""
+        raw = np.zeros((1, 31), dtype=np.float32)
+        raw[0, 0] = 15.0
+        raw[0, 1:] = 0.5
+        self._score(raw)
+    
     def preprocess_input(self, data):
         """Preprocess input data for prediction"""
-        # Check if data is a dictionary or DataFrame
-        if isinstance(data, dict):
-            # Convert dictionary to DataFrame
-            df = pd.DataFrame([data])
-        elif isinstance(data, pd.DataFrame):
-            df = data
-        else:
-            raise ValueError("Input data must be a dictionary or DataFrame")
+        # Accepts a dictionary, list of dictionaries, DataFrame or (N, 31) array
+        raw = to_raw_array(data)
+        
+        # Add engineered features (shared with preprocessing in training)
+        features = compute_features(raw)
         
-        # Ensure all required columns are present
-        required_columns = ['SNR'] + [f'P{i}' for i in range(1, 31)]
-        for col in required_columns:
-            if col not in df.columns:
-                raise ValueError(f"Missing required column: {col}")
+        # Prepare data based on model type
+        return prepare_model_input(features, self.model_type)
+    
+    def _run_model(self, X, chunk_size=None):
+        """
+        Run the model over preprocessed input in chunks of at most chunk_size rows
         
-        # Add engineered features (similar to preprocessing in training)
-        trace_columns = [col for col in df.columns if col.startswith('P')]
+        Returns the class probabilities, or a list of arrays (class
+        probabilities first) for a model with regression heads.
+        """
+        if chunk_size is None:
+            chunk_size = self.batch_chunk_size
         
-        # Add statistical features
-        df['trace_max'] = df[trace_columns].max(axis=1)
-        df['trace_min'] = df[trace_columns].min(axis=1)
-        df['trace_mean'] = df[trace_columns].mean(axis=1)
-        df['trace_std'] = df[trace_columns].std(axis=1)
-        df['trace_range'] = df['trace_max'] - df['trace_min']
+        inputs = X if isinstance(X, list) else [X]
+        n_rows = inputs[0].shape[0]
         
-        # Add derivatives
-        for i in range(1, len(trace_columns)):
-            df[f'derivative_P{i}'] = df[f'P{i}'] - df[f'P{i-1}']
+        # Keras models expose predict_on_batch, which skips the per-call
+        # dataset/callback setup done by predict()
+        run = getattr(self.model, 'predict_on_batch', None) or self.model.predict
         
-        for i in range(2, len(trace_columns)):
-            df[f'second_derivative_P{i}'] = df[f'derivative_P{i}'] - df[f'derivative_P{i-1}']
+        outputs = []
+        for start in range(0, n_rows, chunk_size):
+            chunk = [x[start:start + chunk_size] for x in inputs]
+            outputs.append(run(chunk if isinstance(X, list) else chunk[0]))
         
-        # Add SNR-related features
-        df['snr_to_mean_ratio'] = df['SNR'] / df['trace_mean']
+        if isinstance(outputs[0], (list, tuple)):
+            return [np.concatenate([np.asarray(output[i]) for output in outputs], axis=0) for i in range(len(outputs[0]))]
+        return np.concatenate([np.asarray(output) for output in outputs], axis=0)
+    
+    def _format_predictions(self, y_pred):
+        """
+        Convert model outputs into prediction results
         
-        # Prepare data based on model type
-        model_type = self.config['model']['model_type']
-        
-        if model_type in ['lstm', 'cnn']:
-            # Extract OTDR trace points for sequence input
-            trace_cols = [col for col in df.columns if col.startswith('P') and len(col) <= 3]
-            X_seq = df[trace_cols].values.reshape(df.shape[0], len(trace_cols), 1)
-            
-            # Extract other features
-            other_cols = [col for col in df.columns if col not in trace_cols]
-            X_other = df[other_cols].values
-            
-            return [X_seq, X_other]
+        With regression heads, the outputs after the class probabilities
+        estimate the location, reflectance and loss of the fault; these are
+        set for traces predicted faulty and None for Normal ones.
+        """
+        regression = None
+        if isinstance(y_pred, list):
+            y_pred, regression = y_pred[0], np.concatenate(y_pred[1:], axis=1).tolist()
+        pred_classes = np.argmax(y_pred, axis=1)
+        
+        results = []
+        for row, (probs, pred_class) in enumerate(zip(y_pred.tolist(), pred_classes.tolist())):
+            result = {
+                'fault_type': int(pred_class),
+                'fault_name': self.class_names[pred_class],
+                'confidence': float(probs[pred_class]),
+                'all_probabilities': {
+                    self.class_names[i]: float(probs[i]) for i in range(len(self.class_names))
+                }
+            }
+            if regression is not None:
+                # Class 0 (Normal) has no fault to locate
+                for name, value in zip(REGRESSION_OUTPUTS, regression[row]):
+                    result[name] = float(value) if pred_class != 0 else None
+            results.append(result)
+        
+        return results
+    
+    def _score(self, raw, chunk_size=None, features=None):
+        """Run feature engineering (unless features are given) and the model on an (N, 31) raw input array"""
+        start = time.perf_counter()
+        if features is None:
+            X = self.preprocess_input(raw)
         else:
-            # For dense neural network, return the entire DataFrame
-            return df
+            X = prepare_model_input(features, self.model_type)
+        features_done = time.perf_counter()
+        y_pred = self._run_model(X, chunk_size=chunk_size)
+        model_done = time.perf_counter()
+        results = self._format_predictions(y_pred)
+        
+        if self.stage_observer is not None:
+            self.stage_observer('features', features_done - start, len(raw))
+            self.stage_observer('model', model_done - features_done, len(raw))
+            self.stage_observer('format', time.perf_counter() - model_done, len(raw))
+        
+        return results
+    
+    def _predict_raw(self, raw, chunk_size=None, features=None):
+        """Predict an (N, 31) raw input array, serving repeated traces from the cache"""
+        if self.cache is None:
+            return self._score(raw, chunk_size, features)
+        
+        start = time.perf_counter()
+        keys = self.cache.make_keys(raw, self.model_version)
+        results = [self.cache.get(key) for key in keys]
+        if self.stage_observer is not None:
+            self.stage_observer('cache', time.perf_counter() - start, len(raw))
+        
+        # Only score the rows that were not found in the cache
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            missing_features = features[missing] if features is not None else None
+            for i, result in zip(missing, self._score(raw[missing], chunk_size, missing_features)):
+                results[i] = result
+                self.cache.put(keys[i], result)
+        
+        return results
     
     def predict(self, data):
         """Make prediction on input data"""
-        # Preprocess input data
-        X = self.preprocess_input(data)
-        
-        # Make prediction
-        y_pred = self.model.predict(X)
-        
-        # Get predicted class and probability
-        pred_class = np.argmax(y_pred, axis=1)[0]
-        pred_prob = float(y_pred[0][pred_class])
-        
-        # Create prediction result
-        result = {
-            'fault_type': int(pred_class),
-            'fault_name': self.class_names[pred_class],
-            'confidence': pred_prob,
-            'all_probabilities': {
-                self.class_names[i]: float(y_pred[0][i]) for i in range(len(self.class_names))
-            }
-        }
-        
-        return result
+        # Stack the input into a raw (1, 31) array and predict the first row
+        raw = to_raw_array(data)[:1]
+        return self._predict_raw(raw)[0]
     
-    def batch_predict(self, data_list):
-        """Make predictions on a batch of input data"""
-        results = []
+    def batch_predict(self, data_list, chunk_size=None):
+        """
+        Make predictions on a batch of input data
         
-        for data in data_list:
-            result = self.predict(data)
-            results.append(result)
+        All traces are stacked into one array, feature engineering runs once for
+        the whole batch and the model is called once per chunk of chunk_size rows.
+        Results are returned in input order.
+        """
+        if len(data_list) == 0:
+            return []
         
-        return results
+        return self._predict_raw(to_raw_array(data_list), chunk_size)
+    
+    def predict_with_features(self, raw, features, chunk_size=None):
+        """
+        Make predictions on an (N, 31) raw input array whose feature matrix
+        (from compute_features) has already been computed, e.g. for validation
+        """
+        if len(raw) == 0:
+            return []
+        
+        return self._predict_raw(to_raw_array(raw), chunk_size, features)
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+class PredictionCache:
+    """
+    Bounded LRU cache of prediction results with a time-to-live
+
+    Entries are keyed on the raw (SNR, P1..P30) values quantized to a fixed
+    number of decimals plus the model version, so near-identical traces from
+    successive polling cycles share a result and a new model never serves
+    results computed by the previous one.
+    """
+    def __init__(self, max_size=10000, ttl_seconds=300, decimals=3):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.decimals = decimals
+        self._scale = 10.0 ** decimals
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def make_keys(self, raw, model_version):
+        """Build one cache key per row of an (N, 31) raw input array"""
+        quantized = np.rint(np.asarray(raw, dtype=np.float64) * self._scale).astype(np.int64)
+        return [(model_version, row.tobytes()) for row in quantized]
+
+    def get(self, key):
+        """Return the cached result for key, or None on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, result = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result):
+        """Store a result, evicting the least recently used entries beyond max_size"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every cached entry (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return size and hit/miss/eviction counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "decimals": self.decimals,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
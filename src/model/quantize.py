@@ -0,0 +1,254 @@
+import os
+import sys
+import json
+import time
+import threading
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model.features import REGRESSION_OUTPUTS, prepare_model_input
+
+# Reduced-precision TFLite variants: float32 (no quantization, for reference),
+# float16 weights, int8 weights with float activations (dynamic range), and
+# int8 weights and activations calibrated on training data
+QUANTIZATION_VARIANTS = ['float32', 'float16', 'dynamic_int8', 'int8']
+
+# Keras output order of models with regression heads (class probabilities first)
+OUTPUT_ORDER = ['fault_type'] + REGRESSION_OUTPUTS
+
+def quantized_model_path(model_path, variant):
+    """Path of a quantized variant of a model (best_model.h5 -> best_model.dynamic_int8.tflite)"""
+    return f"{os.path.splitext(model_path)[0]}.{variant}.tflite"
+
+def _unroll_lstms(config):
+    if isinstance(config, dict):
+        if config.get('class_name') == 'LSTM':
+            config['config']['unroll'] = True
+        for value in config.values():
+            _unroll_lstms(value)
+    elif isinstance(config, list):
+        for value in config:
+            _unroll_lstms(value)
+
+def convert_to_tflite(model, variant, representative_data=None):
+    """
+    Convert a trained Keras model to a TFLite flatbuffer of the given variant
+
+    LSTM layers are unrolled over the 30 trace points first: TFLite keeps the
+    state of its fused LSTM op at a fixed batch size, while the unrolled
+    matrix products accept any batch size. representative_data (a list of
+    model inputs, one row each) calibrates the activations of the int8 variant.
+    """
+    import tensorflow as tf
+
+    if variant not in QUANTIZATION_VARIANTS:
+        raise ValueError(f"Unknown quantization variant: {variant}")
+
+    config = model.get_config()
+    _unroll_lstms(config)
+    unrolled = model.__class__.from_config(config)
+    unrolled.set_weights(model.get_weights())
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(unrolled)
+    if variant != 'float32':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if variant == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    if variant == 'int8':
+        if representative_data is None:
+            raise ValueError("The int8 variant needs representative data to calibrate activations")
+        converter.representative_dataset = lambda: iter(representative_data)
+
+    return converter.convert()
+
+class TFLiteModel:
+    """
+    Forward pass of a TFLite model with the predict interface of the Keras model
+
+    Inputs are matched to the interpreter's input tensors by shape, and
+    outputs are returned in the Keras output order (class probabilities
+    first). The interpreter is not thread-safe, so calls are serialized.
+    """
+    def __init__(self, path, num_threads=None):
+        try:
+            # The standalone runtime serves without importing TensorFlow
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        self.path = path
+        self.interpreter = Interpreter(model_path=path, num_threads=num_threads)
+        self._inputs = self.interpreter.get_input_details()
+        self._outputs = self._keras_ordered_outputs()
+        self._shapes = None
+        self._lock = threading.Lock()
+
+    def _keras_ordered_outputs(self):
+        # Output tensors are named <function>:<i>, where i indexes the Keras
+        # output names in sorted order rather than in the model's order
+        outputs = sorted(self.interpreter.get_output_details(), key=lambda d: int(d['name'].rsplit(':', 1)[-1]))
+        signatures = list(self.interpreter.get_signature_list().values())
+        names = sorted(signatures[0]['outputs']) if signatures else []
+        if len(names) != len(outputs):
+            return outputs
+        by_name = dict(zip(names, outputs))
+        order = [name for name in OUTPUT_ORDER if name in by_name] + [name for name in names if name not in OUTPUT_ORDER]
+        return [by_name[name] for name in order]
+
+    def _input_indices(self, X):
+        by_shape = {tuple(int(n) for n in d['shape'][1:]): d['index'] for d in self._inputs}
+        if len(by_shape) == len(self._inputs) and all(x.shape[1:] in by_shape for x in X):
+            return [by_shape[x.shape[1:]] for x in X]
+        return [d['index'] for d in self._inputs]
+
+    def predict_on_batch(self, X):
+        """Run the model on one batch of inputs"""
+        X = X if isinstance(X, (list, tuple)) else [X]
+        if len(X) != len(self._inputs):
+            raise ValueError(f"Expected {len(self._inputs)} inputs, got {len(X)}")
+        X = [np.ascontiguousarray(x, dtype=np.float32) for x in X]
+
+        with self._lock:
+            indices = self._input_indices(X)
+            shapes = [x.shape for x in X]
+            if shapes != self._shapes:
+                # Resizing reallocates every tensor; skip it while batch sizes repeat
+                for index, x in zip(indices, X):
+                    self.interpreter.resize_tensor_input(index, x.shape)
+                self.interpreter.allocate_tensors()
+                self._shapes = shapes
+
+            for index, x in zip(indices, X):
+                self.interpreter.set_tensor(index, x)
+            self.interpreter.invoke()
+            results = [self.interpreter.get_tensor(d['index']) for d in self._outputs]
+
+        return results[0] if len(results) == 1 else results
+
+    def predict(self, X, **kwargs):
+        """Keras-compatible alias for predict_on_batch"""
+        return self.predict_on_batch(X)
+
+def _class_probabilities(model, X):
+    y_pred = model.predict_on_batch(X)
+    return np.asarray(y_pred[0] if isinstance(y_pred, list) else y_pred)
+
+def _latency_ms(model, X, batch_size, repeat):
+    """Median wall-clock time of predict_on_batch on batch_size rows of X"""
+    n_rows = len(X[0]) if isinstance(X, list) else len(X)
+    rows = np.arange(batch_size) % n_rows
+    batch = [x[rows] for x in X] if isinstance(X, list) else X[rows]
+
+    model.predict_on_batch(batch)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        model.predict_on_batch(batch)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times) * 1000)
+
+class OTDRModelQuantizer:
+    """
+    Class for writing quantized TFLite variants of a trained model and
+    comparing their accuracy, size and latency with the Keras model
+    """
+    def __init__(self, config_path='../../config.yaml'):
+        import yaml
+        self.config_path = config_path
+        with open(config_path, 'r') as file:
+            self.config = yaml.safe_load(file)
+
+        self.model_type = self.config['model']['model_type']
+        # Every variant when run directly with none configured for training
+        self.variants = self.config['model'].get('quantization_variants') or QUANTIZATION_VARIANTS
+        self.num_threads = self.config.get('api', {}).get('tflite_threads')
+
+    def representative_data(self, n_rows=200):
+        """Model inputs for single rows of the processed training split, to calibrate the int8 variant"""
+        # Not at module level: the API image ships src/model without src/data_processing
+        from data_processing.dataset import load_split, feature_matrix
+
+        X_train = feature_matrix(load_split(self.config['data']['processed_data_path'], 'train')[0])
+        rng = np.random.default_rng(self.config['data']['random_seed'])
+        rows = rng.choice(len(X_train), size=min(n_rows, len(X_train)), replace=False)
+
+        X = prepare_model_input(X_train[rows], self.model_type)
+        X = X if isinstance(X, list) else [X]
+        return [[x[i:i + 1] for x in X] for i in range(len(rows))]
+
+    def quantize(self, model_path=None):
+        """Write every configured variant next to the model and return their paths by variant"""
+        from tensorflow.keras.models import load_model
+
+        if model_path is None:
+            model_path = os.path.join(self.config['model']['model_save_path'], 'best_model.h5')
+        self.model_path = model_path
+        self.model = load_model(model_path)
+
+        representative_data = self.representative_data() if 'int8' in self.variants else None
+        self.paths = {}
+        for variant in self.variants:
+            path = quantized_model_path(model_path, variant)
+            with open(path, 'wb') as f:
+                f.write(convert_to_tflite(self.model, variant, representative_data))
+            self.paths[variant] = path
+            print(f"Wrote {variant} variant to {path} ({os.path.getsize(path) / 1024:.0f} KB)")
+
+        return self.paths
+
+    def report(self, repeat=50):
+        """
+        Score the Keras model and every variant on the evaluator's test split
+
+        Writes quantization_report.json with accuracy, per-class F1, model size
+        and median batch-1 and batch-256 latency per variant, plus the share of
+        test predictions that agree with the Keras model.
+        """
+        from sklearn.metrics import accuracy_score, f1_score
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+        from src.model.evaluate import OTDRModelEvaluator
+
+        # Same test split and input layout as the model evaluation
+        evaluator = OTDRModelEvaluator(config_path=self.config_path)
+        X_test, y_test = evaluator.load_test_data()
+        class_names = ['Normal', 'Fiber Tapping', 'Bad Splice', 'Bending Event',
+                       'Dirty Connector', 'Fiber Cut', 'PC Connector', 'Reflector']
+
+        models = {'keras': (self.model, self.model_path)}
+        for variant, path in self.paths.items():
+            models[variant] = (TFLiteModel(path, num_threads=self.num_threads), path)
+
+        reference = _class_probabilities(self.model, X_test).argmax(axis=1)
+        report = {'model_path': self.model_path, 'test_rows': int(len(y_test)), 'variants': {}}
+        for name, (model, path) in models.items():
+            predicted = _class_probabilities(model, X_test).argmax(axis=1)
+            f1 = f1_score(y_test, predicted, labels=range(len(class_names)), average=None, zero_division=0)
+            report['variants'][name] = {
+                'path': path,
+                'size_kb': os.path.getsize(path) / 1024,
+                'accuracy': float(accuracy_score(y_test, predicted)),
+                'agreement_with_keras': float(np.mean(predicted == reference)),
+                'f1': {class_name: float(score) for class_name, score in zip(class_names, f1)},
+                'latency_ms_batch_1': _latency_ms(model, X_test, 1, repeat),
+                'latency_ms_batch_256': _latency_ms(model, X_test, 256, max(1, repeat // 5)),
+            }
+
+        report_path = os.path.join(self.config['model']['model_save_path'], 'quantization_report.json')
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+        print(f"{'variant':>13} {'size (KB)':>10} {'accuracy':>9} {'agreement':>10} {'macro F1':>9} {'batch 1 (ms)':>13} {'batch 256 (ms)':>15}")
+        for name, scores in report['variants'].items():
+            print(f"{name:>13} {scores['size_kb']:>10.0f} {scores['accuracy']:>9.4f} {scores['agreement_with_keras']:>10.4f} "
+                  f"{np.mean(list(scores['f1'].values())):>9.4f} {scores['latency_ms_batch_1']:>13.3f} {scores['latency_ms_batch_256']:>15.2f}")
+        print(f"Quantization report saved to {report_path}")
+
+        return report
+
+if __name__ == "__main__":
+    # Quantize the trained model and compare the variants on the test split
+    quantizer = OTDRModelQuantizer(config_path='../../config.yaml')
+    quantizer.quantize(sys.argv[1] if len(sys.argv) > 1 else None)
+    quantizer.report()
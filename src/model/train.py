@@ -1,8 +1,7 @@
 import os
 import numpy as np
-import pandas as pd
 import tensorflow as tf
-from tensorflow.keras.models import Sequential, Model
+from tensorflow.keras.models import Model
 from tensorflow.keras.layers import Dense, Dropout, LSTM, Input, Bidirectional, Conv1D, MaxPooling1D, Flatten, concatenate
 from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
@@ -11,10 +10,19 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import yaml
 import pickle
+import argparse
 import sys
 
 sys.path.append('../../')
 from src.data_processing.preprocess import OTDRDataProcessor
+from src.data_processing.dataset import has_processed_data, load_split, feature_matrix
+from src.model.features import (
+    FEATURE_COLUMNS, TRACE_COLUMNS, OTHER_COLUMNS, REGRESSION_COLUMNS, REGRESSION_OUTPUTS, prepare_model_input
+)
+from src.model.numpy_engine import export_numpy_model
+from src.model.quantize import OTDRModelQuantizer
+from src.model.input_pipeline import make_dataset, remove_cache_files, ThroughputLogger
+from src.model.cross_validate import OTDRCrossValidator
 
 class OTDRFaultDetectionModel:
     """
@@ -31,17 +39,19 @@ class OTDRFaultDetectionModel:
         # Set random seeds for reproducibility
         np.random.seed(self.config['data']['random_seed'])
         tf.random.set_seed(self.config['data']['random_seed'])
+        
+        # Position, Reflectance and loss targets of the regression heads (None when not available)
+        self.y_reg_train = self.y_reg_val = self.y_reg_test = None
     
     def load_processed_data(self):
         """Load the processed data for model training"""
         processed_dir = self.config['data']['processed_data_path']
         
-        self.X_train = pd.read_csv(f"{processed_dir}/X_train.csv")
-        self.y_train = pd.read_csv(f"{processed_dir}/y_train.csv").values.ravel()
-        self.X_val = pd.read_csv(f"{processed_dir}/X_val.csv")
-        self.y_val = pd.read_csv(f"{processed_dir}/y_val.csv").values.ravel()
-        self.X_test = pd.read_csv(f"{processed_dir}/X_test.csv")
-        self.y_test = pd.read_csv(f"{processed_dir}/y_test.csv").values.ravel()
+        # Memory-mapped .npy splits, or DataFrames for data processed as CSV. Fault property
+        # targets are None for data processed before the regression heads existed
+        self.X_train, self.y_train, self.y_reg_train = load_split(processed_dir, 'train')
+        self.X_val, self.y_val, self.y_reg_val = load_split(processed_dir, 'val')
+        self.X_test, self.y_test, self.y_reg_test = load_split(processed_dir, 'test')
         
         print(f"Loaded processed data:")
         print(f"Train set: {self.X_train.shape}, Validation set: {self.X_val.shape}, Test set: {self.X_test.shape}")
@@ -54,33 +64,24 @@ class OTDRFaultDetectionModel:
             model_type = self.config['model']['model_type']
         
         num_classes = len(np.unique(self.y_train))
-        input_dim = self.X_train.shape[1]
+        input_dim = len(FEATURE_COLUMNS)
+        
+        # Position, reflectance and loss heads on the layers shared with the classifier
+        self.regression_heads = self.config['model'].get('regression_heads', False) and self.y_reg_train is not None
         
         if model_type == 'lstm':
-            # Reshape data for LSTM
-            # Extract only the OTDR trace points (P1-P30)
-            trace_columns = [col for col in self.X_train.columns if col.startswith('P') and len(col) <= 3]
-            
-            # Create sequence data for LSTM
-            X_train_seq = self.X_train[trace_columns].values.reshape(self.X_train.shape[0], len(trace_columns), 1)
-            X_val_seq = self.X_val[trace_columns].values.reshape(self.X_val.shape[0], len(trace_columns), 1)
-            X_test_seq = self.X_test[trace_columns].values.reshape(self.X_test.shape[0], len(trace_columns), 1)
-            
-            # Create additional features input
-            other_columns = [col for col in self.X_train.columns if col not in trace_columns]
-            X_train_other = self.X_train[other_columns].values
-            X_val_other = self.X_val[other_columns].values
-            X_test_other = self.X_test[other_columns].values
+            # OTDR trace points (P1-P30) are the sequence input of the LSTM
+            # and the remaining features the additional input
             
             # LSTM input
-            sequence_input = Input(shape=(len(trace_columns), 1), name='sequence_input')
+            sequence_input = Input(shape=(len(TRACE_COLUMNS), 1), name='sequence_input')
             lstm_layer = Bidirectional(LSTM(128, return_sequences=True))(sequence_input)
             lstm_layer = Dropout(0.3)(lstm_layer)
             lstm_layer = Bidirectional(LSTM(64))(lstm_layer)
             lstm_layer = Dropout(0.3)(lstm_layer)
             
             # Other features input
-            other_input = Input(shape=(len(other_columns),), name='other_input')
+            other_input = Input(shape=(len(OTHER_COLUMNS),), name='other_input')
             other_layer = Dense(64, activation='relu')(other_input)
             other_layer = Dropout(0.3)(other_layer)
             
@@ -90,40 +91,21 @@ class OTDRFaultDetectionModel:
             # Output layers
             dense_layer = Dense(64, activation='relu')(combined)
             dense_layer = Dropout(0.3)(dense_layer)
-            output_layer = Dense(num_classes, activation='softmax')(dense_layer)
             
             # Create model
-            model = Model(inputs=[sequence_input, other_input], outputs=output_layer)
+            model = Model(inputs=[sequence_input, other_input], outputs=self._output_layers(dense_layer, num_classes))
             
             # Compile model
-            model.compile(
-                loss='sparse_categorical_crossentropy',
-                optimizer=Adam(learning_rate=self.config['model']['learning_rate']),
-                metrics=['accuracy']
-            )
+            self._compile_model(model)
             
             self.model = model
-            self.X_train_prepared = [X_train_seq, X_train_other]
-            self.X_val_prepared = [X_val_seq, X_val_other]
-            self.X_test_prepared = [X_test_seq, X_test_other]
             
         elif model_type == 'cnn':
-            # Reshape data for CNN
-            trace_columns = [col for col in self.X_train.columns if col.startswith('P') and len(col) <= 3]
-            
-            # Create sequence data for CNN
-            X_train_seq = self.X_train[trace_columns].values.reshape(self.X_train.shape[0], len(trace_columns), 1)
-            X_val_seq = self.X_val[trace_columns].values.reshape(self.X_val.shape[0], len(trace_columns), 1)
-            X_test_seq = self.X_test[trace_columns].values.reshape(self.X_test.shape[0], len(trace_columns), 1)
-            
-            # Create additional features input
-            other_columns = [col for col in self.X_train.columns if col not in trace_columns]
-            X_train_other = self.X_train[other_columns].values
-            X_val_other = self.X_val[other_columns].values
-            X_test_other = self.X_test[other_columns].values
+            # OTDR trace points (P1-P30) are the sequence input of the CNN
+            # and the remaining features the additional input
             
             # CNN input
-            sequence_input = Input(shape=(len(trace_columns), 1), name='sequence_input')
+            sequence_input = Input(shape=(len(TRACE_COLUMNS), 1), name='sequence_input')
             conv_layer = Conv1D(filters=64, kernel_size=3, activation='relu')(sequence_input)
             conv_layer = MaxPooling1D(pool_size=2)(conv_layer)
             conv_layer = Conv1D(filters=128, kernel_size=3, activation='relu')(conv_layer)
@@ -132,7 +114,7 @@ class OTDRFaultDetectionModel:
             conv_layer = Dropout(0.3)(conv_layer)
             
             # Other features input
-            other_input = Input(shape=(len(other_columns),), name='other_input')
+            other_input = Input(shape=(len(OTHER_COLUMNS),), name='other_input')
             other_layer = Dense(64, activation='relu')(other_input)
             other_layer = Dropout(0.3)(other_layer)
             
@@ -142,47 +124,110 @@ class OTDRFaultDetectionModel:
             # Output layers
             dense_layer = Dense(64, activation='relu')(combined)
             dense_layer = Dropout(0.3)(dense_layer)
-            output_layer = Dense(num_classes, activation='softmax')(dense_layer)
             
             # Create model
-            model = Model(inputs=[sequence_input, other_input], outputs=output_layer)
+            model = Model(inputs=[sequence_input, other_input], outputs=self._output_layers(dense_layer, num_classes))
             
             # Compile model
-            model.compile(
-                loss='sparse_categorical_crossentropy',
-                optimizer=Adam(learning_rate=self.config['model']['learning_rate']),
-                metrics=['accuracy']
-            )
+            self._compile_model(model)
             
             self.model = model
-            self.X_train_prepared = [X_train_seq, X_train_other]
-            self.X_val_prepared = [X_val_seq, X_val_other]
-            self.X_test_prepared = [X_test_seq, X_test_other]
             
         else:  # Default to a simple dense neural network
-            model = Sequential()
-            model.add(Dense(128, input_dim=input_dim, activation='relu'))
-            model.add(Dropout(0.3))
-            model.add(Dense(64, activation='relu'))
-            model.add(Dropout(0.3))
-            model.add(Dense(num_classes, activation='softmax'))
+            dense_input = Input(shape=(input_dim,), name='dense_input')
+            dense_layer = Dense(128, activation='relu')(dense_input)
+            dense_layer = Dropout(0.3)(dense_layer)
+            dense_layer = Dense(64, activation='relu')(dense_layer)
+            dense_layer = Dropout(0.3)(dense_layer)
             
-            model.compile(
-                loss='sparse_categorical_crossentropy',
-                optimizer=Adam(learning_rate=self.config['model']['learning_rate']),
-                metrics=['accuracy']
-            )
+            model = Model(inputs=dense_input, outputs=self._output_layers(dense_layer, num_classes))
+            self._compile_model(model)
             
             self.model = model
-            self.X_train_prepared = self.X_train
-            self.X_val_prepared = self.X_val
-            self.X_test_prepared = self.X_test
+        
+        # Processed features in the input layout of the model. The tf.data pipeline
+        # streams the training and validation splits instead of copying them here
+        self.model_type = model_type
+        self.X_train_prepared = self.X_val_prepared = None
+        if self.config['model'].get('input_pipeline', 'tf.data') != 'tf.data':
+            self.X_train_prepared = prepare_model_input(feature_matrix(self.X_train), model_type)
+            self.X_val_prepared = prepare_model_input(feature_matrix(self.X_val), model_type)
+        self.X_test_prepared = prepare_model_input(feature_matrix(self.X_test), model_type)
         
         print(f"Built {model_type} model:")
         self.model.summary()
         
         return self.model
     
+    def _output_layers(self, features, num_classes):
+        """Class probabilities, followed by one linear head per fault property when regression heads are enabled"""
+        class_output = Dense(num_classes, activation='softmax', name='fault_type')(features)
+        if not self.regression_heads:
+            return class_output
+        return [class_output] + [Dense(1, name=name)(features) for name in REGRESSION_OUTPUTS]
+    
+    def _compile_model(self, model):
+        """Compile with cross-entropy on the classes and a down-weighted Huber loss on each fault property"""
+        if self.regression_heads:
+            regression_weight = self.config['model'].get('regression_loss_weight', 0.5)
+            loss = {'fault_type': 'sparse_categorical_crossentropy', **{name: 'huber' for name in REGRESSION_OUTPUTS}}
+            loss_weights = {'fault_type': 1.0, **{name: regression_weight for name in REGRESSION_OUTPUTS}}
+            metrics = {'fault_type': ['accuracy']}
+        else:
+            loss, loss_weights, metrics = 'sparse_categorical_crossentropy', None, ['accuracy']
+        
+        model.compile(
+            loss=loss,
+            loss_weights=loss_weights,
+            optimizer=Adam(learning_rate=self.config['model']['learning_rate']),
+            metrics=metrics
+        )
+    
+    def _output_targets(self, y, y_reg, scaled=True):
+        """
+        Targets and sample weights for every model output
+        
+        Fault properties only count on faulty traces (class 0 is Normal and has
+        none) and are standardized with the training statistics while training.
+        """
+        if scaled:
+            y_reg = (y_reg - self.target_mean) / self.target_std
+        faulty = (y != 0).astype(np.float32)
+        
+        targets = {'fault_type': y}
+        weights = {'fault_type': np.ones(len(y), dtype=np.float32)}
+        for i, name in enumerate(REGRESSION_OUTPUTS):
+            targets[name] = y_reg[:, i]
+            weights[name] = faulty
+        return targets, weights
+    
+    def _fold_target_scaling(self):
+        """Fold the target standardization into the regression heads, so they output dataset units"""
+        for i, name in enumerate(REGRESSION_OUTPUTS):
+            layer = self.model.get_layer(name)
+            kernel, bias = layer.get_weights()
+            layer.set_weights([kernel * self.target_std[i], bias * self.target_std[i] + self.target_mean[i]])
+    
+    def _input_dataset(self, split, X, y, y_reg, shuffle=False):
+        """tf.data pipeline of (inputs, targets, sample weights) batches streamed from a split"""
+        cache = self.config['model'].get('input_cache', '')
+        if cache and cache != 'memory':
+            os.makedirs(cache, exist_ok=True)
+            cache = os.path.join(cache, split)
+            remove_cache_files(cache)
+        
+        return make_dataset(
+            X, y, y_reg,
+            model_type=self.model_type,
+            batch_size=self.config['model']['batch_size'],
+            targets=self._output_targets if self.regression_heads else None,
+            shuffle=shuffle,
+            seed=self.config['data']['random_seed'],
+            shuffle_buffer=self.config['model'].get('input_shuffle_buffer', 10000),
+            block_rows=self.config['model'].get('input_block_rows', 4096),
+            cache=cache
+        )
+    
     def train_model(self):
         """Train the model with early stopping and model checkpointing"""
         # Define callbacks
@@ -198,17 +243,39 @@ class OTDRFaultDetectionModel:
             save_best_only=True
         )
         
+        if self.regression_heads:
+            # Standardize fault properties with their statistics on faulty training traces
+            faulty = self.y_reg_train[self.y_train != 0]
+            self.target_mean = faulty.mean(axis=0)
+            self.target_std = np.maximum(faulty.std(axis=0), 1e-6)
+        
+        if self.X_train_prepared is None:
+            # Stream shuffled batches from the processed splits
+            train_data = dict(x=self._input_dataset('train', self.X_train, self.y_train, self.y_reg_train, shuffle=True))
+            validation_data = self._input_dataset('val', self.X_val, self.y_val, self.y_reg_val)
+        elif self.regression_heads:
+            y_train, train_weights = self._output_targets(self.y_train, self.y_reg_train)
+            train_data = dict(x=self.X_train_prepared, y=y_train, sample_weight=train_weights,
+                              batch_size=self.config['model']['batch_size'])
+            validation_data = (self.X_val_prepared, *self._output_targets(self.y_val, self.y_reg_val))
+        else:
+            train_data = dict(x=self.X_train_prepared, y=self.y_train, batch_size=self.config['model']['batch_size'])
+            validation_data = (self.X_val_prepared, self.y_val)
+        
         # Train the model
         history = self.model.fit(
-            self.X_train_prepared,
-            self.y_train,
-            validation_data=(self.X_val_prepared, self.y_val),
+            **train_data,
+            validation_data=validation_data,
             epochs=self.config['model']['epochs'],
-            batch_size=self.config['model']['batch_size'],
-            callbacks=[early_stopping, model_checkpoint],
+            callbacks=[early_stopping, model_checkpoint, ThroughputLogger(len(self.y_train))],
             verbose=1
         )
         
+        # The checkpoint holds standardized heads; save_model() overwrites it
+        # with the folded weights
+        if self.regression_heads:
+            self._fold_target_scaling()
+        
         # Save training history
         with open(os.path.join(self.config['model']['model_save_path'], 'training_history.pkl'), 'wb') as f:
             pickle.dump(history.history, f)
@@ -218,12 +285,26 @@ class OTDRFaultDetectionModel:
     def evaluate_model(self):
         """Evaluate the model on test data and generate performance metrics"""
         # Evaluate on test data
-        test_loss, test_accuracy = self.model.evaluate(self.X_test_prepared, self.y_test, verbose=0)
+        if self.regression_heads:
+            y_test, test_weights = self._output_targets(self.y_test, self.y_reg_test, scaled=False)
+            scores = self.model.evaluate(self.X_test_prepared, y_test, sample_weight=test_weights, verbose=0, return_dict=True)
+            test_loss, test_accuracy = scores['loss'], scores['fault_type_accuracy']
+        else:
+            test_loss, test_accuracy = self.model.evaluate(self.X_test_prepared, self.y_test, verbose=0)
         print(f"Test Loss: {test_loss:.4f}")
         print(f"Test Accuracy: {test_accuracy:.4f}")
         
         # Generate predictions
         y_pred = self.model.predict(self.X_test_prepared)
+        regression_report = ""
+        if self.regression_heads:
+            # Mean absolute error of each fault property on the faulty test traces
+            y_pred, regression = y_pred[0], np.concatenate(y_pred[1:], axis=1)
+            faulty = self.y_test != 0
+            errors = np.abs(regression[faulty] - self.y_reg_test[faulty]).mean(axis=0)
+            regression_report = "".join(f"{col} MAE: {error:.4f}\n" for col, error in zip(REGRESSION_COLUMNS, errors))
+            print("Fault property errors on faulty traces:")
+            print(regression_report)
         y_pred_classes = np.argmax(y_pred, axis=1)
         
         # Classification report
@@ -236,6 +317,9 @@ class OTDRFaultDetectionModel:
         # Save classification report to file
         with open(os.path.join(self.config['model']['model_save_path'], 'classification_report.txt'), 'w') as f:
             f.write(report)
+            if regression_report:
+                f.write("\nFault property errors on faulty traces:\n")
+                f.write(regression_report)
         
         # Confusion matrix
         cm = confusion_matrix(self.y_test, y_pred_classes)
@@ -252,11 +336,12 @@ class OTDRFaultDetectionModel:
             with open(os.path.join(self.config['model']['model_save_path'], 'training_history.pkl'), 'rb') as f:
                 history = pickle.load(f)
             
-            # Plot accuracy
+            # Plot accuracy (named after the class output when the model has regression heads)
+            accuracy_key = 'accuracy' if 'accuracy' in history else 'fault_type_accuracy'
             plt.figure(figsize=(12, 5))
             plt.subplot(1, 2, 1)
-            plt.plot(history['accuracy'], label='Training Accuracy')
-            plt.plot(history['val_accuracy'], label='Validation Accuracy')
+            plt.plot(history[accuracy_key], label='Training Accuracy')
+            plt.plot(history[f'val_{accuracy_key}'], label='Validation Accuracy')
             plt.xlabel('Epoch')
             plt.ylabel('Accuracy')
             plt.title('Training and Validation Accuracy')
@@ -289,16 +374,29 @@ class OTDRFaultDetectionModel:
         with open(model_pkl_path, 'wb') as f:
             pickle.dump(self.model, f)
         
-        print(f"Model saved to {model_path} and {model_pkl_path}")
+        # Export weights for the TensorFlow-free NumPy inference engine
+        model_npz_path = os.path.join(self.config['model']['model_save_path'], 'best_model.npz')
+        export_numpy_model(self.model, model_npz_path)
+        
+        print(f"Model saved to {model_path}, {model_pkl_path} and {model_npz_path}")
         
         return model_path, model_pkl_path
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train and evaluate the OTDR fault detection model")
+    parser.add_argument('--cross-validate', action='store_true',
+                        help="Run k-fold cross-validation on the training split instead of the holdout training")
+    args = parser.parse_args()
+    
     # Process data if not already processed
-    if not os.path.exists(os.path.join('../../data/processed', 'X_train.csv')):
+    if not has_processed_data('../../data/processed'):
         processor = OTDRDataProcessor(config_path='../../config.yaml')
-        processor.load_data()
-        processor.preprocess_data()
+        processor.process()
+    
+    if args.cross_validate:
+        # Aggregate per-fold accuracy and F1 into cv_report.json (resumes finished folds)
+        OTDRCrossValidator(config_path='../../config.yaml').run()
+        sys.exit(0)
     
     # Initialize model
     model = OTDRFaultDetectionModel(config_path='../../config.yaml')
@@ -318,5 +416,11 @@ if __name__ == "__main__":
     # Save model
     model_path, model_pkl_path = model.save_model()
     
+    # Write the quantized TFLite variants and compare them with the Keras model
+    if model.config['model'].get('quantization_variants'):
+        quantizer = OTDRModelQuantizer(config_path='../../config.yaml')
+        quantizer.quantize(model_path)
+        quantizer.report()
+    
     print(f"Model training and evaluation completed successfully!")
     print(f"Final test accuracy: {accuracy:.4f}")
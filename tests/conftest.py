@@ -0,0 +1,74 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from model.predict import OTDRFaultDetector
+
+class FakeModel:
+    """Deterministic stand-in for a Keras model that records its calls"""
+    def __init__(self):
+        self.calls = []
+
+    def predict_on_batch(self, X):
+        X_seq, X_other = X
+        self.calls.append(X_seq.shape[0])
+        logits = np.stack([X_seq[:, i, 0] * (i + 1) + X_other[:, 0] * 0.01 for i in range(8)], axis=1)
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+class RegressionFakeModel(FakeModel):
+    """FakeModel with location, reflectance and loss heads, returned as a list of outputs like Keras"""
+    def predict_on_batch(self, X):
+        probs = super().predict_on_batch(X)
+        X_seq, X_other = X
+        return [probs, X_other[:, :1] * 100, -X_seq[:, 0], X_seq[:, 1] / 10]
+
+def make_traces(n, seed=0):
+    rng = np.random.default_rng(seed)
+    traces = []
+    for row in rng.uniform(0.05, 1.0, size=(n, 31)):
+        data = {'SNR': float(row[0] * 30)}
+        data.update({f'P{i}': float(row[i]) for i in range(1, 31)})
+        traces.append(data)
+    return traces
+
+def to_request(trace):
+    """/predict request body of a trace from make_traces"""
+    return {"snr": trace["SNR"], "trace_points": [trace[f"P{i}"] for i in range(1, 31)]}
+
+def serve_model(monkeypatch, model):
+    """Serve model as the only ("default") model of the API; returns its registry"""
+    import api.routing
+    from api.registry import ModelRegistry
+    from api.routing import ModelRouter
+
+    monkeypatch.setattr(OTDRFaultDetector, "load_model", lambda self, path: model)
+    registry = ModelRegistry(config_path="config.yaml", model_path="models/v1.h5")
+    monkeypatch.setattr(api.routing, "_router", ModelRouter({"default": registry}, {"default": 1}))
+    return registry
+
+@pytest.fixture
+def detector(monkeypatch):
+    monkeypatch.setattr(OTDRFaultDetector, "load_model", lambda self, path: FakeModel())
+    return OTDRFaultDetector(config_path="config.yaml", model_path="unused.h5")
+
+@pytest.fixture
+def model_class():
+    """Class of the model served by the model and client fixtures (override in a test module to change it)"""
+    return FakeModel
+
+@pytest.fixture
+def model(monkeypatch, model_class):
+    """The model served by the API, loaded on the first request"""
+    model = model_class()
+    serve_model(monkeypatch, model)
+    return model
+
+@pytest.fixture
+def client(model):
+    from fastapi.testclient import TestClient
+    from api import app
+    return TestClient(app)
@@ -27,6 +27,8 @@ def test_admin_endpoints():
     endpoints = [route.path for route in router.routes]
     assert "/admin/system-info" in endpoints
     assert "/admin/model-status" in endpoints
+    assert "/admin/batching-stats" in endpoints
+    assert "/admin/cache-stats" in endpoints
 
 if __name__ == "__main__":
     pytest.main(["-xvs", __file__])
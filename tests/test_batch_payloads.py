@@ -0,0 +1,110 @@
+import io
+import os
+import sys
+import numpy as np
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from api.payloads import PayloadError, decode_npy, decode_msgpack, validate_raw
+from model.features import RAW_COLUMNS
+from conftest import make_traces
+
+def make_raw(n, seed=0):
+    traces = make_traces(n, seed)
+    return np.array([[trace[col] for col in RAW_COLUMNS] for trace in traces], dtype=np.float32)
+
+def to_npy(array):
+    buffer = io.BytesIO()
+    np.save(buffer, array)
+    return buffer.getvalue()
+
+def json_batch(raw):
+    return {"traces": [{"snr": float(row[0]), "trace_points": row[1:].tolist()} for row in raw]}
+
+def test_decode_npy_is_a_view_of_the_body():
+    raw = make_raw(5)
+    body = to_npy(raw)
+    decoded = decode_npy(body)
+
+    np.testing.assert_array_equal(decoded, raw)
+    assert not decoded.flags.owndata
+
+def test_decode_npy_rejects_bad_shape_and_non_finite_values():
+    with pytest.raises(PayloadError):
+        decode_npy(to_npy(np.zeros((3, 30), dtype=np.float32)))
+
+    raw = make_raw(3)
+    raw[2, 4] = np.nan
+    with pytest.raises(PayloadError, match="row 2, column P4"):
+        decode_npy(to_npy(raw))
+
+    with pytest.raises(PayloadError):
+        decode_npy(b"not an npy file")
+
+def test_decode_msgpack_matrix_and_rows():
+    msgpack = pytest.importorskip("msgpack")
+    raw = make_raw(4)
+
+    matrix = msgpack.packb({"shape": list(raw.shape), "dtype": "<f4", "data": raw.tobytes()})
+    np.testing.assert_array_equal(decode_msgpack(matrix), raw)
+
+    rows = msgpack.packb(raw.tolist())
+    np.testing.assert_allclose(decode_msgpack(rows), raw)
+
+    with pytest.raises(PayloadError):
+        decode_msgpack(msgpack.packb({"shape": [4, 31], "dtype": "<f4", "data": raw.tobytes()[:-4]}))
+
+def test_validate_raw_accepts_empty_batch():
+    assert validate_raw(np.zeros((0, 31), dtype=np.float32)).shape == (0, 31)
+
+def test_npy_batch_matches_json_batch(client):
+    raw = make_raw(12)
+    json_predictions = client.post("/batch-predict", json=json_batch(raw)).json()["predictions"]
+
+    response = client.post("/batch-predict", content=to_npy(raw), headers={"Content-Type": "application/x-npy"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-npy"
+
+    probs = np.load(io.BytesIO(response.content))
+    assert probs.shape == (12, 8)
+    assert probs.argmax(axis=1).tolist() == [prediction["fault_type"] for prediction in json_predictions]
+
+def test_binary_request_can_ask_for_json_response(client):
+    raw = make_raw(3)
+    response = client.post(
+        "/batch-predict", content=to_npy(raw),
+        headers={"Content-Type": "application/x-npy", "Accept": "application/json"}
+    )
+    assert response.status_code == 200
+    assert len(response.json()["predictions"]) == 3
+
+def test_arrow_batch(client):
+    pa = pytest.importorskip("pyarrow")
+    raw = make_raw(6)
+    table = pa.table({col: raw[:, i] for i, col in enumerate(RAW_COLUMNS)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    response = client.post(
+        "/batch-predict", content=sink.getvalue().to_pybytes(),
+        headers={"Content-Type": "application/vnd.apache.arrow.stream"}
+    )
+    assert response.status_code == 200
+    result = pa.ipc.open_stream(response.content).read_all()
+    assert result.num_rows == 6
+    assert "fault_type" in result.column_names and "Normal" in result.column_names
+
+def test_invalid_payloads_are_rejected(client):
+    response = client.post("/batch-predict", content=b"abc", headers={"Content-Type": "text/csv"})
+    assert response.status_code == 415
+
+    response = client.post(
+        "/batch-predict", content=to_npy(np.zeros((2, 5), dtype=np.float32)),
+        headers={"Content-Type": "application/x-npy"}
+    )
+    assert response.status_code == 422
+
+    response = client.post("/batch-predict", json={"traces": [{"snr": 1.0, "trace_points": [0.1]}]})
+    assert response.status_code == 422
@@ -0,0 +1,81 @@
+import os
+import sys
+import asyncio
+import threading
+import httpx
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from api.batching import MicroBatcher
+from conftest import make_traces, to_request
+
+def test_concurrent_requests_are_batched():
+    """Concurrent callers share model calls and each receives its own result"""
+    batch_sizes = []
+    release = threading.Event()
+    
+    def predict_fn(items):
+        release.wait(timeout=5)
+        batch_sizes.append(len(items))
+        return [item * 10 for item in items]
+    
+    batcher = MicroBatcher(predict_fn, max_batch_size=8, max_wait_ms=50)
+    results = {}
+    
+    def call(i):
+        results[i] = batcher.submit(i, timeout=5)
+    
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+    batcher.close()
+    
+    assert results == {i: i * 10 for i in range(20)}
+    assert sum(batch_sizes) == 20
+    assert max(batch_sizes) <= 8
+    assert len(batch_sizes) < 20
+    
+    stats = batcher.stats()
+    assert stats["requests"] == 20
+    assert stats["batches"] == len(batch_sizes)
+    assert sum(stats["batch_size_histogram"].values()) == len(batch_sizes)
+    assert list(stats["batch_size_histogram"]) == ["1", "2", "4", "8"]
+    assert stats["queue_depth"] == 0
+
+def test_errors_are_propagated_to_callers():
+    def predict_fn(items):
+        raise RuntimeError("model failure")
+    
+    batcher = MicroBatcher(predict_fn, max_batch_size=4, max_wait_ms=1)
+    with pytest.raises(RuntimeError, match="model failure"):
+        batcher.submit(1, timeout=5)
+    batcher.close()
+    
+    assert batcher.stats()["errors"] == 1
+
+def test_predict_batches_more_requests_than_threadpool_workers(model, monkeypatch):
+    """/predict awaits the batcher, so a batch is not limited to the 40 threadpool workers"""
+    import api.main
+    from api import app
+
+    monkeypatch.setitem(api.main.config["api"], "micro_batching",
+                        {"enabled": True, "max_batch_size": 128, "max_wait_ms": 500.0})
+    monkeypatch.setattr(api.main, "batchers", {})
+
+    requests = [to_request(trace) for trace in make_traces(100)]
+
+    async def send_all():
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            return await asyncio.gather(*(client.post("/predict", json=request) for request in requests))
+
+    try:
+        responses = asyncio.run(send_all())
+    finally:
+        for batcher in api.main.batchers.values():
+            batcher.close()
+    assert all(response.status_code == 200 for response in responses)
+    assert max(model.calls) > 40
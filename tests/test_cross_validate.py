@@ -0,0 +1,98 @@
+import os
+import sys
+import json
+import yaml
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from data_processing.preprocess import OTDRDataProcessor
+from model.cross_validate import OTDRCrossValidator, CLASS_NAMES, RESULT_FILE, REPORT_FILE, fold_indices
+from test_preprocess import write_raw_data
+
+pytest.importorskip("tensorflow")
+
+@pytest.fixture
+def config_path(tmp_path):
+    write_raw_data(tmp_path / "OTDR_data.csv", 600)
+    config = {
+        'data': {
+            'raw_data_path': str(tmp_path / "OTDR_data.csv"),
+            'processed_data_path': str(tmp_path / "processed"),
+            'train_test_split': 0.2,
+            'validation_split': 0.1,
+            'random_seed': 42,
+            'cache_path': None,
+        },
+        'model': {
+            'model_type': 'dense',
+            'learning_rate': 0.001,
+            'batch_size': 64,
+            'epochs': 1,
+            'early_stopping_patience': 1,
+            'regression_heads': True,
+            'model_save_path': str(tmp_path / "models"),
+        },
+        'cross_validation': {'folds': 3, 'parallel_folds': 2, 'output_path': str(tmp_path / "cv")},
+    }
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.safe_dump(config))
+    OTDRDataProcessor(config_path=str(path)).process()
+    return str(path)
+
+def test_folds_hold_out_every_row_once():
+    y = [label for label in range(4) for _ in range(30)]
+    held_out = sorted(row for _, rows in fold_indices(y, 3, seed=0) for row in rows)
+    assert held_out == list(range(len(y)))
+    assert fold_indices(y, 3, seed=0)[1][1].tolist() == fold_indices(y, 3, seed=0)[1][1].tolist()
+
+def test_report_aggregates_folds_and_resumes(config_path, tmp_path):
+    report = OTDRCrossValidator(config_path=config_path).run()
+    assert [result['fold'] for result in report['folds']] == [0, 1, 2]
+    assert 0.0 <= report['accuracy']['mean'] <= 1.0
+    assert report['accuracy']['var'] == pytest.approx(report['accuracy']['std'] ** 2)
+    assert set(report['f1']) == set(CLASS_NAMES)
+    with open(tmp_path / "cv" / REPORT_FILE) as f:
+        assert json.load(f)['plan']['folds'] == 3
+
+    # As if fold 1 had crashed: only that fold is trained again
+    os.remove(tmp_path / "cv" / "fold_1" / RESULT_FILE)
+    finished = os.stat(tmp_path / "cv" / "fold_0" / RESULT_FILE).st_mtime_ns
+    resumed = OTDRCrossValidator(config_path=config_path).run()
+    assert os.stat(tmp_path / "cv" / "fold_0" / RESULT_FILE).st_mtime_ns == finished
+    assert os.path.exists(tmp_path / "cv" / "fold_1" / RESULT_FILE)
+    assert resumed['folds'][0] == report['folds'][0]
+
+def test_plan_changes_with_the_data_and_the_model_config(config_path):
+    plan = OTDRCrossValidator(config_path=config_path).plan()
+
+    with open(config_path) as f:
+        config = yaml.safe_load(f)
+    config['model']['learning_rate'] = 0.01
+    with open(config_path, 'w') as f:
+        yaml.safe_dump(config, f)
+    tuned = OTDRCrossValidator(config_path=config_path).plan()
+    assert tuned['model']['learning_rate'] == 0.01 and tuned != plan
+
+    # Preprocessed again into other rows, but with as many of them
+    config['data']['random_seed'] = 7
+    with open(config_path, 'w') as f:
+        yaml.safe_dump(config, f)
+    OTDRDataProcessor(config_path=config_path).process()
+    reprocessed = OTDRCrossValidator(config_path=config_path).plan()
+    assert reprocessed['train_rows'] == tuned['train_rows']
+    assert reprocessed['processed_data'] != tuned['processed_data']
+
+def test_concurrent_folds_keep_separate_input_caches(config_path, tmp_path):
+    with open(config_path) as f:
+        config = yaml.safe_load(f)
+    config['model'].update(input_pipeline='tf.data', input_cache=str(tmp_path / "input_cache"), epochs=2)
+    config['cross_validation'].update(folds=2, parallel_folds=2)
+    with open(config_path, 'w') as f:
+        yaml.safe_dump(config, f)
+
+    report = OTDRCrossValidator(config_path=config_path).run()
+    assert [result['fold'] for result in report['folds']] == [0, 1]
+    for fold in range(2):
+        assert os.listdir(tmp_path / "cv" / f"fold_{fold}" / "input_cache")
+    assert not os.path.exists(tmp_path / "input_cache")
@@ -0,0 +1,63 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from model.features import (FEATURE_COLUMNS, FEATURE_VERSION, OTHER_COLUMNS, RAW_COLUMNS, TRACE_COLUMNS,
+                            compute_features, split_sequence_input, to_raw_array)
+
+def reference_features(df):
+    """Column-by-column pandas implementation the feature module replaces"""
+    df = df.copy()
+    df['trace_max'] = df[TRACE_COLUMNS].max(axis=1)
+    df['trace_min'] = df[TRACE_COLUMNS].min(axis=1)
+    df['trace_mean'] = df[TRACE_COLUMNS].mean(axis=1)
+    df['trace_std'] = df[TRACE_COLUMNS].std(axis=1)
+    df['trace_range'] = df['trace_max'] - df['trace_min']
+    for i in range(1, len(TRACE_COLUMNS)):
+        df[f'derivative_P{i}'] = df[TRACE_COLUMNS[i]] - df[TRACE_COLUMNS[i-1]]
+    for i in range(2, len(TRACE_COLUMNS)):
+        df[f'second_derivative_P{i}'] = df[f'derivative_P{i}'] - df[f'derivative_P{i-1}']
+    df['snr_to_mean_ratio'] = df['SNR'] / df['trace_mean']
+    return df
+
+def test_feature_columns_layout():
+    """The column order is fixed and versioned"""
+    assert FEATURE_VERSION == 1
+    assert len(FEATURE_COLUMNS) == 94
+    assert FEATURE_COLUMNS[:31] == RAW_COLUMNS
+    assert len(OTHER_COLUMNS) == 64
+
+def test_compute_features_matches_pandas_reference():
+    rng = np.random.default_rng(0)
+    raw = rng.uniform(0.0, 1.0, size=(200, 31))
+    expected = reference_features(pd.DataFrame(raw, columns=RAW_COLUMNS))
+    
+    features = compute_features(raw)
+    
+    assert features.dtype == np.float32
+    assert features.flags['C_CONTIGUOUS']
+    np.testing.assert_allclose(features, expected[FEATURE_COLUMNS].values, rtol=1e-4, atol=1e-5)
+
+def test_split_sequence_input():
+    raw = np.arange(2 * 31, dtype=np.float32).reshape(2, 31) + 1
+    X_seq, X_other = split_sequence_input(compute_features(raw))
+    
+    assert X_seq.shape == (2, 30, 1)
+    assert X_other.shape == (2, 64)
+    np.testing.assert_array_equal(X_seq[:, :, 0], raw[:, 1:])
+    np.testing.assert_array_equal(X_other[:, 0], raw[:, 0])
+
+def test_to_raw_array_inputs():
+    row = {col: float(i) for i, col in enumerate(RAW_COLUMNS)}
+    
+    assert to_raw_array(row).shape == (1, 31)
+    assert to_raw_array([row, row]).shape == (2, 31)
+    assert to_raw_array(pd.DataFrame([row])).shape == (1, 31)
+    
+    del row['SNR']
+    with pytest.raises(ValueError, match="SNR"):
+        to_raw_array(row)
@@ -0,0 +1,150 @@
+import os
+import sys
+import yaml
+import numpy as np
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from data_processing.preprocess import OTDRDataProcessor
+from data_processing.dataset import SPLITS, load_split, read_ingestion
+from test_preprocess import write_raw_data
+
+@pytest.fixture
+def make_processor(tmp_path):
+    write_raw_data(tmp_path / "OTDR_data.csv", 600)
+
+    def make(processed="processed", **settings):
+        data = {
+            'raw_data_path': str(tmp_path / "OTDR_data.csv"),
+            'processed_data_path': str(tmp_path / processed),
+            'train_test_split': 0.2,
+            'validation_split': 0.1,
+            'random_seed': 42,
+            'chunk_size': 100,
+            'processed_format': 'npy',
+            'split_method': 'hash',
+            'cache_path': None,
+        }
+        data.update(settings)
+        config_path = tmp_path / f"{processed}.yaml"
+        config_path.write_text(yaml.safe_dump({'data': data}))
+        return OTDRDataProcessor(config_path=str(config_path))
+    return make
+
+def split_arrays(processor):
+    processed_dir = processor.config['data']['processed_data_path']
+    return {split: [np.array(array) for array in load_split(processed_dir, split)] for split in SPLITS}
+
+def append_raw_rows(path, n_rows, seed):
+    """Append n_rows generated rows to an existing raw data CSV"""
+    new_path = f"{path}.new"
+    write_raw_data(new_path, n_rows, seed=seed)
+    with open(new_path, 'r') as new, open(path, 'a') as f:
+        f.writelines(new.readlines()[1:])
+
+def test_append_matches_full_rebuild(make_processor, tmp_path):
+    processor = make_processor()
+    processor.process()
+    before = split_arrays(processor)
+
+    append_raw_rows(tmp_path / "OTDR_data.csv", 250, seed=1)
+    appended = make_processor().append()
+    assert sum(appended.values()) == 250
+
+    after = split_arrays(processor)
+    for split in SPLITS:
+        # Existing rows stay where they were, new ones follow them
+        for old, new in zip(before[split], after[split]):
+            assert np.array_equal(new[:len(old)], old)
+
+    rebuilt = make_processor(processed="rebuilt")
+    rebuilt.process()
+    for split in SPLITS:
+        for appended_array, rebuilt_array in zip(after[split], split_arrays(rebuilt)[split]):
+            assert appended_array.tobytes() == rebuilt_array.tobytes()
+
+    assert read_ingestion(processor.config['data']['processed_data_path'])['rows'] == 850
+
+def test_incremental_process_appends(make_processor, tmp_path, capsys):
+    make_processor(incremental=True).process()
+    append_raw_rows(tmp_path / "OTDR_data.csv", 40, seed=2)
+    capsys.readouterr()
+
+    make_processor(incremental=True).process()
+    assert "Appended 40 rows" in capsys.readouterr().out
+    assert make_processor(incremental=True).process() == dict.fromkeys(SPLITS, 0)
+
+def test_changed_raw_prefix_is_rejected(make_processor, tmp_path):
+    make_processor().process()
+    raw_path = tmp_path / "OTDR_data.csv"
+    lines = raw_path.read_text().splitlines(keepends=True)
+    lines[1] = ('9' if lines[1][0] != '9' else '8') + lines[1][1:]
+    raw_path.write_text(''.join(lines))
+
+    with pytest.raises(ValueError, match="changed"):
+        make_processor().append()
+
+def test_append_from_separate_file(make_processor, tmp_path):
+    processor = make_processor()
+    rows = processor.process()
+
+    write_raw_data(tmp_path / "new_rows.csv", 120)
+    appended = make_processor().append(str(tmp_path / "new_rows.csv"))
+    assert sum(appended.values()) == 120
+    assert {split: len(arrays[0]) for split, arrays in split_arrays(processor).items()} == \
+        {split: rows[split] + appended[split] for split in SPLITS}
+
+def test_hash_splits_follow_configured_proportions(make_processor, tmp_path):
+    write_raw_data(tmp_path / "OTDR_data.csv", 20000)
+    rows = make_processor().process()
+    total = sum(rows.values())
+    assert rows['train'] / total == pytest.approx(0.7, abs=0.02)
+    assert rows['val'] / total == pytest.approx(0.1, abs=0.02)
+    assert rows['test'] / total == pytest.approx(0.2, abs=0.02)
+
+def test_stratified_splits_are_not_appended_to(make_processor, tmp_path):
+    with pytest.raises(ValueError, match="split_method: hash"):
+        make_processor(split_method='stratified', incremental=True).process()
+
+    make_processor(split_method='stratified').process()
+    append_raw_rows(tmp_path / "OTDR_data.csv", 40, seed=2)
+    with pytest.raises(ValueError, match="'stratified'"):
+        make_processor().append()
+
+    # Incremental processing rebuilds them with hash splits instead
+    rows = make_processor(incremental=True).process()
+    assert sum(rows.values()) == 640
+    assert read_ingestion(make_processor().config['data']['processed_data_path'])['split_method'] == 'hash'
+
+def test_append_reads_quoted_column_names(make_processor, tmp_path):
+    raw_path = tmp_path / "OTDR_data.csv"
+    lines = raw_path.read_text().splitlines(keepends=True)
+    lines[0] = ','.join(f'"{name}"' for name in lines[0].strip().split(',')) + '\n'
+    raw_path.write_text(''.join(lines))
+    make_processor().process()
+
+    append_raw_rows(raw_path, 30, seed=3)
+    assert sum(make_processor().append().values()) == 30
+
+@pytest.mark.parametrize("processed_format", ["npy", "csv"])
+def test_append_interrupted_before_its_record_is_not_repeated(make_processor, tmp_path, monkeypatch, processed_format):
+    import data_processing.preprocess
+    make_processor(processed_format=processed_format).process()
+    append_raw_rows(tmp_path / "OTDR_data.csv", 60, seed=4)
+
+    # The new rows are in the splits, but the record still says they are not
+    def crash(processed_dir, ingestion):
+        raise KeyboardInterrupt
+    with monkeypatch.context() as patch:
+        patch.setattr(data_processing.preprocess, "write_ingestion", crash)
+        with pytest.raises(KeyboardInterrupt):
+            make_processor(processed_format=processed_format).append()
+
+    processor = make_processor(processed_format=processed_format)
+    assert sum(processor.append().values()) == 60
+    rebuilt = make_processor(processed="rebuilt", processed_format=processed_format)
+    rebuilt.process()
+    for split in SPLITS:
+        for appended_array, rebuilt_array in zip(split_arrays(processor)[split], split_arrays(rebuilt)[split]):
+            np.testing.assert_array_equal(appended_array, rebuilt_array)
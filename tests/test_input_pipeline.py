@@ -0,0 +1,63 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from model.features import FEATURE_COLUMNS, compute_features, prepare_model_input
+
+tf = pytest.importorskip("tensorflow")
+from model.input_pipeline import make_dataset, ThroughputLogger
+
+def make_split(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    raw = rng.uniform(0.0, 1.0, size=(n_rows, 31))
+    X = compute_features(raw).astype(np.float32)
+    y = rng.integers(0, 8, size=n_rows).astype(np.int32)
+    y_reg = rng.uniform(0.0, 1.0, size=(n_rows, 3)).astype(np.float32)
+    return X, y, y_reg
+
+def collect(dataset):
+    """Concatenate the batches of a dataset back into whole arrays"""
+    batches = list(dataset.as_numpy_iterator())
+    return tf.nest.map_structure(lambda *arrays: np.concatenate(arrays), *batches)
+
+@pytest.mark.parametrize("model_type", ["lstm", "dense"])
+def test_unshuffled_stream_matches_prepared_arrays(model_type):
+    X, y, _ = make_split(1000)
+    dataset = make_dataset(X, y, model_type=model_type, batch_size=64, block_rows=300)
+    assert dataset.cardinality().numpy() == 16
+    # Blocks are rounded up to whole batches, so only the last batch is partial
+    assert [len(labels) for _, labels in dataset.as_numpy_iterator()] == [64] * 15 + [40]
+
+    inputs, labels = collect(dataset)
+    expected = prepare_model_input(X, model_type)
+    for actual, wanted in zip(tf.nest.flatten(inputs), tf.nest.flatten(expected)):
+        np.testing.assert_array_equal(actual, wanted)
+    np.testing.assert_array_equal(labels, y)
+
+def test_shuffled_stream_yields_every_row_once_with_its_targets():
+    X, y, y_reg = make_split(1000)
+    targets = lambda block_y, block_y_reg: ({'fault_type': block_y, 'location': block_y_reg[:, 0]},)
+    dataset = make_dataset(X, y, y_reg, model_type='dense', batch_size=64, targets=targets,
+                           shuffle=True, shuffle_buffer=200, block_rows=128)
+
+    inputs, outputs = collect(dataset)
+    assert not np.array_equal(inputs, X)
+    order = np.argsort(inputs[:, 0], kind='stable')
+    expected_order = np.argsort(X[:, 0], kind='stable')
+    np.testing.assert_array_equal(inputs[order], X[expected_order])
+    np.testing.assert_array_equal(outputs['fault_type'][order], y[expected_order])
+    np.testing.assert_array_equal(outputs['location'][order], y_reg[expected_order, 0])
+
+def test_throughput_is_recorded_in_history():
+    X, y, _ = make_split(256)
+    inputs = tf.keras.Input(shape=(len(FEATURE_COLUMNS),))
+    model = tf.keras.Model(inputs, tf.keras.layers.Dense(8, activation='softmax')(inputs))
+    model.compile(loss='sparse_categorical_crossentropy', optimizer='adam')
+
+    history = model.fit(make_dataset(X, y, batch_size=32, shuffle=True), epochs=2,
+                        callbacks=[ThroughputLogger(len(y))], verbose=0)
+    assert len(history.history['samples_per_second']) == 2
+    assert all(rate > 0 for rate in history.history['samples_per_second'])
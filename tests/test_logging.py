@@ -0,0 +1,60 @@
+import os
+import sys
+import json
+import queue
+import logging
+
+# Add parent directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from api.logs import JSONFormatter, SamplingFilter, NonBlockingQueueHandler, LOG_RECORDS_DROPPED
+
+def make_record(message, level=logging.INFO, **extra):
+    record = logging.LogRecord("ftth-api", level, __file__, 1, message, None, None)
+    record.__dict__.update(extra)
+    return record
+
+def test_json_formatter_writes_extra_fields():
+    record = make_record("Prediction made: Normal", event="prediction", fault_type=0, confidence=0.93)
+    entry = json.loads(JSONFormatter().format(record))
+    
+    assert entry["message"] == "Prediction made: Normal"
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "ftth-api"
+    assert entry["event"] == "prediction"
+    assert entry["fault_type"] == 0
+    assert entry["confidence"] == 0.93
+    assert "msg" not in entry and "args" not in entry
+
+def test_sampling_filter():
+    never = SamplingFilter({"prediction": 0.0})
+    dropped = LOG_RECORDS_DROPPED.value(reason="sampled")
+    
+    assert not never.filter(make_record("sampled out", event="prediction"))
+    assert LOG_RECORDS_DROPPED.value(reason="sampled") == dropped + 1
+    assert never.filter(make_record("other event", event="batch_prediction"))
+    assert never.filter(make_record("no event"))
+    assert never.filter(make_record("errors are kept", level=logging.ERROR, event="prediction"))
+    
+    half = SamplingFilter({"prediction": 0.5})
+    kept = [record for record in (make_record("x", event="prediction") for _ in range(2000)) if half.filter(record)]
+    assert 800 < len(kept) < 1200
+    assert all(record.sample_rate == 0.5 for record in kept)
+
+def test_queue_handler_drops_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(2))
+    dropped = LOG_RECORDS_DROPPED.value(reason="queue_full")
+    
+    for i in range(5):
+        handler.handle(make_record(f"record {i}"))
+    
+    assert handler.queue.qsize() == 2
+    assert LOG_RECORDS_DROPPED.value(reason="queue_full") == dropped + 3
+
+def test_queue_handler_freezes_arguments():
+    handler = NonBlockingQueueHandler(queue.Queue())
+    record = logging.LogRecord("ftth-api", logging.INFO, __file__, 1, "%d traces", (3,), None)
+    handler.handle(record)
+    
+    queued = handler.queue.get_nowait()
+    assert queued.getMessage() == "3 traces"
+    assert queued.args is None
@@ -0,0 +1,56 @@
+import os
+import sys
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from api.metrics import MetricsRegistry, STAGE_SECONDS, MODEL_LOADS
+from conftest import make_traces, to_request
+
+def test_histogram_and_counter_rendering():
+    registry = MetricsRegistry()
+    latency = registry.histogram("test_seconds", "Test latency", ("stage",), buckets=(0.01, 0.1))
+    requests = registry.counter("test_requests_total", "Test requests", ("status",))
+    
+    latency.observe(0.005, stage="model")
+    latency.observe(0.05, stage="model")
+    latency.observe(5.0, stage="model")
+    requests.inc(status="200")
+    requests.inc(2, status="200")
+    
+    lines = registry.render().splitlines()
+    assert '# TYPE test_seconds histogram' in lines
+    assert 'test_seconds_bucket{stage="model",le="0.01"} 1' in lines
+    assert 'test_seconds_bucket{stage="model",le="0.1"} 2' in lines
+    assert 'test_seconds_bucket{stage="model",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{stage="model"} 3' in lines
+    assert 'test_requests_total{status="200"} 3' in lines
+
+def test_prediction_stages_are_timed(client):
+    predictions_before = STAGE_SECONDS.count(endpoint="predict", stage="model")
+    loads_before = MODEL_LOADS.value(status="succeeded")
+    
+    for trace in make_traces(3):
+        assert client.post("/predict", json=to_request(trace)).status_code == 200
+    client.post("/batch-predict", json={"traces": [to_request(trace) for trace in make_traces(5)]})
+    
+    assert STAGE_SECONDS.count(endpoint="predict", stage="model") >= predictions_before + 1
+    for stage in ["parse", "features", "model", "format", "response"]:
+        assert STAGE_SECONDS.count(endpoint="batch_predict", stage=stage) >= 1
+    assert MODEL_LOADS.value(status="succeeded") == loads_before + 1
+    
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'ftth_http_requests_total{path="/predict",method="POST",status="200"}' in response.text
+    assert 'ftth_stage_duration_seconds_count{endpoint="batch_predict",stage="model"}' in response.text
+    assert "ftth_model_batch_size_bucket" in response.text
+    assert "ftth_model_load_seconds_count" in response.text
+
+def test_metrics_output_parses_as_prometheus_text(client):
+    parser = pytest.importorskip("prometheus_client.parser")
+    client.post("/predict", json=to_request(make_traces(1)[0]))
+    
+    families = {family.name: family for family in parser.text_string_to_metric_families(client.get("/metrics").text)}
+    assert families["ftth_stage_duration_seconds"].type == "histogram"
+    assert families["ftth_http_requests"].type == "counter"
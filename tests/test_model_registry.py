@@ -0,0 +1,60 @@
+import os
+import sys
+import pytest
+from fastapi.testclient import TestClient
+
+# Add parent directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+import api.routing
+from api import app
+from api.registry import ModelRegistry
+from api.routing import ModelRouter
+from model.predict import OTDRFaultDetector
+from conftest import FakeModel, make_traces
+
+@pytest.fixture
+def registry(monkeypatch):
+    def load_model(self, path):
+        if "broken" in path:
+            return None
+        return FakeModel()
+    
+    monkeypatch.setattr(OTDRFaultDetector, "load_model", load_model)
+    registry = ModelRegistry(config_path="config.yaml", model_path="models/v1.h5")
+    monkeypatch.setattr(api.routing, "_router", ModelRouter({"default": registry}, {"default": 1}))
+    return registry
+
+def test_model_is_loaded_once(registry):
+    assert registry.get_detector() is registry.get_detector()
+    assert registry.status()["loaded"]
+
+def test_reload_swaps_detector_and_keeps_old_one_usable(registry):
+    old = registry.get_detector()
+    assert registry.reload("models/v2.h5", wait=True)
+    new = registry.get_detector()
+    
+    assert new is not old
+    assert registry.status()["reload_status"] == "succeeded"
+    assert registry.status()["model_path"] == "models/v2.h5"
+    # A request that already holds the previous detector can still finish on it
+    assert old.predict(make_traces(1)[0])["fault_name"] in old.class_names
+
+def test_failed_reload_keeps_active_model(registry):
+    active = registry.get_detector()
+    registry.reload("models/broken.h5", wait=True)
+    
+    assert registry.get_detector() is active
+    assert registry.status()["reload_status"] == "failed"
+    assert registry.status()["model_path"] == "models/v1.h5"
+
+def test_admin_reload_and_model_status(registry):
+    client = TestClient(app)
+    
+    response = client.post("/admin/reload-model?wait=true", json={"model_path": "models/v3.h5"})
+    assert response.status_code == 202
+    
+    status = client.get("/admin/model-status").json()
+    assert status["status"] == "active"
+    assert status["model_path"] == "models/v3.h5"
+    assert status["reload_status"] == "succeeded"
+    assert "model_version" in status
@@ -0,0 +1,83 @@
+import os
+import sys
+import time
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+# Add parent directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+import api.routing
+from api import app
+from api.routing import build_router
+from model.predict import OTDRFaultDetector
+
+TRACE = {
+    "snr": 15.0,
+    "trace_points": [0.8, 0.7, 0.6, 0.5, 0.4, 0.3, 0.2, 0.1, 0.0, 0.1,
+                     0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0, 0.9,
+                     0.8, 0.7, 0.6, 0.5, 0.4, 0.3, 0.2, 0.1, 0.0, 0.1]
+}
+
+class ConstantModel:
+    """Model that always predicts the same class"""
+    def __init__(self, fault_type):
+        self.fault_type = fault_type
+    
+    def predict_on_batch(self, X):
+        probs = np.full((X[0].shape[0], 8), 0.01)
+        probs[:, self.fault_type] = 0.93
+        return probs
+
+@pytest.fixture
+def model_router(monkeypatch):
+    monkeypatch.setattr(OTDRFaultDetector, "load_model",
+                        lambda self, path: ConstantModel(2 if "cnn" in path else 0))
+    config = {"api": {
+        "models": [
+            {"name": "lstm", "model_path": "models/lstm.h5", "model_type": "lstm", "weight": 1},
+            {"name": "cnn", "model_path": "models/cnn.h5", "model_type": "cnn", "weight": 0},
+        ],
+        "shadow_model": "cnn",
+    }}
+    model_router = build_router(config)
+    monkeypatch.setattr(api.routing, "_router", model_router)
+    return model_router
+
+def wait_for_shadow(model_router, expected):
+    for _ in range(100):
+        if model_router.stats["cnn"].snapshot()["shadow_compared"] >= expected:
+            return
+        time.sleep(0.01)
+
+def test_weighted_and_header_routing(model_router):
+    assert {model_router.choose() for _ in range(20)} == {"lstm"}
+    assert model_router.choose("cnn") == "cnn"
+    with pytest.raises(KeyError):
+        model_router.choose("transformer")
+
+def test_shadow_scoring_and_admin_counters(model_router, monkeypatch):
+    monkeypatch.setitem(api.main.config["api"], "micro_batching", {"enabled": False})
+    client = TestClient(app)
+    
+    response = client.post("/predict", json=TRACE)
+    assert response.status_code == 200
+    assert response.json()["fault_type"] == 0
+    
+    response = client.post("/batch-predict", json={"traces": [TRACE, TRACE]})
+    assert response.status_code == 200
+    
+    # Requests routed explicitly to the shadow model are not shadowed again
+    response = client.post("/predict", json=TRACE, headers={"X-Model-Name": "cnn"})
+    assert response.json()["fault_type"] == 2
+    
+    assert client.post("/predict", json=TRACE, headers={"X-Model-Name": "unknown"}).status_code == 400
+    
+    wait_for_shadow(model_router, 3)
+    models = client.get("/admin/models").json()["models"]
+    
+    assert models["lstm"]["stats"]["requests"] == 2
+    assert models["lstm"]["stats"]["traces"] == 3
+    assert models["cnn"]["stats"]["shadow_compared"] == 3
+    assert models["cnn"]["stats"]["shadow_disagreements"] == 3
+    assert models["cnn"]["stats"]["shadow_disagreement_rate"] == 1.0
@@ -0,0 +1,92 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from model.features import FEATURE_COLUMNS, OTHER_COLUMNS, TRACE_COLUMNS, compute_features, prepare_model_input
+from model.numpy_engine import NumpyModel, export_numpy_model
+
+tf = pytest.importorskip("tensorflow")
+from tensorflow.keras.layers import (Dense, Dropout, LSTM, Input, Bidirectional, Conv1D, MaxPooling1D,
+                                     Flatten, concatenate)
+from tensorflow.keras.models import Model, Sequential
+
+# Maximum absolute difference allowed between Keras and NumPy class probabilities
+TOLERANCE = 1e-5
+
+def build_keras_model(model_type):
+    """Same layer stacks as OTDRFaultDetectionModel.build_model"""
+    if model_type == 'dense':
+        model = Sequential()
+        model.add(Dense(128, input_dim=len(FEATURE_COLUMNS), activation='relu'))
+        model.add(Dropout(0.3))
+        model.add(Dense(64, activation='relu'))
+        model.add(Dropout(0.3))
+        model.add(Dense(8, activation='softmax'))
+        return model
+    
+    sequence_input = Input(shape=(len(TRACE_COLUMNS), 1), name='sequence_input')
+    if model_type == 'lstm':
+        sequence_layer = Bidirectional(LSTM(128, return_sequences=True))(sequence_input)
+        sequence_layer = Dropout(0.3)(sequence_layer)
+        sequence_layer = Bidirectional(LSTM(64))(sequence_layer)
+    else:
+        sequence_layer = Conv1D(filters=64, kernel_size=3, activation='relu')(sequence_input)
+        sequence_layer = MaxPooling1D(pool_size=2)(sequence_layer)
+        sequence_layer = Conv1D(filters=128, kernel_size=3, activation='relu')(sequence_layer)
+        sequence_layer = MaxPooling1D(pool_size=2)(sequence_layer)
+        sequence_layer = Flatten()(sequence_layer)
+    sequence_layer = Dropout(0.3)(sequence_layer)
+    
+    other_input = Input(shape=(len(OTHER_COLUMNS),), name='other_input')
+    other_layer = Dropout(0.3)(Dense(64, activation='relu')(other_input))
+    
+    dense_layer = Dense(64, activation='relu')(concatenate([sequence_layer, other_layer]))
+    output_layer = Dense(8, activation='softmax')(Dropout(0.3)(dense_layer))
+    return Model(inputs=[sequence_input, other_input], outputs=output_layer)
+
+@pytest.mark.parametrize("model_type", ["lstm", "cnn", "dense"])
+def test_numpy_engine_matches_keras(model_type, tmp_path):
+    tf.random.set_seed(0)
+    model = build_keras_model(model_type)
+    
+    rng = np.random.default_rng(0)
+    raw = rng.uniform(0.0, 1.0, size=(32, 31))
+    raw[:, 0] *= 30
+    X = prepare_model_input(compute_features(raw), model_type)
+    
+    path = export_numpy_model(model, str(tmp_path / "model.npz"))
+    numpy_model = NumpyModel(path)
+    
+    expected = model.predict_on_batch(X)
+    actual = numpy_model.predict_on_batch(X)
+    
+    assert actual.shape == expected.shape
+    np.testing.assert_allclose(actual, expected, atol=TOLERANCE, rtol=0)
+
+def test_numpy_engine_matches_keras_with_regression_heads(tmp_path):
+    """Models with location, reflectance and loss heads return every output, class probabilities first"""
+    tf.random.set_seed(0)
+    features_input = Input(shape=(len(FEATURE_COLUMNS),), name='dense_input')
+    shared = Dropout(0.3)(Dense(64, activation='relu')(features_input))
+    outputs = [Dense(8, activation='softmax', name='fault_type')(shared)]
+    outputs += [Dense(1, name=name)(shared) for name in ['location', 'reflectance', 'loss']]
+    model = Model(inputs=features_input, outputs=outputs)
+    
+    rng = np.random.default_rng(0)
+    X = compute_features(rng.uniform(0.0, 1.0, size=(16, 31)))
+    
+    numpy_model = NumpyModel(export_numpy_model(model, str(tmp_path / "model.npz")))
+    expected = model.predict_on_batch(X)
+    actual = numpy_model.predict_on_batch(X)
+    
+    assert len(actual) == 4
+    for actual_output, expected_output in zip(actual, expected):
+        np.testing.assert_allclose(actual_output, expected_output, atol=TOLERANCE, rtol=0)
+
+def test_unsupported_layer_is_rejected(tmp_path):
+    model = Sequential([tf.keras.layers.BatchNormalization(input_shape=(4,)), Dense(2)])
+    with pytest.raises(ValueError, match="BatchNormalization"):
+        export_numpy_model(model, str(tmp_path / "model.npz"))
@@ -0,0 +1,69 @@
+import os
+import sys
+import shutil
+import subprocess
+import numpy as np
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from model.predict import OTDRFaultDetector
+from conftest import RegressionFakeModel, make_traces
+
+def test_batch_predict_matches_single_predictions(detector):
+    """Batched results must match per-trace predictions, in input order"""
+    traces = make_traces(25)
+    batch_results = detector.batch_predict(traces, chunk_size=10)
+    single_results = [detector.predict(trace) for trace in traces]
+    
+    assert len(batch_results) == len(traces)
+    for batch_result, single_result in zip(batch_results, single_results):
+        assert batch_result['fault_type'] == single_result['fault_type']
+        assert batch_result['fault_name'] == single_result['fault_name']
+        assert batch_result['confidence'] == pytest.approx(single_result['confidence'])
+
+def test_batch_predict_calls_model_once_per_chunk(detector):
+    """The model is called once per chunk rather than once per trace"""
+    detector.batch_predict(make_traces(25), chunk_size=10)
+    assert detector.model.calls == [10, 10, 5]
+
+def test_batch_predict_empty_and_missing_columns(detector):
+    assert detector.batch_predict([]) == []
+    
+    trace = make_traces(1)[0]
+    del trace['P7']
+    with pytest.raises(ValueError, match="P7"):
+        detector.batch_predict([trace])
+
+def test_regression_heads_fill_fault_properties(monkeypatch):
+    monkeypatch.setattr(OTDRFaultDetector, "load_model", lambda self, path: RegressionFakeModel())
+    detector = OTDRFaultDetector(config_path="config.yaml", model_path="unused.h5")
+    traces = make_traces(10)
+    
+    results = detector.batch_predict(traces, chunk_size=4)
+    
+    # One model call per chunk returns the class and the fault properties together
+    assert detector.model.calls == [4, 4, 2]
+    for trace, result in zip(traces, results):
+        assert result['fault_type'] != 0
+        assert result['location'] == pytest.approx(trace['SNR'] * 100, rel=1e-5)
+        assert result['reflectance'] == pytest.approx(-trace['P1'], rel=1e-5)
+        assert result['loss'] == pytest.approx(trace['P2'] / 10, rel=1e-5)
+
+def test_normal_predictions_have_no_fault_properties(detector):
+    probs = np.array([[0.9, 0.1], [0.2, 0.8]], dtype=np.float32)
+    detector.class_names = ['Normal', 'Fiber Tapping']
+    
+    normal, fault = detector._format_predictions([probs, np.array([[5.0], [7.0]]), np.zeros((2, 1)), np.ones((2, 1))])
+    assert normal['location'] is None and normal['reflectance'] is None and normal['loss'] is None
+    assert fault['location'] == 7.0 and fault['loss'] == 1.0
+    
+    assert 'location' not in detector._format_predictions(probs)[0]
+
+def test_model_package_imports_without_data_processing(tmp_path):
+    """The API image ships src/api and src/model only"""
+    src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+    shutil.copytree(os.path.join(src, 'model'), tmp_path / 'model', ignore=shutil.ignore_patterns('__pycache__'))
+    result = subprocess.run([sys.executable, '-c', 'import model.predict'], cwd=tmp_path,
+                            env=dict(os.environ, PYTHONPATH=str(tmp_path)), capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
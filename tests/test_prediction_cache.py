@@ -0,0 +1,63 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from model.prediction_cache import PredictionCache
+from model.predict import OTDRFaultDetector
+from conftest import FakeModel, make_traces
+
+def test_quantized_keys_share_entries():
+    cache = PredictionCache(max_size=10, decimals=3)
+    raw = np.full((2, 31), 0.5)
+    raw[1] += 0.0001
+    
+    keys = cache.make_keys(raw, "v1")
+    assert keys[0] == keys[1]
+    assert cache.make_keys(raw, "v2")[0] != keys[0]
+
+def test_lru_eviction_and_ttl():
+    cache = PredictionCache(max_size=2, ttl_seconds=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    
+    # "b" was least recently used
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+    
+    cache.ttl_seconds = -1
+    cache.put("d", 4)
+    assert cache.get("d") is None
+    assert cache.stats()["expirations"] == 1
+
+@pytest.fixture
+def cached_detector(monkeypatch):
+    monkeypatch.setattr(OTDRFaultDetector, "load_model", lambda self, path: FakeModel())
+    detector = OTDRFaultDetector(config_path="config.yaml", model_path="unused.h5")
+    detector.cache = PredictionCache(max_size=100)
+    return detector
+
+def test_detector_serves_repeated_traces_from_cache(cached_detector):
+    traces = make_traces(5)
+    first = cached_detector.batch_predict(traces)
+    calls = list(cached_detector.model.calls)
+    
+    second = cached_detector.batch_predict(traces + make_traces(1, seed=1))
+    
+    assert second[:5] == first
+    # Only the new trace reached the model
+    assert cached_detector.model.calls == calls + [1]
+    assert cached_detector.predict(traces[0]) == first[0]
+    assert cached_detector.cache.stats()["hits"] == 6
+
+def test_reload_clears_cache(cached_detector):
+    cached_detector.predict(make_traces(1)[0])
+    assert cached_detector.cache.stats()["size"] == 1
+    
+    cached_detector.reload_model()
+    assert cached_detector.cache.stats()["size"] == 0
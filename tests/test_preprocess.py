@@ -0,0 +1,182 @@
+import os
+import sys
+import json
+import yaml
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from data_processing.preprocess import OTDRDataProcessor
+from data_processing.dataset import SPLITS, NpyAppender, load_split, read_manifest
+from model.features import FEATURE_COLUMNS, RAW_COLUMNS, REGRESSION_COLUMNS, compute_features
+
+def write_raw_data(path, n_rows, seed=0):
+    """Synthetic OTDR_data.csv with unbalanced classes; Position is derived from SNR so rows can be matched up"""
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame(rng.uniform(0.0, 1.0, size=(n_rows, len(RAW_COLUMNS))).round(4), columns=RAW_COLUMNS)
+    data['SNR'] = (data['SNR'] * 30).round(4)
+    data['Class'] = rng.choice(8, size=n_rows, p=[0.4, 0.2, 0.1, 0.1, 0.05, 0.05, 0.05, 0.05])
+    data['Position'] = data['SNR'] * 10
+    data['Reflectance'] = -rng.uniform(20, 60, size=n_rows)
+    data['loss'] = rng.uniform(0, 3, size=n_rows)
+    data.to_csv(path, index=False)
+    return data
+
+@pytest.fixture
+def make_processor(tmp_path):
+    def make(processed_dir, chunk_size=0, processed_format='npy'):
+        config = {
+            'data': {
+                'raw_data_path': str(tmp_path / "OTDR_data.csv"),
+                'processed_data_path': str(tmp_path / processed_dir),
+                'train_test_split': 0.2,
+                'validation_split': 0.1,
+                'random_seed': 42,
+                'chunk_size': chunk_size,
+                'processed_format': processed_format,
+            }
+        }
+        config_path = tmp_path / f"{processed_dir}.yaml"
+        config_path.write_text(yaml.safe_dump(config))
+        return OTDRDataProcessor(config_path=str(config_path))
+    return make
+
+def read_split(processed_dir, split):
+    X, y, y_reg = load_split(processed_dir, split)
+    X = X if isinstance(X, pd.DataFrame) else pd.DataFrame(X, columns=FEATURE_COLUMNS)
+    return X, np.asarray(y), pd.DataFrame(y_reg, columns=REGRESSION_COLUMNS)
+
+def test_chunked_splits_are_stratified(tmp_path, make_processor):
+    data = write_raw_data(tmp_path / "OTDR_data.csv", 5000)
+    processor = make_processor("processed", chunk_size=700)
+    rows_written = processor.process()
+
+    assert sum(rows_written.values()) == len(data)
+    fractions = {'train': 0.7, 'val': 0.1, 'test': 0.2}
+    class_counts = data['Class'].value_counts()
+    for split in SPLITS:
+        X, y, y_reg = read_split(processor.config['data']['processed_data_path'], split)
+        assert list(X.columns) == FEATURE_COLUMNS
+        assert len(X) == len(y) == len(y_reg) == rows_written[split]
+
+        # Every class is split in the configured proportions
+        split_counts = pd.Series(y).value_counts()
+        for label, total in class_counts.items():
+            assert abs(split_counts.get(label, 0) - total * fractions[split]) <= 3
+
+        # Targets stay aligned with their feature rows
+        np.testing.assert_allclose(y_reg['Position'], X['SNR'] * 10, rtol=1e-6)
+
+def test_chunked_features_match_in_memory_features(tmp_path, make_processor):
+    write_raw_data(tmp_path / "OTDR_data.csv", 1000)
+    processor = make_processor("processed", chunk_size=128)
+    processor.process()
+
+    X = pd.concat([read_split(processor.config['data']['processed_data_path'], split)[0] for split in SPLITS])
+    expected = compute_features(X[RAW_COLUMNS].to_numpy(dtype=np.float32))
+    np.testing.assert_allclose(X[FEATURE_COLUMNS].to_numpy(), expected, rtol=1e-5, atol=1e-5)
+
+def test_split_assignment_does_not_depend_on_chunk_size(tmp_path, make_processor):
+    write_raw_data(tmp_path / "OTDR_data.csv", 3000)
+    small = make_processor("small_chunks", chunk_size=101)
+    large = make_processor("large_chunks", chunk_size=2000)
+    small.process()
+    large.process()
+
+    for split in SPLITS:
+        for prefix in ['X', 'y', 'y_reg']:
+            small_file = f"{small.config['data']['processed_data_path']}/{prefix}_{split}.npy"
+            large_file = f"{large.config['data']['processed_data_path']}/{prefix}_{split}.npy"
+            with open(small_file, 'rb') as a, open(large_file, 'rb') as b:
+                assert a.read() == b.read()
+
+@pytest.mark.parametrize("chunk_size", [0, 300])
+def test_npy_and_csv_formats_hold_the_same_data(tmp_path, make_processor, chunk_size):
+    write_raw_data(tmp_path / "OTDR_data.csv", 1000)
+    npy = make_processor("npy", chunk_size=chunk_size, processed_format='npy')
+    csv = make_processor("csv", chunk_size=chunk_size, processed_format='csv')
+    npy.process()
+    csv.process()
+
+    manifest = read_manifest(npy.config['data']['processed_data_path'])
+    assert manifest['columns']['X'] == FEATURE_COLUMNS
+    assert read_manifest(csv.config['data']['processed_data_path']) is None
+
+    for split in SPLITS:
+        X_npy, y_npy, y_reg_npy = load_split(npy.config['data']['processed_data_path'], split)
+        X_csv, y_csv, y_reg_csv = load_split(csv.config['data']['processed_data_path'], split)
+
+        # .npy splits are read-only memory maps in FEATURE_COLUMNS order
+        assert isinstance(X_npy, np.memmap) and X_npy.dtype == np.float32
+        assert manifest['rows'][split] == len(X_npy) == len(X_csv)
+        np.testing.assert_allclose(X_npy, X_csv[FEATURE_COLUMNS].to_numpy(), rtol=1e-6, atol=1e-6)
+        np.testing.assert_array_equal(y_npy, y_csv)
+        np.testing.assert_allclose(y_reg_npy, y_reg_csv, rtol=1e-6)
+
+def test_npy_appender_writes_loadable_arrays(tmp_path):
+    rng = np.random.default_rng(0)
+    blocks = [rng.random((n, 5)).astype(np.float32) for n in (3, 0, 1000)]
+    appender = NpyAppender(str(tmp_path / "array.npy"), np.float32, 5)
+    for block in blocks:
+        appender.append(block)
+    appender.close()
+
+    np.testing.assert_array_equal(np.load(tmp_path / "array.npy"), np.concatenate(blocks))
+
+def test_npy_appender_overwrites_rows_of_an_unfinished_append(tmp_path):
+    path = str(tmp_path / "array.npy")
+    first, lost, second = (np.full((n, 5), value, dtype=np.float32) for n, value in ((4, 1), (3, 2), (2, 3)))
+    appender = NpyAppender(path, np.float32, 5)
+    appender.append(first)
+    appender.close()
+
+    # Crashed before close() counted these rows in the header
+    crashed = NpyAppender(path, np.float32, 5, append=True)
+    crashed.append(lost)
+    crashed._file.close()
+
+    appender = NpyAppender(path, np.float32, 5, append=True)
+    appender.append(second)
+    appender.close()
+    np.testing.assert_array_equal(np.load(path), np.concatenate([first, second]))
+
+def test_stale_feature_version_is_rejected(tmp_path, make_processor):
+    write_raw_data(tmp_path / "OTDR_data.csv", 200)
+    processor = make_processor("processed")
+    processor.process()
+
+    processed_dir = processor.config['data']['processed_data_path']
+    manifest = read_manifest(processed_dir)
+    manifest['feature_version'] -= 1
+    with open(f"{processed_dir}/manifest.json", 'w') as f:
+        json.dump(manifest, f)
+
+    with pytest.raises(ValueError, match="feature version"):
+        load_split(processed_dir, 'train')
+
+def test_parallel_features_are_byte_identical_to_serial():
+    from data_processing.parallel import ParallelFeatures
+
+    rng = np.random.default_rng(0)
+    raw = rng.uniform(0.0, 1.0, size=(20000, len(RAW_COLUMNS))).astype(np.float32)
+    raw[:, 0] *= 30
+    with ParallelFeatures(workers=3) as features:
+        parallel = features.compute(raw)
+
+    assert parallel.tobytes() == compute_features(raw).tobytes()
+
+def test_parallel_preprocessing_writes_the_same_splits(tmp_path, make_processor):
+    write_raw_data(tmp_path / "OTDR_data.csv", 10000)
+    serial = make_processor("serial", chunk_size=6000)
+    parallel = make_processor("parallel", chunk_size=6000)
+    parallel.config['data']['feature_workers'] = 2
+    serial.process()
+    parallel.process()
+
+    for split in SPLITS:
+        for prefix in ['X', 'y', 'y_reg']:
+            with open(f"{serial.config['data']['processed_data_path']}/{prefix}_{split}.npy", 'rb') as a, \
+                 open(f"{parallel.config['data']['processed_data_path']}/{prefix}_{split}.npy", 'rb') as b:
+                assert a.read() == b.read()
@@ -0,0 +1,103 @@
+import os
+import sys
+import yaml
+import numpy as np
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from data_processing.preprocess import OTDRDataProcessor
+from data_processing.dataset import dataset_files, load_split, read_manifest
+from test_preprocess import write_raw_data
+
+@pytest.fixture
+def make_processor(tmp_path):
+    write_raw_data(tmp_path / "OTDR_data.csv", 500)
+
+    def make(**settings):
+        data = {
+            'raw_data_path': str(tmp_path / "OTDR_data.csv"),
+            'processed_data_path': str(tmp_path / "processed"),
+            'train_test_split': 0.2,
+            'validation_split': 0.1,
+            'random_seed': 42,
+            'chunk_size': 100,
+            'processed_format': 'npy',
+            'cache_path': str(tmp_path / "cache"),
+            'cache_max_entries': 3,
+        }
+        data.update(settings)
+        config_path = tmp_path / "config.yaml"
+        config_path.write_text(yaml.safe_dump({'data': data}))
+        return OTDRDataProcessor(config_path=str(config_path))
+    return make
+
+def processed_mtimes(processor):
+    processed_dir = processor.config['data']['processed_data_path']
+    return {name: os.stat(os.path.join(processed_dir, name)).st_mtime_ns for name in dataset_files(processed_dir)}
+
+def test_unchanged_inputs_reuse_processed_outputs(make_processor, capsys):
+    first = make_processor()
+    rows = first.process()
+    assert "cache miss" in capsys.readouterr().out
+    mtimes = processed_mtimes(first)
+
+    second = make_processor()
+    assert second.process() == rows
+    assert "cache hit" in capsys.readouterr().out
+
+    # Nothing downstream of the processed directory sees rewritten files
+    assert processed_mtimes(second) == mtimes
+
+def test_fingerprint_follows_inputs_that_change_the_output(make_processor, tmp_path):
+    fingerprint = make_processor().fingerprint()
+
+    # The chunk size does not change the output, only whether chunking is used
+    assert make_processor(chunk_size=250).fingerprint() == fingerprint
+    assert make_processor(chunk_size=0).fingerprint() != fingerprint
+    assert make_processor(random_seed=7).fingerprint() != fingerprint
+    assert make_processor(processed_format='csv').fingerprint() != fingerprint
+
+    with open(tmp_path / "OTDR_data.csv", 'a') as f:
+        f.write(f"10.0,{','.join(['0.5'] * 30)},1,5.0,-40.0,0.5\n")
+    assert make_processor().fingerprint() != fingerprint
+
+def test_fingerprint_covers_the_preprocessing_code(make_processor, monkeypatch):
+    processor = make_processor()
+    processor.raw_digest()
+    read = []
+    real_open = open
+    def recording_open(path, *args, **kwargs):
+        read.append(os.path.basename(path))
+        return real_open(path, *args, **kwargs)
+    monkeypatch.setattr("builtins.open", recording_open)
+
+    processor.fingerprint()
+    assert {'features.py', 'parallel.py', 'dataset.py', 'cache.py', 'preprocess.py'} <= set(read)
+
+def test_force_recomputes(make_processor, capsys):
+    make_processor().process()
+    capsys.readouterr()
+
+    make_processor().process(force=True)
+    assert "cache bypassed" in capsys.readouterr().out
+
+def test_cached_entry_replaces_other_processed_outputs(make_processor):
+    npy_rows = make_processor().process()
+    make_processor(processed_format='csv').process()
+    processed_dir = make_processor().config['data']['processed_data_path']
+    assert read_manifest(processed_dir) is None
+
+    # Switching back copies the cached .npy dataset over the CSV one
+    assert make_processor().process() == npy_rows
+    X, y, _ = load_split(processed_dir, 'train')
+    assert isinstance(X, np.memmap) and len(X) == npy_rows['train']
+    assert not any(name.endswith('.csv') for name in dataset_files(processed_dir))
+
+def test_least_recently_used_entries_are_removed(make_processor, tmp_path):
+    for seed in range(3):
+        make_processor(random_seed=seed, cache_max_entries=2).process()
+
+    entries = [name for name in os.listdir(tmp_path / "cache") if not name.endswith('.tmp')]
+    assert len(entries) == 2
+    assert make_processor(random_seed=0, cache_max_entries=2).fingerprint() not in entries
@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+import api.profiling
+from api.profiling import SamplingProfiler
+from conftest import FakeModel, make_traces, to_request
+
+class SlowModel(FakeModel):
+    """FakeModel that takes long enough per call to be sampled"""
+    def predict_on_batch(self, X):
+        time.sleep(0.05)
+        return super().predict_on_batch(X)
+
+@pytest.fixture
+def model_class():
+    return SlowModel
+
+@pytest.fixture
+def client(client, monkeypatch):
+    monkeypatch.setattr(api.profiling, "_profiler", SamplingProfiler())
+    return client
+
+def test_should_profile():
+    profiler = SamplingProfiler()
+    assert not profiler.should_profile("1")
+    
+    profiler.configure(mode="header")
+    assert profiler.should_profile("1")
+    assert not profiler.should_profile(None)
+    
+    profiler.configure(mode="sample", sample_rate=1.0)
+    assert profiler.should_profile(None)
+    
+    with pytest.raises(ValueError):
+        profiler.configure(mode="always")
+    with pytest.raises(ValueError):
+        profiler.configure(sample_rate=2.0)
+
+def test_requests_are_not_profiled_by_default(client):
+    response = client.post("/predict", json=to_request(make_traces(1)[0]), headers={"X-Profile": "1"})
+    assert response.status_code == 200
+    
+    status = client.get("/admin/profiling").json()
+    assert status["mode"] == "off"
+    assert status["profiled_requests"] == 0
+    assert client.get("/admin/profile").text == ""
+
+def test_profiled_request_stacks(client):
+    response = client.post("/admin/profiling", json={"mode": "header", "interval_ms": 1})
+    assert response.status_code == 200
+    assert response.json()["mode"] == "header"
+    
+    traces = [to_request(trace) for trace in make_traces(4)]
+    response = client.post("/batch-predict", json={"traces": traces}, headers={"X-Profile": "1"})
+    assert response.status_code == 200
+    assert len(response.json()["predictions"]) == 4
+    
+    status = client.get("/admin/profiling").json()
+    assert status["profiled_requests"] == 1
+    assert status["in_flight"] == 0
+    assert status["samples"] > 0
+    
+    collapsed = client.get("/admin/profile").text.splitlines()
+    assert any("predict.py:batch_predict" in line and "predict_on_batch" in line for line in collapsed)
+    stack, count = collapsed[0].rsplit(" ", 1)
+    assert int(count) > 0
+    
+    top = client.get("/admin/profile", params={"format": "top"}).text
+    assert "predict_on_batch" in top
+    
+    assert client.post("/admin/profile/clear").json() == {"cleared": True}
+    assert client.get("/admin/profile").text == ""
+
+def test_invalid_profiling_settings(client):
+    assert client.post("/admin/profiling", json={"mode": "always"}).status_code == 400
+    assert client.post("/admin/profiling", json={"interval_ms": 0}).status_code == 400
+    assert client.get("/admin/profile", params={"format": "pstats"}).status_code == 400
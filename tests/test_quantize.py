@@ -0,0 +1,91 @@
+import os
+import sys
+import yaml
+import numpy as np
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from model.features import FEATURE_COLUMNS, compute_features, prepare_model_input
+from model.quantize import TFLiteModel, convert_to_tflite, quantized_model_path
+
+tf = pytest.importorskip("tensorflow")
+from tensorflow.keras.layers import Dense, Dropout, Input
+from tensorflow.keras.models import Model
+
+from test_numpy_engine import build_keras_model
+
+# Maximum absolute difference allowed between Keras and float32 TFLite class probabilities
+TOLERANCE = 1e-5
+
+def make_inputs(model_type, n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    raw = rng.uniform(0.0, 1.0, size=(n_rows, 31))
+    raw[:, 0] *= 30
+    return prepare_model_input(compute_features(raw), model_type)
+
+def write_variant(model, path, variant="float32"):
+    with open(path, "wb") as f:
+        f.write(convert_to_tflite(model, variant))
+    return str(path)
+
+@pytest.mark.parametrize("model_type", ["lstm", "cnn", "dense"])
+def test_float32_variant_matches_keras(model_type, tmp_path):
+    tf.random.set_seed(0)
+    model = build_keras_model(model_type)
+    tflite_model = TFLiteModel(write_variant(model, tmp_path / "model.float32.tflite"))
+
+    # Batch sizes change between calls, as they do behind the micro-batcher
+    for n_rows in (1, 17, 4):
+        X = make_inputs(model_type, n_rows, seed=n_rows)
+        expected = model.predict_on_batch(X)
+        actual = tflite_model.predict_on_batch(X)
+
+        assert actual.shape == expected.shape
+        np.testing.assert_allclose(actual, expected, atol=TOLERANCE, rtol=0)
+
+def test_variant_keeps_regression_outputs_in_keras_order(tmp_path):
+    tf.random.set_seed(0)
+    features_input = Input(shape=(len(FEATURE_COLUMNS),), name='dense_input')
+    shared = Dropout(0.3)(Dense(64, activation='relu')(features_input))
+    outputs = [Dense(8, activation='softmax', name='fault_type')(shared)]
+    outputs += [Dense(1, name=name)(shared) for name in ['location', 'reflectance', 'loss']]
+    model = Model(inputs=features_input, outputs=outputs)
+
+    X = make_inputs('dense', 8)
+    tflite_model = TFLiteModel(write_variant(model, tmp_path / "model.float32.tflite"))
+    expected = model.predict_on_batch(X)
+    actual = tflite_model.predict_on_batch(X)
+
+    assert len(actual) == 4
+    for actual_output, expected_output in zip(actual, expected):
+        np.testing.assert_allclose(actual_output, expected_output, atol=1e-4, rtol=0)
+
+def test_int8_variant_needs_representative_data():
+    model = build_keras_model('dense')
+    with pytest.raises(ValueError, match="representative data"):
+        convert_to_tflite(model, 'int8')
+
+def test_detector_serves_configured_variant(tmp_path):
+    from model.predict import OTDRFaultDetector
+
+    tf.random.set_seed(0)
+    model = build_keras_model('lstm')
+    model_path = str(tmp_path / "best_model.pkl")
+    write_variant(model, quantized_model_path(model_path, 'dynamic_int8'), 'dynamic_int8')
+
+    config = {
+        'model': {'model_type': 'lstm', 'model_save_path': str(tmp_path)},
+        'api': {'inference_engine': 'tflite', 'tflite_variant': 'dynamic_int8', 'tflite_threads': 1},
+    }
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(yaml.safe_dump(config))
+
+    detector = OTDRFaultDetector(model_path=model_path, config_path=str(config_path))
+    assert isinstance(detector.model, TFLiteModel)
+    assert detector.loaded_model_path.endswith("best_model.dynamic_int8.tflite")
+
+    rng = np.random.default_rng(0)
+    results = detector.batch_predict(rng.uniform(0.0, 1.0, size=(3, 31)))
+    assert len(results) == 3
+    assert all(0 <= r['fault_type'] < 8 for r in results)
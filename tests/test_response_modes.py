@@ -0,0 +1,70 @@
+import os
+import sys
+import json
+import pytest
+from fastapi.testclient import TestClient
+
+# Add parent directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from api import app
+from api.main import BatchFaultPredictions, FaultPrediction
+from api.payloads import encode_json_predictions
+from conftest import RegressionFakeModel, make_traces, serve_model, to_request
+
+def test_full_mode_matches_pydantic_encoding(detector):
+    results = detector.batch_predict(make_traces(5))
+    expected = BatchFaultPredictions(predictions=[FaultPrediction(**result) for result in results])
+    
+    assert json.loads(encode_json_predictions(results, detector.class_names)) == json.loads(expected.json())
+
+def test_batch_response_modes(client, detector):
+    traces = make_traces(6)
+    batch = {"traces": [to_request(trace) for trace in traces]}
+    full = client.post("/batch-predict", json=batch).json()["predictions"]
+    expected = detector.batch_predict(traces)
+    assert [p["fault_type"] for p in full] == [r["fault_type"] for r in expected]
+    assert full[0]["location"] is None
+    
+    top = client.post("/batch-predict", json=batch, params={"response_mode": "top_k", "top_k": 2}).json()["predictions"]
+    for prediction, result in zip(top, full):
+        assert len(prediction["top_k"]) == 2
+        assert list(prediction["top_k"])[0] == result["fault_name"]
+        assert "all_probabilities" not in prediction
+    
+    array = client.post("/batch-predict", json=batch, params={"response_mode": "array"}).json()
+    assert array["classes"] == detector.class_names
+    assert array["fault_type"] == [p["fault_type"] for p in full]
+    assert array["confidence"] == [p["confidence"] for p in full]
+    assert array["probabilities"][3] == [full[3]["all_probabilities"][name] for name in detector.class_names]
+
+def test_single_response_modes(client):
+    trace = to_request(make_traces(1)[0])
+    full = client.post("/predict", json=trace).json()
+    
+    top = client.post("/predict", json=trace, params={"response_mode": "top_k", "top_k": 1}).json()
+    assert top["top_k"] == {full["fault_name"]: full["confidence"]}
+    
+    array = client.post("/predict", json=trace, params={"response_mode": "array"}).json()
+    assert array["fault_type"] == full["fault_type"]
+    assert len(array["probabilities"]) == len(array["classes"]) == 8
+
+def test_invalid_response_mode(client):
+    trace = to_request(make_traces(1)[0])
+    assert client.post("/predict", json=trace, params={"response_mode": "tiny"}).status_code == 400
+    assert client.post("/predict", json=trace, params={"response_mode": "top_k", "top_k": 9}).status_code == 422
+
+def test_fault_properties_in_responses(monkeypatch):
+    serve_model(monkeypatch, RegressionFakeModel())
+    client = TestClient(app)
+    traces = make_traces(3)
+    
+    prediction = client.post("/predict", json=to_request(traces[0])).json()
+    assert prediction["location"] == pytest.approx(traces[0]["SNR"] * 100, rel=1e-5)
+    assert prediction["reflectance"] == pytest.approx(-traces[0]["P1"], rel=1e-5)
+    
+    batch = {"traces": [to_request(trace) for trace in traces]}
+    predictions = client.post("/batch-predict", json=batch).json()["predictions"]
+    assert [p["loss"] for p in predictions] == pytest.approx([trace["P2"] / 10 for trace in traces], rel=1e-5)
+    
+    array = client.post("/batch-predict", json=batch, params={"response_mode": "array"}).json()
+    assert array["location"] == [p["location"] for p in predictions]
@@ -0,0 +1,117 @@
+import os
+import sys
+import json
+import asyncio
+from fastapi.testclient import TestClient
+
+# Add parent directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+import api.main
+import api.routing
+from api import app
+from api.streaming import read_lines
+from conftest import make_traces
+
+def collect_lines(chunks, max_line_bytes=65536):
+    async def source():
+        for chunk in chunks:
+            yield chunk
+    
+    async def collect():
+        return [item async for item in read_lines(source(), max_line_bytes)]
+    
+    return asyncio.run(collect())
+
+def to_ndjson_line(trace):
+    return json.dumps({"snr": trace["SNR"], "trace_points": [trace[f"P{i}"] for i in range(1, 31)]})
+
+def test_read_lines_across_chunk_boundaries():
+    lines = collect_lines([b'{"a"', b': 1}\n{"b": 2}\n', b'{"c": 3}'])
+    assert lines == [(1, b'{"a": 1}'), (2, b'{"b": 2}'), (3, b'{"c": 3}')]
+
+def test_read_lines_drops_overlong_lines():
+    lines = collect_lines([b"x" * 10, b"x" * 10, b"x\nok\n"], max_line_bytes=16)
+    assert lines == [(1, None), (2, b"ok")]
+
+    # The same limit applies to a line that arrives whole inside one chunk
+    lines = collect_lines([b"ok\n" + b"x" * 20 + b"\nok\n"], max_line_bytes=16)
+    assert lines == [(1, b"ok"), (2, None), (3, b"ok")]
+
+def test_stream_scores_in_chunks_and_reports_bad_lines(model, monkeypatch):
+    monkeypatch.setitem(api.main.config["api"], "stream_chunk_size", 4)
+    traces = make_traces(9)
+    lines = [to_ndjson_line(trace) for trace in traces]
+    lines.insert(3, '{"snr": 1.0, "trace_points": [0.5]}')
+    lines.insert(6, "not json")
+    body = "\n".join(lines) + "\n\n"
+    
+    response = TestClient(app).post("/batch-predict/stream", content=body.encode(),
+                                    headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    
+    results = [json.loads(line) for line in response.text.splitlines()]
+    summary = results.pop()
+    assert summary == {"done": True, "lines": 11, "predictions": 9, "errors": 2}
+    
+    assert [result["line"] for result in results] == list(range(1, 12))
+    assert "trace_points" in results[3]["error"]
+    assert "error" in results[6]
+    
+    expected = [result["fault_type"] for result in api.routing._router.get_detector().batch_predict(traces)]
+    assert [result["fault_type"] for result in results if "error" not in result] == expected
+    # 11 lines in chunks of 4 lines; the bad lines never reach the model
+    assert model.calls[-4:-1] == [3, 3, 3]
+
+def run_asgi(app, body_chunks, disconnect=False):
+    """Send a POST /batch-predict/stream request chunk by chunk; returns the messages sent back"""
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+             "scheme": "http", "path": "/batch-predict/stream", "raw_path": b"/batch-predict/stream",
+             "query_string": b"", "root_path": "", "server": ("testserver", 80), "client": ("testclient", 50000),
+             "headers": [(b"host", b"testserver"), (b"content-type", b"application/x-ndjson")]}
+    messages = [{"type": "http.request", "body": chunk, "more_body": i < len(body_chunks) - 1}
+                for i, chunk in enumerate(body_chunks)]
+    sent = []
+    
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        if disconnect:
+            return {"type": "http.disconnect"}
+        # The whole body was sent: wait for the response, as a server does
+        await asyncio.Event().wait()
+    
+    async def send(message):
+        sent.append(message)
+    
+    async def run():
+        await app(scope, receive, send)
+    
+    asyncio.run(asyncio.wait_for(run(), 10))
+    return sent
+
+def test_client_disconnect_stops_scoring(model, monkeypatch):
+    monkeypatch.setitem(api.main.config["api"], "stream_chunk_size", 2)
+    body = "".join(to_ndjson_line(trace) + "\n" for trace in make_traces(40)).encode()
+    
+    # The client goes away right after uploading, long before 20 chunks are scored
+    sent = run_asgi(app, [body], disconnect=True)
+    assert sum(model.calls) < 40
+    assert not any(b'"done"' in message.get("body", b"") for message in sent)
+
+def test_background_task_runs_after_the_stream():
+    from starlette.background import BackgroundTask
+    from api.streaming import NDJSONStreamingResponse
+    ran = []
+    
+    async def echo(body):
+        async for chunk in body:
+            yield chunk.upper()
+    
+    async def asgi_app(scope, receive, send):
+        response = NDJSONStreamingResponse(echo, background=BackgroundTask(ran.append, "done"))
+        await response(scope, receive, send)
+    
+    sent = run_asgi(asgi_app, [b"a\n", b"b\n"])
+    assert b"".join(message.get("body", b"") for message in sent) == b"A\nB\n"
+    assert ran == ["done"]
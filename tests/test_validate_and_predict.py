@@ -0,0 +1,72 @@
+import os
+import sys
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+# Add parent directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+import api.routing
+from api import app
+from api.validation import OTDRTrace, validate_trace, validate_features
+from model.features import compute_features
+from model.predict import OTDRFaultDetector
+from conftest import make_traces
+
+@pytest.fixture
+def model(model):
+    # Load the detector before the tests count model calls
+    api.routing._router.get_detector()
+    return model
+
+def to_request(trace):
+    return {"snr": round(trace["SNR"], 2), "trace_points": [trace[f"P{i}"] for i in range(1, 31)]}
+
+def test_validate_features_matches_validate_trace():
+    traces = [to_request(trace) for trace in make_traces(20)]
+    traces.append({"snr": 2.5, "trace_points": [0.4] * 30})
+    traces.append({"snr": 12.0, "trace_points": [0.1] * 10 + [0.9] * 10 + [0.2] * 10})
+    
+    raw = np.array([[trace["snr"], *trace["trace_points"]] for trace in traces], dtype=np.float32)
+    fused = validate_features(compute_features(raw))
+    
+    for trace, result in zip(traces, fused):
+        expected = validate_trace(OTDRTrace(**trace))
+        assert result.is_valid == expected.is_valid
+        assert result.errors == expected.errors
+        assert result.warnings == expected.warnings
+        for key, value in expected.stats.items():
+            assert result.stats[key] == pytest.approx(value, abs=1e-5)
+
+def test_valid_trace_is_scored_once_from_shared_features(model, monkeypatch):
+    client = TestClient(app)
+    trace = to_request(make_traces(1, seed=3)[0])
+    expected = client.post("/predict", json=trace).json()
+    
+    # Model input must come from the features computed for validation
+    def fail(self, data):
+        raise AssertionError("features recomputed")
+    monkeypatch.setattr(OTDRFaultDetector, "preprocess_input", fail)
+    
+    response = client.post("/validate-and-predict", json=trace)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["validation"]["is_valid"]
+    assert body["prediction"]["fault_type"] == expected["fault_type"]
+    assert body["prediction"]["confidence"] == pytest.approx(expected["confidence"])
+
+def test_invalid_trace_is_not_scored(model):
+    client = TestClient(app)
+    n_calls = len(model.calls)
+    
+    flat = client.post("/validate-and-predict", json={"snr": 10.0, "trace_points": [0.4] * 30}).json()
+    assert not flat["validation"]["is_valid"]
+    assert flat["prediction"] is None
+    
+    out_of_range = client.post("/validate-and-predict", json={"snr": -1.0, "trace_points": np.linspace(0, 1.2, 30).tolist()}).json()
+    assert out_of_range["validation"]["errors"][:2] == [
+        "SNR must be non-negative", "All trace points must be normalized between 0 and 1"
+    ]
+    assert out_of_range["prediction"] is None
+    
+    assert len(model.calls) == n_calls
@@ -0,0 +1,89 @@
+import os
+import sys
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+# Add parent directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from api import app
+from api.validation import ERROR_CODES, WARNING_CODES, check_traces
+
+client = TestClient(app)
+
+def make_batch(n, seed=0):
+    """Traces covering every check: smooth, flat, drops, spikes, low SNR"""
+    rng = np.random.default_rng(seed)
+    snr = rng.uniform(0.5, 25.0, size=n)
+    points = np.clip(np.cumsum(rng.normal(0.0, 0.2, size=(n, 30)), axis=1) * 0.3 + 0.5, 0.0, 1.0)
+    points[::7] = 0.4
+    points[3::11, 10] = 1.0
+    points[3::11, 9] = 0.1
+    return snr, points
+
+def test_batch_matches_single_trace_validation():
+    snr, points = make_batch(40)
+    traces = [{"snr": float(s), "trace_points": p.tolist()} for s, p in zip(snr, points)]
+    
+    response = client.post("/validation/batch", json={"traces": traces})
+    assert response.status_code == 200
+    batch = response.json()
+    
+    for i, trace in enumerate(traces):
+        single = client.post("/validation/trace", json=trace).json()
+        warnings = " ".join(single["warnings"])
+        
+        assert batch["is_valid"][i] == single["is_valid"]
+        assert bool(batch["error_codes"][i] & ERROR_CODES["flat_trace"]) == (not single["is_valid"])
+        assert bool(batch["warning_codes"][i] & WARNING_CODES["low_snr"]) == ("Low SNR" in warnings)
+        assert bool(batch["warning_codes"][i] & WARNING_CODES["sudden_drop"]) == ("Sudden drop" in warnings)
+        assert bool(batch["warning_codes"][i] & WARNING_CODES["sudden_spike"]) == ("Sudden spike" in warnings)
+    
+    stats = batch["stats"]
+    assert stats["n_traces"] == 40
+    assert stats["n_valid"] + stats["n_invalid"] == 40
+    assert stats["error_counts"]["flat_trace"] == stats["n_invalid"]
+
+def test_range_problems_are_reported_per_trace():
+    snr = np.array([-1.0, 35.0, 10.0, 10.0, np.nan])
+    points = np.tile(np.linspace(0.1, 0.9, 30), (5, 1))
+    points[2, 5] = 1.5
+    points[3, 0] = np.nan
+    
+    error_codes, warning_codes = check_traces(snr, points)
+    
+    assert error_codes.tolist() == [
+        ERROR_CODES["snr_negative"], ERROR_CODES["snr_too_high"],
+        ERROR_CODES["point_out_of_range"], ERROR_CODES["point_out_of_range"],
+        ERROR_CODES["snr_negative"]
+    ]
+    assert warning_codes[0] & WARNING_CODES["low_snr"]
+
+def test_wrong_number_of_points_is_rejected():
+    response = client.post("/validation/batch", json={"traces": [{"snr": 10.0, "trace_points": [0.5] * 29}]})
+    assert response.status_code == 422
+    
+    # As many points in all, but not 30 per trace
+    nested = [[0.5] * 15, [0.5] * 15]
+    response = client.post("/validation/batch", json={"traces": [{"snr": 10.0, "trace_points": nested}]})
+    assert response.status_code == 422
+    ragged = [{"snr": 10.0, "trace_points": [0.5] * 20}, {"snr": 10.0, "trace_points": [0.5] * 40}]
+    response = client.post("/validation/batch", json={"traces": ragged})
+    assert response.status_code == 422
+    
+    response = client.post("/validation/batch", json={"traces": []})
+    assert response.status_code == 200
+    assert response.json()["stats"]["n_traces"] == 0
+
+def test_nan_values_are_invalid_traces():
+    # Starlette parses NaN in JSON bodies
+    points = np.linspace(0.1, 0.9, 30).tolist()
+    traces = [{"snr": float("nan"), "trace_points": points},
+              {"snr": 10.0, "trace_points": [float("nan")] + points[1:]},
+              {"snr": 10.0, "trace_points": points}]
+    response = client.post("/validation/batch", json={"traces": traces})
+    assert response.status_code == 200
+    batch = response.json()
+    assert batch["is_valid"] == [False, False, True]
+    assert batch["error_codes"][:2] == [ERROR_CODES["snr_negative"], ERROR_CODES["point_out_of_range"]]
+    assert batch["stats"]["snr_mean"] == 10.0